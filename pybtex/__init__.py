@@ -29,6 +29,8 @@ def make_bibliography(aux_filename,
         output_encoding=None,
         output_backend=None,
         min_crossrefs=2,
+        context=None,
+        force=False,
         **kwargs
         ):
     """This functions extracts all nessessary information from .aux file
@@ -36,33 +38,63 @@ def make_bibliography(aux_filename,
     """
 
     from os import path
+    import pybtex.io
     from pybtex import auxfile
+    from pybtex.context import activate
+    from pybtex.fingerprint import Fingerprint
     from pybtex.plugin import find_plugin
     from pybtex.style import FormattedBibliography
+    from pybtex.style.cache import FormattedEntryCache
 
-    filename = path.splitext(aux_filename)[0]
-    aux_data = auxfile.parse_file(aux_filename, output_encoding)
+    with activate(context) as context:
+        filename = path.splitext(aux_filename)[0]
+        aux_data = auxfile.parse_file(aux_filename, output_encoding)
 
-    output_backend = find_plugin('pybtex.backends', output_backend)
-    bib_parser = find_plugin('pybtex.database.input', bib_format)
-    bib_data = bib_parser(
-        encoding=bib_encoding,
-        wanted_entries=aux_data.citations,
-        min_crossrefs=min_crossrefs,
-    ).parse_files(aux_data.data, bib_parser.get_default_suffix())
-
-    style_cls = find_plugin('pybtex.style.formatting', aux_data.style)
-    style = style_cls(
+        output_backend = find_plugin('pybtex.backends', output_backend)
+        bib_parser = find_plugin('pybtex.database.input', bib_format)
+        style_cls = find_plugin('pybtex.style.formatting', aux_data.style)
+        output_filename = filename + output_backend.get_default_suffix()
+        style_options = dict(
             label_style=kwargs.get('label_style'),
             name_style=kwargs.get('name_style'),
             sorting_style=kwargs.get('sorting_style'),
             abbreviate_names=kwargs.get('abbreviate_names'),
-    )
-    citations = bib_data.add_extra_citations(aux_data.citations, min_crossrefs)
-    entries = (bib_data.entries[key] for key in citations)
-    formatted_entries = style.format_entries(entries)
-    del entries
-    formatted_bibliography = FormattedBibliography(formatted_entries, style)
+        )
+
+        fingerprint = Fingerprint(output_filename)
+        fingerprint.add('python', aux_data.citations, aux_data.style, aux_data.data)
+        fingerprint.add_options(
+            bib_format=bib_parser,
+            bib_encoding=bib_encoding,
+            output_encoding=output_encoding,
+            output_backend=output_backend,
+            min_crossrefs=min_crossrefs,
+            style=style_cls,
+            **style_options
+        )
+        fingerprint.add_files(filename + bib_parser.get_default_suffix() for filename in aux_data.data)
+        if not force and fingerprint.replay(context):
+            return
+
+        output = pybtex.io.StringOutput()
+        with fingerprint.record(context) as run_context:
+            bib_data = bib_parser(
+                encoding=bib_encoding,
+                wanted_entries=aux_data.citations,
+                min_crossrefs=min_crossrefs,
+                context=run_context,
+            ).parse_files(aux_data.data, bib_parser.get_default_suffix())
 
-    output_filename = filename + output_backend.get_default_suffix()
-    output_backend(output_encoding).write_to_file(formatted_bibliography, output_filename)
+            style = style_cls(**style_options)
+            backend = output_backend(output_encoding)
+            entry_cache = FormattedEntryCache(style, backend, output_filename)
+            citations = bib_data.add_extra_citations(aux_data.citations, min_crossrefs)
+            entries = [bib_data.entries[key] for key in citations]
+            formatted_entries = style.format_entries(entries, entry_cache)
+            del entries
+            formatted_bibliography = FormattedBibliography(formatted_entries, style)
+            backend.write_to_stream(formatted_bibliography, output)
+            entry_cache.save()
+        output_data = output.getvalue().encode(output_encoding or pybtex.io.get_default_encoding())
+        pybtex.io.write_if_changed(output_filename, output_data)
+        fingerprint.save(output_data)
@@ -75,6 +75,48 @@ It is also possible to define bibliography formatting styles in Python.
                 help='style definition language to use (bibtex or python)',
                 metavar='LANGUAGE',
             ),
+            make_option(
+                '--compile-bst', dest='compile_bst', action='store_true',
+                help='compile BibTeX style functions to Python code before running them (faster for large styles)',
+            ),
+            make_option(
+                '--optimize-bst', dest='optimize_bst', action='store_true',
+                help='inline small BibTeX style functions and evaluate constant expressions before running the style',
+            ),
+            make_option(
+                '--profile-bst', dest='profile_bst', action='store_true',
+                help='print the number of calls and the time spent in each BibTeX style function',
+            ),
+            make_option(
+                '--profile-bst-output', dest='profile_bst_output',
+                help='write BibTeX style profiling data to FILE (JSON if FILE ends with .json, pstats otherwise)',
+                metavar='FILE',
+            ),
+        )),
+        ('Caching options', (
+            make_option(
+                '--force', dest='force', action='store_true',
+                help='regenerate the bibliography even if the input files and options have not changed',
+            ),
+            make_option(
+                '--watch', dest='watch', action='store_true',
+                help='keep running and regenerate the bibliography whenever the .aux, .bib or .bst files change',
+            ),
+        )),
+        ('Server options', (
+            make_option(
+                '--server', dest='server', action='store_true',
+                help='keep running and process requests from pybtex-client, reusing parsed files between runs',
+            ),
+            make_option(
+                '--socket', dest='socket_path',
+                help='Unix domain socket to listen on; default $PYBTEX_SOCKET or pybtex-UID.sock in the temporary directory',
+                metavar='FILE',
+            ),
+            make_option(
+                '--server-stats', dest='server_stats', action='store_true',
+                help='print the cache statistics of the running pybtex server',
+            ),
         )),
         ('Pythonic style options', (
             make_option(
@@ -120,9 +162,26 @@ It is also possible to define bibliography formatting styles in Python.
     }
     legacy_options = '-help', '-version', '-min-crossrefs', '-terse'
 
+    def check_num_args(self, options, args):
+        if options.server or options.server_stats:
+            return not args
+        return super(PybtexCommandLine, self).check_num_args(options, args)
+
     def run(self, options, args):
         from pybtex.plugin import find_plugin
 
+        if options.server:
+            from pybtex.server import serve
+            serve(options.socket_path)
+            return
+        if options.server_stats:
+            from pybtex.client import request
+            from pybtex.exceptions import PybtexError
+            # the server prints the stats itself
+            if request(['--server-stats'], socket_path=options.socket_path) is None:
+                raise PybtexError('pybtex server is not running')
+            return
+
         filename = args[0]
         ext = path.splitext(filename)[1]
         if ext != '.aux':
@@ -154,12 +213,20 @@ It is also possible to define bibliography formatting styles in Python.
                 setattr(options, encoding_option, options.encoding)
 
         kwargs = {}
-        uninteresting_options = 'verbose', 'style_language'
+        uninteresting_options = 'verbose', 'style_language', 'server', 'server_stats', 'socket_path', 'watch'
         kwargs = dict(
             (key, value) for (key, value) in options.__dict__.iteritems()
             if key not in uninteresting_options
         )
-        engine.make_bibliography(filename, **kwargs)
+        if options.watch:
+            from pybtex.context import get_current_context
+            from pybtex.watch import watch
+            get_current_context().error_code = watch(
+                filename, engine.make_bibliography,
+                style_language=options.style_language, **kwargs
+            )
+        else:
+            engine.make_bibliography(filename, **kwargs)
 
 main = PybtexCommandLine()
 
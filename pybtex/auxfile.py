@@ -38,6 +38,7 @@ class AuxData:
     command_re = re.compile(r'\\(citation|bibdata|bibstyle|@input){(.*)}')
     def __init__(self, encoding):
         self.filename = None
+        self.filenames = []
         self.encoding = encoding
         self.style = None
         self.data = None
@@ -68,6 +69,7 @@ class AuxData:
     def parse_file(self, filename):
         previous_filename = self.filename
         self.filename = filename
+        self.filenames.append(filename)
 
         with pybtex.io.open_unicode(filename, encoding=self.encoding) as f:
             s = f.read()
@@ -29,6 +29,12 @@ def make_bibliography(aux_filename,
         output_encoding=None,
         bst_encoding=None,
         min_crossrefs=2,
+        compile_bst=False,
+        optimize_bst=False,
+        profile_bst=False,
+        profile_bst_output=None,
+        context=None,
+        force=False,
         **kwargs
     ):
 
@@ -38,16 +44,51 @@ def make_bibliography(aux_filename,
     from pybtex.bibtex import bst
     from pybtex.bibtex.interpreter import Interpreter
     from pybtex import auxfile
+    from pybtex.context import activate
+    from pybtex.fingerprint import Fingerprint
 
 
     if bib_format is None:
         from pybtex.database.input.bibtex import Parser as bib_format
-    aux_data = auxfile.parse_file(aux_filename, output_encoding)
-    bst_filename = aux_data.style + path.extsep + 'bst'
-    bst_script = bst.parse_file(bst_filename, bst_encoding)
-    base_filename = path.splitext(aux_filename)[0]
-    bbl_filename = base_filename + path.extsep + 'bbl'
-    bib_filenames = [filename + bib_format.get_default_suffix() for filename in aux_data.data]
-    bbl_file = pybtex.io.open_unicode(bbl_filename, 'w', encoding=output_encoding)
-    interpreter = Interpreter(bib_format, bib_encoding)
-    interpreter.run(bst_script, aux_data.citations, bib_filenames, bbl_file, min_crossrefs=min_crossrefs)
+    with activate(context) as context:
+        aux_data = auxfile.parse_file(aux_filename, output_encoding)
+        bst_filename = aux_data.style + path.extsep + 'bst'
+        base_filename = path.splitext(aux_filename)[0]
+        bbl_filename = base_filename + path.extsep + 'bbl'
+        bib_filenames = [filename + bib_format.get_default_suffix() for filename in aux_data.data]
+        profile_bst = profile_bst or profile_bst_output
+
+        fingerprint = Fingerprint(bbl_filename)
+        fingerprint.add('bibtex', aux_data.citations, aux_data.style, aux_data.data)
+        fingerprint.add_options(
+            bib_format=bib_format,
+            bib_encoding=bib_encoding,
+            bst_encoding=bst_encoding,
+            output_encoding=output_encoding,
+            min_crossrefs=min_crossrefs,
+        )
+        fingerprint.add_files([bst_filename] + bib_filenames)
+        if not (force or profile_bst) and fingerprint.replay(context):
+            return
+
+        bst_script = bst.parse_file(bst_filename, bst_encoding)
+        if optimize_bst:
+            from pybtex.bibtex.optimizer import optimize
+            bst_script = optimize(bst_script)
+        if compile_bst:
+            from pybtex.bibtex.compiler import CompilingInterpreter as Interpreter
+        if profile_bst:
+            from pybtex.bibtex.profiler import profiling_interpreter
+            Interpreter = profiling_interpreter(Interpreter)
+        bbl_file = pybtex.io.StringOutput()
+        with fingerprint.record(context) as run_context:
+            interpreter = Interpreter(bib_format, bib_encoding, context=run_context)
+            interpreter.run(bst_script, aux_data.citations, bib_filenames, bbl_file, min_crossrefs=min_crossrefs)
+        bbl_data = bbl_file.getvalue().encode(output_encoding or pybtex.io.get_default_encoding())
+        pybtex.io.write_if_changed(bbl_filename, bbl_data)
+        fingerprint.save(bbl_data)
+    if profile_bst:
+        if profile_bst_output:
+            interpreter.profiler.write_file(profile_bst_output, bst_filename)
+        else:
+            print >>context.stderr, interpreter.profiler.format_table()
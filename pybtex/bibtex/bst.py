@@ -19,10 +19,16 @@
 # TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+import os
 import re
+from os import path
+
+from pybtex.__version__ import version
 from pybtex.bibtex.interpreter import (Integer, String, QuotedVar,
         Identifier, FunctionLiteral, BibTeXError)
 import pybtex.io
+from pybtex.context import get_current_context
+from pybtex.diskcache import DiskCache
 
 #ParserElement.enablePackrat()
 
@@ -139,9 +145,40 @@ class BstParser(Scanner):
             yield list(self.parse_group())
 
 
-def parse_file(filename, encoding=None):
+def parse_file(filename, encoding=None, use_cache=True):
+    """Parse a BST file.
+
+    Parsed styles are cached on disk (see pybtex.diskcache) and reused
+    as long as the file, the encoding and the pybtex version do not change.
+    If the current context has a memory cache, it is checked first.
+    """
+
+    filename = pybtex.io.resolve_filename(filename)
+    caches = []
+    if use_cache:
+        try:
+            stat = os.stat(filename)
+        except EnvironmentError:
+            pass  # let open_unicode() report the error
+        else:
+            memory_cache = get_current_context().cache
+            if memory_cache is not None:
+                caches.append(memory_cache)
+            caches.append(DiskCache('bst'))
+            cache_key = path.abspath(filename)
+            stamp = (version, stat.st_mtime, stat.st_size, encoding)
+    for cache in caches:
+        cached = cache.load(cache_key)
+        if cached is not None and cached[0] == stamp:
+            if cache is not caches[0]:
+                caches[0].save(cache_key, cached)
+            return cached[1]
+
     bst_file = pybtex.io.open_unicode(filename, encoding=encoding)
-    return parse_stream(bst_file, filename)
+    commands = parse_stream(bst_file, filename)
+    for cache in caches:
+        cache.save(cache_key, (stamp, commands))
+    return commands
 
 
 def parse_stream(stream, filename='<INPUT>'):
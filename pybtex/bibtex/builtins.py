@@ -27,19 +27,13 @@ CAUTION: functions should PUSH results, not RETURN
 from functools import update_wrapper
 
 
-import pybtex.io
-from pybtex.errors import report_error
 from pybtex.bibtex.exceptions import BibTeXError
-from pybtex.utils import memoize
+from pybtex.utils import lru_cache
 from pybtex.bibtex import utils
 from pybtex.database import Person
 from pybtex.bibtex.names import format as format_bibtex_name
 
 
-def print_warning(msg):
-    report_error(BibTeXError(msg))
-
-
 class Builtin(object):
     def __init__(self, f):
         self.f = f
@@ -122,7 +116,7 @@ def call_type(i):
     try:
         func = i.vars[entry_type]
     except KeyError:
-        print_warning(u'entry type for "{0}" isn\'t style-file defined'.format(
+        i.print_warning(u'entry type for "{0}" isn\'t style-file defined'.format(
             i.current_entry_key,
         ))
         try:
@@ -174,12 +168,12 @@ def empty(i):
         i.push(1)
 
 
-@memoize
+@lru_cache(maxsize=8192)
 def _split_names(names):
     return utils.split_name_list(names)
 
 
-@memoize
+@lru_cache(maxsize=8192)
 def _format_name(names, n, format):
     name = _split_names(names)[n - 1]
     return format_bibtex_name(name, format)
@@ -264,7 +258,7 @@ def substring(i):
 @builtin('stack$')
 def stack(i):
     while i.stack:
-        print >>pybtex.io.stdout, i.pop()
+        print >>i.context.stdout, i.pop()
 
 @builtin('swap$')
 def swap(i):
@@ -286,7 +280,7 @@ def text_prefix(i):
 
 @builtin('top$')
 def top(i):
-    print >>pybtex.io.stdout, i.pop()
+    print >>i.context.stdout, i.pop()
 
 @builtin('type$')
 def type_(i):
@@ -295,7 +289,7 @@ def type_(i):
 @builtin('warning$')
 def warning(i):
     msg = i.pop()
-    print_warning(msg)
+    i.print_warning(msg)
 
 @builtin('while$')
 def while_(i):
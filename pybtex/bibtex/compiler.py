@@ -0,0 +1,211 @@
+# Copyright (c) 2006, 2007, 2008, 2009, 2010, 2011, 2012  Andrey Golovizin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Compile BST functions to Python code.
+
+Instead of walking the function body on every call, each function is
+translated to Python source on its first call (when all the identifiers it
+uses are usually defined) and executed from then on:
+
+- literals are pushed directly,
+- identifiers are looked up once, builtins and other functions are called
+  directly,
+- {...} {...} if$ and {...} {...} while$ are turned into Python if and while
+  statements.
+
+>>> from pybtex.bibtex.interpreter import Integer, Identifier, FunctionLiteral
+>>> interpreter = CompilingInterpreter(None, None)
+>>> interpreter.add_variable('x', Integer(42))
+>>> f = CompiledFunction([
+...     Integer(1),
+...     FunctionLiteral([Identifier('x')]),
+...     FunctionLiteral([Identifier('skip$')]),
+...     Identifier('if$'),
+... ])
+>>> f.execute(interpreter)
+>>> interpreter.stack
+[42]
+>>> print f.source
+def make(c0, c1):
+    def code(i):
+        push = i.stack.append
+        pop = i.pop
+        push(c0)
+        if pop() > 0:
+            push(c1())
+        else:
+            pass
+    return code
+
+"""
+
+from pybtex.bibtex.builtins import Builtin, builtins
+from pybtex.bibtex.interpreter import (
+    Interpreter, Variable, Field, Function, FunctionLiteral, Identifier,
+    QuotedVar,
+)
+
+
+class CompiledFunction(Function):
+    """A BST function that is compiled to Python on its first call."""
+
+    code = None
+    source = None
+    linking = False
+
+    def execute(self, interpreter):
+        if self.code is None:
+            self.link(interpreter)
+        self.code(interpreter)
+
+    def link(self, interpreter):
+        self.linking = True
+        try:
+            self.source, self.code = FunctionCompiler(interpreter).compile(self.body)
+        except SyntaxError:
+            # Python cannot compile the code, interpret the function instead
+            self.code = lambda interpreter: Function.execute(self, interpreter)
+        finally:
+            self.linking = False
+        # skip the check in execute() from now on
+        self.execute = self.code
+
+
+class FunctionCompiler(object):
+    # do not indent the code deeper than that:
+    # Python does not allow more than 20 nested loops
+    max_depth = 20
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.constants = []
+        self.lines = []
+
+    def compile(self, body):
+        self.compile_body(body, depth=2)
+        args = ', '.join('c%i' % n for n in range(len(self.constants)))
+        source = '\n'.join([
+            'def make(%s):' % args,
+            '    def code(i):',
+            '        push = i.stack.append',
+            '        pop = i.pop',
+        ] + self.lines + [
+            '    return code',
+        ])
+        namespace = {}
+        exec source in namespace
+        return source, namespace['make'](*self.constants)
+
+    def emit(self, line, depth):
+        self.lines.append('    ' * depth + line)
+
+    def constant(self, value):
+        name = 'c%i' % len(self.constants)
+        self.constants.append(value)
+        return name
+
+    def lookup(self, name):
+        return self.interpreter.vars.get(name)
+
+    def is_builtin(self, element, name):
+        return (
+            isinstance(element, Identifier)
+            and self.lookup(element.value()) is builtins[name]
+        )
+
+    def compile_body(self, body, depth):
+        num_lines = len(self.lines)
+        pos = 0
+        while pos < len(body):
+            element = body[pos]
+            if (
+                depth < self.max_depth
+                and isinstance(element, FunctionLiteral)
+                and len(body) > pos + 2
+                and isinstance(body[pos + 1], FunctionLiteral)
+            ):
+                next_element = body[pos + 1]
+                if self.is_builtin(body[pos + 2], 'if$'):
+                    self.compile_if(element.body, next_element.body, depth)
+                    pos += 3
+                    continue
+                elif self.is_builtin(body[pos + 2], 'while$'):
+                    self.compile_while(element.body, next_element.body, depth)
+                    pos += 3
+                    continue
+            self.compile_element(element, depth)
+            pos += 1
+        if len(self.lines) == num_lines:
+            self.emit('pass', depth)
+
+    def compile_if(self, then_body, else_body, depth):
+        self.emit('if pop() > 0:', depth)
+        self.compile_body(then_body, depth + 1)
+        self.emit('else:', depth)
+        self.compile_body(else_body, depth + 1)
+
+    def compile_while(self, condition_body, loop_body, depth):
+        self.emit('while True:', depth)
+        self.compile_body(condition_body, depth + 1)
+        self.emit('if pop() <= 0:', depth + 1)
+        self.emit('break', depth + 2)
+        self.compile_body(loop_body, depth + 1)
+
+    def compile_element(self, element, depth):
+        if isinstance(element, Identifier):
+            self.compile_identifier(element, depth)
+        elif isinstance(element, QuotedVar):
+            var = self.lookup(element.value())
+            if var is None:
+                self.emit('%s.execute(i)' % self.constant(element), depth)
+            else:
+                self.emit('push(%s)' % self.constant(var), depth)
+        elif isinstance(element, FunctionLiteral):
+            function = CompiledFunction(element.body)
+            self.emit('push(%s)' % self.constant(function), depth)
+        elif isinstance(element, Variable):
+            self.emit('push(%s)' % self.constant(element.value()), depth)
+        else:
+            self.emit('%s.execute(i)' % self.constant(element), depth)
+
+    def compile_identifier(self, identifier, depth):
+        obj = self.lookup(identifier.value())
+        if obj is None:
+            # not defined yet, look it up at run time
+            self.emit('%s.execute(i)' % self.constant(identifier), depth)
+        elif obj is builtins['skip$']:
+            pass
+        elif isinstance(obj, Builtin):
+            self.emit('%s(i)' % self.constant(obj.f), depth)
+        elif isinstance(obj, CompiledFunction):
+            if obj.code is None and not obj.linking:
+                obj.link(self.interpreter)
+            self.emit('%s(i)' % self.constant(obj.execute), depth)
+        elif isinstance(obj, (Variable, Field)):
+            self.emit('push(%s())' % self.constant(obj.value), depth)
+        else:
+            self.emit('%s(i)' % self.constant(obj.execute), depth)
+
+
+class CompilingInterpreter(Interpreter):
+    """BST interpreter that compiles style functions to Python."""
+
+    function_class = CompiledFunction
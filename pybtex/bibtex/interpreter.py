@@ -20,8 +20,9 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 from pybtex.bibtex.exceptions import BibTeXError
-from pybtex.bibtex.builtins import builtins, print_warning
-from pybtex.bibtex.utils import wrap
+from pybtex.bibtex.builtins import builtins
+from pybtex.bibtex.utils import WrappingWriter
+from pybtex.context import get_current_context
 #from pybtex.database.input import bibtex
 
 
@@ -46,7 +47,7 @@ class Variable(object):
         if not (isinstance(value, self.value_type) or value is None):
             raise ValueError('Invalid value for BibTeX %s: %s' % (self.__class__.__name__, value))
     def execute(self, interpreter):
-        interpreter.push(self.value())
+        interpreter.push(self._value)
     def value(self):
         return self._value
 
@@ -58,19 +59,25 @@ class Variable(object):
 
 
 class EntryVariable(Variable):
+    """A variable declared in the ENTRY command.
+
+    Values are stored in the interpreter's per-entry slot lists,
+    at the index assigned when the variable is declared.
+    """
+
     def __init__(self, interpreter, name):
         Variable.__init__(self)
         self.interpreter = interpreter
         self.name = name
+        self.index = interpreter.add_entry_slot()
+    def execute(self, interpreter):
+        interpreter.push(self.value())
     def set(self, value):
         if value is not None:
             self.validate(value)
-            self.interpreter.current_entry.vars[self.name] = value
+            self.interpreter.current_entry_vars[self.index] = value
     def value(self):
-        try:
-            return self.interpreter.current_entry.vars[self.name]
-        except KeyError:
-            return None
+        return self.interpreter.current_entry_vars[self.index]
 
 
 class Integer(Variable):
@@ -104,6 +111,7 @@ class Field(object):
     def __init__(self, interpreter, name):
         self.interpreter = interpreter
         self.name = name
+        self.missing = MissingField(name)
 
     def execute(self, interpreter):
         self.interpreter.push(self.value())
@@ -112,7 +120,7 @@ class Field(object):
         try:
             return self.interpreter.current_entry.fields[self.name]
         except KeyError:
-            return MissingField(self.name)
+            return self.missing
 
 
 class Crossref(Field):
@@ -124,7 +132,7 @@ class Crossref(Field):
             value = self.interpreter.current_entry.fields[self.name]
             crossref_entry = self.interpreter.bib_data.entries[value]
         except KeyError:
-            return MissingField(self.name)
+            return self.missing
         return crossref_entry.key
 
 
@@ -167,22 +175,33 @@ class Function(object):
 
 
 class FunctionLiteral(Function):
+    # the function pushed on the stack, shared between executions
+    function = None
+
     def execute(self, interpreter):
-        interpreter.push(Function(self.body))
+        if self.function is None:
+            self.function = Function(self.body)
+        interpreter.push(self.function)
 
 
 class Interpreter(object):
-    def __init__(self, bib_format, bib_encoding):
+    function_class = Function
+
+    def __init__(self, bib_format, bib_encoding, context=None):
         self.bib_format = bib_format
         self.bib_encoding = bib_encoding
+        self.context = context if context is not None else get_current_context()
         self.stack = []
         self.vars = dict(builtins)
+        # values of ENTRY variables, one list per entry
+        self.entry_vars = {}
+        self.num_entry_slots = 0
         #FIXME is 10000 OK?
         self.add_variable('global.max$', Integer(10000))
         self.add_variable('entry.max$', Integer(10000))
-        self.add_variable('sort.key$', EntryString(self, 'sort.key$'))
+        self.sort_key = EntryString(self, 'sort.key$')
+        self.add_variable('sort.key$', self.sort_key)
         self.macros = {}
-        self.output_buffer = []
 
     def push(self, value):
 #        print 'push <%s>' % value
@@ -205,20 +224,33 @@ class Interpreter(object):
             raise BibTeXError('variable "{0}" already declared as {1}'.format(name, type(value).__name__))
         self.vars[name] = value
 
+    def add_entry_slot(self):
+        index = self.num_entry_slots
+        self.num_entry_slots += 1
+        for entry_vars in self.entry_vars.itervalues():
+            entry_vars.append(None)
+        return index
+
+    def get_entry_vars(self, key):
+        key_lower = key.lower()
+        try:
+            return self.entry_vars[key_lower]
+        except KeyError:
+            entry_vars = self.entry_vars[key_lower] = [None] * self.num_entry_slots
+            return entry_vars
+
     def output(self, string):
-        self.output_buffer.append(string)
+        self.output_writer.write(string)
 
     def newline(self):
-        output = wrap(u''.join(self.output_buffer))
-        self.output_file.write(output)
-        self.output_file.write(u'\n')
-        self.output_buffer = []
+        self.output_writer.newline()
 
     def run(self, bst_script, citations, bib_files, bbl_file, min_crossrefs):
         self.bst_script = iter(bst_script)
         self.citations = citations
         self.bib_files = bib_files
         self.output_file = bbl_file
+        self.output_writer = WrappingWriter(bbl_file)
         self.min_crossrefs = min_crossrefs
 
         for command in self.bst_script:
@@ -230,7 +262,7 @@ class Interpreter(object):
             else:
                 print 'Unknown command', name
 
-        self.output_file.close()
+        self.output_writer.close()
 
     def command_entry(self, fields, ints, strings):
         for id in fields:
@@ -250,7 +282,7 @@ class Interpreter(object):
 
     def command_function(self, name_, body):
         name = name_[0].value()
-        self.add_variable(name, Function(body))
+        self.add_variable(name, self.function_class(body))
 
     def command_integers(self, identifiers):
 #        print 'INTEGERS'
@@ -266,6 +298,7 @@ class Interpreter(object):
         for key in citations:
             self.current_entry_key = key
             self.current_entry = self.bib_data.entries[key]
+            self.current_entry_vars = self.get_entry_vars(key)
             f.execute(self)
         self.currentEntry = None
 
@@ -281,6 +314,7 @@ class Interpreter(object):
             macros=self.macros,
             person_fields=[],
             wanted_entries=self.citations,
+            context=self.context,
         )
         self.bib_data = p.parse_files(self.bib_files)
         self.citations = self.bib_data.add_extra_citations(self.citations, self.min_crossrefs)
@@ -296,15 +330,19 @@ class Interpreter(object):
             if citation in self.bib_data.entries:
                 yield citation
             else:
-                print_warning('missing database entry for "{0}"'.format(citation))
+                self.print_warning('missing database entry for "{0}"'.format(citation))
+
+    def print_warning(self, msg):
+        self.context.report_error(BibTeXError(msg))
 
     def command_reverse(self, function_group):
         function = function_group[0].value()
         self._iterate(function, reversed(self.citations))
 
     def command_sort(self):
+        index = self.sort_key.index
         def key(citation):
-            return self.bib_data.entries[citation].vars['sort.key$']
+            return self.get_entry_vars(citation)[index]
         self.citations.sort(key=key)
 
     def command_strings(self, identifiers):
@@ -21,6 +21,9 @@
 
 """BibTeX-like name formatting.
 
+Name format strings are compiled into lists of Python functions
+(see NameFormat.compile()). Compiled formats and parsed names are cached.
+
 >>> name = 'Charles Louis Xavier Joseph de la Vallee Poussin'
 >>> print format(name, '{vv~}{ll}{, jj}{, f.}')
 de~la Vallee~Poussin, C.~L. X.~J.
@@ -30,8 +33,10 @@ abc
 """
 
 import re
+from operator import methodcaller
 
 from pybtex.database import Person
+from pybtex.utils import lru_cache
 from pybtex.bibtex.utils import bibtex_len, bibtex_first_letter
 from pybtex.scanner import (
     Scanner, Pattern, Literal,
@@ -56,6 +61,10 @@ class Text(object):
     def format(self, person):
         return self.text
 
+    def compile(self):
+        text = self.text
+        return lambda person: text
+
     def to_python(self):
         return repr(self.text)
 
@@ -114,6 +123,11 @@ class NamePart(object):
     }
 
     def format(self, person):
+        """Format this part of the given Person without compiling it.
+
+        Slower than compile(), but simple enough to check it against.
+        """
+
         names = getattr(person, self.types[self.format_char])() if self.format_char else []
 
         if self.format_char and not names:
@@ -139,6 +153,44 @@ class NamePart(object):
 
         return formatted_part + discretionary
 
+    def compile(self):
+        """Return a function that formats this part of the given Person."""
+
+        pre_text = self.pre_text
+        post_text = self.post_text
+        tie = self.tie
+        abbreviate = self.abbreviate
+
+        if self.delimiter is not None:
+            join_names = self.delimiter.join
+        elif abbreviate:
+            join_names = lambda names: join(names, '.~', '. ')
+        else:
+            join_names = join
+
+        def add_tie(formatted_part):
+            if tie == '~':
+                return formatted_part + tie_or_space(formatted_part)
+            elif tie == '~~':
+                return formatted_part + '~'
+            else:
+                return formatted_part
+
+        if not self.format_char:
+            text = add_tie(pre_text + join_names([]) + post_text)
+            return lambda person: text
+
+        get_names = methodcaller(self.types[self.format_char])
+
+        def format_part(person):
+            names = get_names(person)
+            if not names:
+                return ''
+            if abbreviate:
+                names = [bibtex_first_letter(name) for name in names]
+            return add_tie(pre_text + join_names(names) + post_text)
+        return format_part
+
     def to_python(self):
         from pybtex.style.names import name_part
         class NamePart(object):
@@ -210,10 +262,15 @@ class NameFormat(object):
     def __init__(self, format):
         self.format_string = format
         self.parts = list(NameFormatParser(format).parse())
+        self.formatters = self.compile()
+
+    def compile(self):
+        """Return a list of functions formatting each part of a Person."""
+        return [part.compile() for part in self.parts]
 
     def format(self, name):
-        person = Person(name)
-        return ''.join(part.format(person) for part in self.parts)
+        person = parse_name(name)
+        return ''.join([format_part(person) for format_part in self.formatters])
 
     def to_python(self):
         """Convert BibTeX name format to Python (inexactly)."""
@@ -260,8 +317,23 @@ def join(words, tie='~', space=' '):
                 space.join(words[1:-1]) +
                 tie + words[-1])
 
+@lru_cache(maxsize=8192)
+def parse_name(name):
+    """Parse the name into a Person.
+
+    The results are cached and must not be modified.
+    """
+    return Person(name)
+
+
+@lru_cache(maxsize=1024)
+def get_name_format(format):
+    """Return a (cached) compiled NameFormat."""
+    return NameFormat(format)
+
+
 def format(name, format):
-    return NameFormat(format).format(name)
+    return get_name_format(format).format(name)
 
 
 class UnbalancedBraceError(PybtexSyntaxError):
@@ -0,0 +1,281 @@
+# Copyright (c) 2009, 2010, 2011, 2012  Andrey Golovizin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Optimize parsed BST programs before running them.
+
+The optimizer rewrites the bodies of BST functions without changing what the
+program does:
+
+- small non-recursive functions are inlined into the functions defined
+  after them,
+- +, -, *, =, < and > are evaluated at compile time if both operands are
+  literals,
+- if$ with a constant condition is replaced with the selected branch,
+  {} {} if$ is replaced with pop$,
+- skip$ and literals that are immediately popped are removed.
+
+Only names that are declared once in the style file are inlined, so that
+the result does not depend on the order of declarations. The optimized
+program does not refer to any interpreter, so it can be cached and run by
+several interpreters at once.
+
+>>> from pybtex.bibtex.bst import parse_stream
+>>> program = parse_stream([
+...     'INTEGERS { x }',
+...     'FUNCTION {not} { {#0} {#1} if$ }',
+...     'FUNCTION {test} { #1 #2 + #3 = not {skip$} {"a" "b" * top$} if$ }',
+... ])
+>>> print format_program(optimize(program))
+INTEGERS { x }
+<BLANKLINE>
+FUNCTION {not}
+{ { #0 } { #1 } if$ }
+<BLANKLINE>
+FUNCTION {test}
+{ "ab" top$ }
+<BLANKLINE>
+
+"""
+
+from collections import defaultdict
+
+from pybtex.bibtex.builtins import builtins
+from pybtex.bibtex.interpreter import (
+    Integer, String, Identifier, QuotedVar, FunctionLiteral,
+)
+
+
+def fold_plus(a, b):
+    return Integer(a + b)
+
+
+def fold_minus(a, b):
+    return Integer(a - b)
+
+
+def fold_concat(a, b):
+    return String(a + b)
+
+
+def fold_equals(a, b):
+    return Integer(int(a == b))
+
+
+def fold_less(a, b):
+    return Integer(int(a < b))
+
+
+def fold_more(a, b):
+    return Integer(int(a > b))
+
+
+# builtin name -> (operand type, folding function)
+pure_builtins = {
+    '+': (Integer, fold_plus),
+    '-': (Integer, fold_minus),
+    '*': (String, fold_concat),
+    '=': (Integer, fold_equals),
+    '<': (Integer, fold_less),
+    '>': (Integer, fold_more),
+}
+
+
+def get_size(body):
+    """Return the number of elements in the body, including nested ones."""
+
+    size = 0
+    for element in body:
+        size += 1
+        if isinstance(element, FunctionLiteral):
+            size += get_size(element.body)
+    return size
+
+
+def refers_to(body, name):
+    """Return True if the body calls the function with the given name."""
+
+    for element in body:
+        if isinstance(element, FunctionLiteral):
+            if refers_to(element.body, name):
+                return True
+        elif isinstance(element, Identifier) and element.value() == name:
+            return True
+    return False
+
+
+def get_declared_names(commands):
+    """Count how many times each name is declared in the program."""
+
+    declared = defaultdict(int)
+    for command in commands:
+        name = command[0].upper()
+        if name == 'ENTRY':
+            declared['crossref'] += 1
+            groups = command[1:]
+        elif name in ('INTEGERS', 'STRINGS'):
+            groups = command[1:]
+        elif name == 'FUNCTION':
+            groups = command[1:2]
+        else:
+            groups = []
+        for group in groups:
+            for identifier in group:
+                declared[identifier.value()] += 1
+    return declared
+
+
+class Optimizer(object):
+    # inline functions with at most that many elements
+    max_inline_size = 10
+
+    def __init__(self, commands):
+        self.commands = commands
+        self.declared = get_declared_names(commands)
+        self.inline_bodies = {}
+        # names of the functions being inlined, to stop at recursive calls
+        self.expanding = set()
+
+    def optimize(self):
+        for command in self.commands:
+            if command[0].upper() == 'FUNCTION' and len(command) == 3:
+                yield self.optimize_function(*command)
+            else:
+                yield command
+
+    def optimize_function(self, command_name, name_, body):
+        name = name_[0].value()
+        body = self.optimize_body(body)
+        if (
+            self.declared[name] == 1
+            and get_size(body) <= self.max_inline_size
+            and not refers_to(body, name)
+        ):
+            self.inline_bodies[name] = body
+        return [command_name, name_, body]
+
+    def is_builtin(self, name):
+        return name in builtins and not self.declared[name]
+
+    def optimize_body(self, body):
+        result = []
+        for element in body:
+            self.append(result, element)
+        return result
+
+    def append(self, result, element):
+        if isinstance(element, Identifier):
+            self.append_identifier(result, element)
+        elif isinstance(element, FunctionLiteral):
+            result.append(FunctionLiteral(self.optimize_body(element.body)))
+        else:
+            result.append(element)
+
+    def append_identifier(self, result, identifier):
+        name = identifier.value()
+        if name in self.inline_bodies and name not in self.expanding:
+            self.expanding.add(name)
+            try:
+                for element in self.inline_bodies[name]:
+                    self.append(result, element)
+            finally:
+                self.expanding.remove(name)
+        elif not self.is_builtin(name):
+            result.append(identifier)
+        elif name == 'skip$':
+            pass
+        elif name == 'pop$' and result and isinstance(result[-1], (Integer, String, FunctionLiteral)):
+            del result[-1]
+        elif name in pure_builtins and self.can_fold(result, pure_builtins[name][0]):
+            fold = pure_builtins[name][1]
+            value = fold(result[-2].value(), result[-1].value())
+            del result[-2:]
+            result.append(value)
+        elif name == 'if$' and self.can_fold(result, FunctionLiteral):
+            self.append_if(result, identifier)
+        else:
+            result.append(identifier)
+
+    def append_if(self, result, identifier):
+        then_branch, else_branch = result[-2:]
+        if len(result) > 2 and isinstance(result[-3], Integer):
+            branch = then_branch if result[-3].value() > 0 else else_branch
+            del result[-3:]
+            for element in branch.body:
+                self.append(result, element)
+        elif not then_branch.body and not else_branch.body and self.is_builtin('pop$'):
+            del result[-2:]
+            self.append_identifier(result, Identifier('pop$'))
+        else:
+            result.append(identifier)
+
+    def can_fold(self, result, operand_type):
+        if len(result) < 2:
+            return False
+        a, b = result[-2:]
+        # Integer is not a subclass of String or vice versa, but be strict
+        return type(a) is operand_type and type(b) is operand_type and (
+            operand_type is not Integer
+            or isinstance(a.value() + b.value(), int)
+        )
+
+
+def optimize(commands):
+    """Return an optimized copy of a parsed BST program."""
+
+    return list(Optimizer(commands).optimize())
+
+
+def format_element(element):
+    if isinstance(element, FunctionLiteral):
+        if not element.body:
+            return u'{}'
+        return u'{ %s }' % u' '.join(format_element(e) for e in element.body)
+    elif isinstance(element, Integer):
+        return u'#%i' % element.value()
+    elif isinstance(element, String):
+        return u'"%s"' % element.value()
+    elif isinstance(element, QuotedVar):
+        return u"'%s" % element.value()
+    else:
+        return element.value()
+
+
+def format_program(commands):
+    """Format a parsed BST program as BST source code."""
+
+    lines = []
+    for command in commands:
+        name = command[0]
+        args = [format_element(FunctionLiteral(arg)) for arg in command[1:]]
+        if name.upper() == 'FUNCTION' and len(command) == 3:
+            lines.append(u'%s {%s}' % (name, format_element(command[1][0])))
+            lines.append(args[1])
+        else:
+            lines.append(u' '.join([name] + args))
+        lines.append(u'')
+    return u'\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import sys
+    from pybtex.bibtex import bst
+    sys.stdout.write(format_program(optimize(bst.parse_file(sys.argv[1]))).encode('UTF-8'))
@@ -0,0 +1,178 @@
+# Copyright (c) 2009, 2010, 2011, 2012  Andrey Golovizin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Profile BibTeX styles.
+
+The profiling interpreter wraps every builtin and every style function
+in a ProfiledFunction object that records the number of calls and the
+inclusive and exclusive time spent in it. ITERATE, REVERSE, SORT, EXECUTE
+and READ commands are measured as well. The plain interpreter is not
+affected, so profiling costs nothing when it is off.
+
+>>> from pybtex.bibtex.interpreter import Interpreter, Integer, Identifier
+>>> interpreter = profiling_interpreter(Interpreter)(None, None)
+>>> interpreter.command_function([Identifier('add')], [Identifier('+')])
+>>> interpreter.push(1); interpreter.push(2)
+>>> interpreter.vars['add'].execute(interpreter)
+>>> interpreter.stack
+[3]
+>>> sorted((name, stats[0]) for name, stats in interpreter.profiler.stats.items())
+[('+', 1), ('add', 1)]
+
+"""
+
+import json
+import marshal
+from collections import defaultdict
+from timeit import default_timer
+
+from pybtex.bibtex.builtins import Builtin
+
+
+class Profiler(object):
+    def __init__(self, timer=default_timer):
+        self.timer = timer
+        # name -> [number of calls, inclusive time, exclusive time]
+        self.stats = {}
+        # time spent in the called functions, for each active call
+        self.children_time = []
+        # number of active calls for each name, to handle recursion
+        self.active = defaultdict(int)
+
+    def call(self, name, function, *args):
+        try:
+            stats = self.stats[name]
+        except KeyError:
+            stats = self.stats[name] = [0, 0.0, 0.0]
+        children_time = [0.0]
+        self.children_time.append(children_time)
+        self.active[name] += 1
+        start = self.timer()
+        try:
+            return function(*args)
+        finally:
+            elapsed = self.timer() - start
+            self.active[name] -= 1
+            self.children_time.pop()
+            stats[0] += 1
+            if not self.active[name]:
+                stats[1] += elapsed
+            stats[2] += elapsed - children_time[0]
+            if self.children_time:
+                self.children_time[-1][0] += elapsed
+
+    def sorted_stats(self):
+        return sorted(self.stats.iteritems(), key=lambda item: item[1][2], reverse=True)
+
+    def format_table(self):
+        lines = ['{0:>10} {1:>10} {2:>10} {3:>12}  {4}'.format(
+            'calls', 'inclusive', 'exclusive', 'excl/call', 'name',
+        )]
+        for name, (calls, inclusive, exclusive) in self.sorted_stats():
+            lines.append(u'{0:>10} {1:>10.3f} {2:>10.3f} {3:>12.6f}  {4}'.format(
+                calls, inclusive, exclusive, exclusive / calls, name,
+            ))
+        return u'\n'.join(lines)
+
+    def write_json(self, stream):
+        json.dump([
+            {'name': name, 'calls': calls, 'inclusive': inclusive, 'exclusive': exclusive}
+            for name, (calls, inclusive, exclusive) in self.sorted_stats()
+        ], stream, indent=1)
+
+    def write_pstats(self, stream, filename='<bst>'):
+        """Write the statistics in the format read by the pstats module."""
+        stats = {}
+        for name, (calls, inclusive, exclusive) in self.stats.iteritems():
+            key = filename, 0, name.encode('UTF-8')
+            stats[key] = calls, calls, exclusive, inclusive, {}
+        marshal.dump(stats, stream)
+
+    def write_file(self, filename, bst_filename='<bst>'):
+        """Write a JSON file if the filename ends with .json,
+        or a pstats file otherwise."""
+        with open(filename, 'wb') as stats_file:
+            if filename.endswith('.json'):
+                self.write_json(stats_file)
+            else:
+                self.write_pstats(stats_file, bst_filename)
+
+
+class ProfiledFunction(object):
+    def __init__(self, profiler, name, function):
+        self.profiler = profiler
+        self.name = name
+        self.function = function
+
+    def __repr__(self):
+        return '<profiled {0!r}>'.format(self.function)
+
+    def execute(self, interpreter):
+        self.profiler.call(self.name, self.function.execute, interpreter)
+
+
+class ProfilingInterpreterMixin(object):
+    def __init__(self, *args, **kwargs):
+        super(ProfilingInterpreterMixin, self).__init__(*args, **kwargs)
+        self.profiler = Profiler()
+        for name, value in self.vars.items():
+            if isinstance(value, Builtin):
+                self.vars[name] = ProfiledFunction(self.profiler, name, value)
+
+    def command_function(self, name_, body):
+        super(ProfilingInterpreterMixin, self).command_function(name_, body)
+        name = name_[0].value()
+        self.vars[name] = ProfiledFunction(self.profiler, name, self.vars[name])
+
+    def command_execute(self, command_):
+        self.profiler.call(
+            'EXECUTE {%s}' % command_[0].value(),
+            super(ProfilingInterpreterMixin, self).command_execute, command_,
+        )
+
+    def command_iterate(self, function_group):
+        self.profiler.call(
+            'ITERATE {%s}' % function_group[0].value(),
+            super(ProfilingInterpreterMixin, self).command_iterate, function_group,
+        )
+
+    def command_reverse(self, function_group):
+        self.profiler.call(
+            'REVERSE {%s}' % function_group[0].value(),
+            super(ProfilingInterpreterMixin, self).command_reverse, function_group,
+        )
+
+    def command_read(self):
+        self.profiler.call('READ', super(ProfilingInterpreterMixin, self).command_read)
+
+    def command_sort(self):
+        self.profiler.call('SORT', super(ProfilingInterpreterMixin, self).command_sort)
+
+
+def profiling_interpreter(interpreter_class):
+    """Return a profiling subclass of the given interpreter class."""
+
+    return type(
+        'Profiling' + interpreter_class.__name__,
+        (ProfilingInterpreterMixin, interpreter_class),
+        {},
+    )
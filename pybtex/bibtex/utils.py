@@ -22,9 +22,11 @@
 import re
 
 from pybtex.bibtex.exceptions import BibTeXError
+from pybtex.utils import lru_cache
 
 whitespace_re = re.compile('(\s)')
 purify_special_char_re = re.compile(r'^\\[A-Za-z]+')
+brace_re = re.compile(r'[{}]')
 
 def wrap(string, width=79):
     def wrap_chunks(chunks, width, initial_indent='', subsequent_indent='  '):
@@ -58,6 +60,111 @@ def wrap(string, width=79):
     return '\n'.join(wrap_chunks(chunks, width))
 
 
+class WrappingWriter(object):
+    """Write text to a stream, wrapping it into lines exactly like wrap().
+
+    Text is wrapped as it is written. Each block (the text written between
+    two newline() calls) is wrapped separately. Finished blocks are buffered
+    and written to the stream in large pieces.
+
+    >>> from io import StringIO
+    >>> stream = StringIO()
+    >>> writer = WrappingWriter(stream, width=10)
+    >>> writer.write(u'aaa bbb ')
+    >>> writer.write(u'ccc ddd')
+    >>> writer.newline()
+    >>> writer.write(u'eee ')
+    >>> writer.newline()
+    >>> writer.flush()
+    >>> print stream.getvalue()
+    aaa bbb
+      ccc ddd
+    eee
+    <BLANKLINE>
+    """
+
+    def __init__(self, stream, width=79, buffer_size=65536):
+        self.stream = stream
+        self.width = width
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.buffer_len = 0
+        self.start_block()
+
+    def start_block(self):
+        # blocks that fit into a single line are not split into chunks
+        self.text = []
+        self.text_len = 0
+        self.wrapping = False
+        self.lines = []
+        self.line = []
+        self.line_width = 0
+        self.indent = u''
+        # the last, possibly incomplete word
+        self.word = u''
+
+    def write(self, string):
+        if not self.wrapping:
+            self.text.append(string)
+            self.text_len += len(string)
+            if self.text_len <= self.width:
+                return
+            self.wrapping = True
+            string = u''.join(self.text)
+        chunks = whitespace_re.split(string)
+        chunks[0] = self.word + chunks[0]
+        self.word = chunks.pop()
+        for chunk in chunks:
+            self.add_chunk(chunk)
+
+    def add_chunk(self, chunk):
+        chunk_len = len(chunk)
+        if self.line_width + chunk_len <= self.width - len(self.indent):
+            self.line.append(chunk)
+            self.line_width += chunk_len
+        else:
+            self.end_line()
+            self.indent = u'  '
+            self.line = [chunk]
+            self.line_width = chunk_len
+
+    def end_line(self):
+        line = self.line
+        if line:
+            if line[0] == ' ':
+                line.pop(0)
+            self.lines.append(self.indent + u''.join(line).rstrip())
+
+    def newline(self):
+        """Finish the current block."""
+        if self.wrapping:
+            self.add_chunk(self.word)
+            self.end_line()
+            block = u'\n'.join(self.lines)
+        else:
+            block = u''.join(self.text).rstrip()
+        self.buffer.append(block)
+        self.buffer.append(u'\n')
+        self.buffer_len += len(block) + 1
+        if self.buffer_len >= self.buffer_size:
+            self.flush()
+        self.start_block()
+
+    def flush(self):
+        """Write the finished blocks to the stream."""
+        self.stream.write(u''.join(self.buffer))
+        self.buffer = []
+        self.buffer_len = 0
+
+    def close(self):
+        """Write the finished blocks and close the stream.
+
+        Text written after the last newline() is discarded.
+        """
+        self.flush()
+        self.stream.close()
+
+
 class BibTeXString(object):
     def __init__(self, chars, level=0):
         self.level = level
@@ -108,6 +215,28 @@ class BibTeXString(object):
         return ''.join(unicode(child) for child in self.contents)
 
 
+def find_closing_brace(string, pos):
+    """Return the position of the brace closing the one at pos,
+    or the length of the string if there is none.
+
+    >>> find_closing_brace('a{b{c}d}e', 1)
+    7
+    >>> find_closing_brace('a{b{c}d', 1)
+    7
+    """
+
+    brace_level = 0
+    for match in brace_re.finditer(string, pos):
+        if match.group() == '{':
+            brace_level += 1
+        else:
+            brace_level -= 1
+            if not brace_level:
+                return match.start()
+    return len(string)
+
+
+@lru_cache(maxsize=4096)
 def change_case(string, mode):
     r"""
     >>> print change_case('aBcD', 'l')
@@ -154,24 +283,33 @@ def change_case(string, mode):
 
         return ' '.join(convert_words(special_char.split(' ')))
 
-    def change_case_iter(string, mode):
-        state = 'start'
-        for char, brace_level in scan_bibtex_string(string):
-            if brace_level == 0:
-                yield convert(char, state)
-                if char == ':':
-                    state = 'after colon'
-                elif char.isspace() and state == 'after colon':
-                    state = 'start'
-                else:
-                    state = 'normal'
+    result = []
+    state = 'start'
+    pos = 0
+    end = len(string)
+    while pos < end:
+        char = string[pos]
+        if char == '{':
+            # everything inside braces is left as is, except special characters
+            group_end = find_closing_brace(string, pos)
+            if string.startswith('\\', pos + 1):
+                result.append('{')
+                result.append(convert_special_char(string[pos + 1:group_end], state))
+                result.append('}')
             else:
-                if brace_level == 1 and char.startswith('\\'):
-                    yield convert_special_char(char, state)
-                else:
-                    yield char
-
-    return ''.join(change_case_iter(string, mode))
+                result.append(string[pos:group_end + 1])
+            state = 'normal'
+            pos = group_end + 1
+            continue
+        result.append(convert(char, state))
+        if char == ':':
+            state = 'after colon'
+        elif char.isspace() and state == 'after colon':
+            state = 'start'
+        else:
+            state = 'normal'
+        pos += 1
+    return ''.join(result)
 
 
 def bibtex_substring(string, start, length):
@@ -210,6 +348,7 @@ def bibtex_substring(string, start, length):
     return string[start0:end0]
 
 
+@lru_cache(maxsize=4096)
 def bibtex_len(string):
     r"""Return the number of characters in the string.
 
@@ -242,10 +381,27 @@ def bibtex_len(string):
     >>> print bibtex_len(r'level 0 {1 {\2}}')
     12
     """
+    if '{' not in string and '}' not in string:
+        return len(string)
     length = 0
-    for char, brace_level in scan_bibtex_string(string):
-        if char not in '{}':
+    brace_level = 0
+    pos = 0
+    end = len(string)
+    while pos < end:
+        char = string[pos]
+        if char == '{':
+            if brace_level == 0 and string.startswith('\\', pos + 1):
+                # a special character
+                length += 1
+                pos = find_closing_brace(string, pos) + 1
+                continue
+            brace_level += 1
+        elif char == '}':
+            if brace_level > 0:
+                brace_level -= 1
+        else:
             length += 1
+        pos += 1
     return length
 
 
@@ -272,19 +428,35 @@ def bibtex_prefix(string, num_chars):
     ab{\cd}
 
     """
-    def prefix():
-        length = 0
-        for char, brace_level in scan_bibtex_string(string):
-            yield char
-            if char not in '{}':
-                length += 1
+    length = 0
+    brace_level = 0
+    pos = 0
+    end = len(string)
+    while pos < end:
+        char = string[pos]
+        if char == '{' and brace_level == 0 and string.startswith('\\', pos + 1):
+            # a special character, unclosed ones get a closing brace
             if length >= num_chars:
-                break
-        for i in range(brace_level):
-            yield '}'
-    return ''.join(prefix())
+                return string[:pos + 1] + '}'
+            group_end = find_closing_brace(string, pos)
+            length += 1
+            if length >= num_chars or group_end == end:
+                return string[:group_end] + '}'
+            pos = group_end + 1
+            continue
+        elif char == '{':
+            brace_level += 1
+        elif char == '}' and brace_level > 0:
+            brace_level -= 1
+        elif char != '}':
+            length += 1
+        pos += 1
+        if length >= num_chars:
+            break
+    return string[:pos] + '}' * brace_level
 
 
+@lru_cache(maxsize=4096)
 def bibtex_purify(string):
     r"""Strip special characters from the string.
 
@@ -319,19 +491,30 @@ def bibtex_purify(string):
     """
 
     # FIXME BibTeX treats some accented and foreign characterss specially
-    def purify_iter(string):
-        for token, brace_level in scan_bibtex_string(string):
-            if brace_level == 1 and token.startswith('\\'):
-                for char in purify_special_char_re.sub('', token):
-                    if char.isalnum():
-                        yield char
-            else:
-                if token.isalnum():
-                    yield token
-                elif token.isspace() or token in '-~':
-                    yield ' '
-
-    return ''.join(purify_iter(string))
+    result = []
+    brace_level = 0
+    pos = 0
+    end = len(string)
+    while pos < end:
+        char = string[pos]
+        if char == '{':
+            if brace_level == 0 and string.startswith('\\', pos + 1):
+                # a special character: strip the command name, keep the rest
+                group_end = find_closing_brace(string, pos)
+                special_char = purify_special_char_re.sub('', string[pos + 1:group_end])
+                result.extend(char for char in special_char if char.isalnum())
+                pos = group_end + 1
+                continue
+            brace_level += 1
+        elif char == '}':
+            if brace_level > 0:
+                brace_level -= 1
+        elif char.isalnum():
+            result.append(char)
+        elif char.isspace() or char in '-~':
+            result.append(' ')
+        pos += 1
+    return ''.join(result)
 
 
 def scan_bibtex_string(string):
@@ -365,6 +548,14 @@ def split_name_list(string):
     return split_tex_string(string, ' and ')
 
 
+@lru_cache(maxsize=64)
+def compile_separator(sep):
+    """Compile a regexp matching the separator at every position,
+    including the overlapping ones."""
+    return re.compile('(?=({0}))'.format(sep))
+
+
+@lru_cache(maxsize=4096)
 def split_tex_string(string, sep=None, strip=True, filter_empty=False):
     """Split a string using the given separator (regexp).
 
@@ -394,24 +585,24 @@ def split_tex_string(string, sep=None, strip=True, filter_empty=False):
     if sep is None:
         sep = '[\s~]+'
         filter_empty = True
-    sep_re = re.compile(sep)
+    sep_re = compile_separator(sep)
+    braces = brace_re.finditer(string)
+    next_brace = next(braces, None)
     brace_level = 0
     name_start = 0
     result = []
     string_len = len(string)
-    pos = 0
-    for pos, char in enumerate(string):
-        if char == '{':
-            brace_level += 1
-        elif char == '}':
-            brace_level -= 1
-        elif brace_level == 0 and pos > 0:
-            match = sep_re.match(string[pos:])
-            if match:
-                sep_len = len(match.group())
-                if pos + sep_len < string_len:
-                    result.append(string[name_start:pos])
-                    name_start = pos + sep_len
+    for match in sep_re.finditer(string, 1):
+        pos = match.start()
+        while next_brace is not None and next_brace.start() < pos:
+            brace_level += 1 if next_brace.group() == '{' else -1
+            next_brace = next(braces, None)
+        if brace_level != 0 or (next_brace is not None and next_brace.start() == pos):
+            continue
+        sep_end = match.end(1)
+        if sep_end < string_len:
+            result.append(string[name_start:pos])
+            name_start = sep_end
     if name_start < string_len:
         result.append(string[name_start:])
     if strip:
@@ -441,9 +632,24 @@ def bibtex_first_letter(string):
 
     """
 
-    for char in BibTeXString(string):
-        if char.startswith('\\') and char != '\\':
-            return u'{{{0}}}'.format(char)
+    brace_level = 0
+    pos = 0
+    end = len(string)
+    while pos < end:
+        char = string[pos]
+        if char == '{':
+            if brace_level == 0 and string.startswith('\\', pos + 1):
+                group_end = find_closing_brace(string, pos)
+                special_char = string[pos + 1:group_end]
+                if special_char != '\\':
+                    return u'{{{0}}}'.format(special_char)
+                pos = group_end + 1
+                continue
+            brace_level += 1
+        elif char == '}':
+            if brace_level > 0:
+                brace_level -= 1
         elif char.isalpha():
             return char
+        pos += 1
     return ''
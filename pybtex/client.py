@@ -0,0 +1,115 @@
+# Copyright (c) 2009, 2010, 2011, 2012  Andrey Golovizin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""A thin client for the pybtex server (see pybtex.server).
+
+The client sends its command line arguments and working directory to a
+running "pybtex --server" and copies the output and the exit code of the
+server back. The .bbl file is written by the server directly. If no server
+is running, pybtex is run in the client process as usual.
+
+Messages are JSON objects, one per line. The client sends
+{"argv": [...], "cwd": "..."}, the server replies with any number of
+{"stream": "stdout" or "stderr", "data": "..."} messages followed by
+{"exit_code": N}.
+
+This module is imported on every client run, so it should not import
+anything but the standard library.
+"""
+
+import os
+import sys
+import json
+import socket
+import tempfile
+
+
+def get_socket_path():
+    """Return $PYBTEX_SOCKET or a per-user socket in the temporary directory."""
+
+    socket_path = os.environ.get('PYBTEX_SOCKET')
+    if socket_path:
+        return socket_path
+    return os.path.join(tempfile.gettempdir(), 'pybtex-%i.sock' % os.getuid())
+
+
+def connect(socket_path=None):
+    """Connect to the server and return the socket, or None if there is no server."""
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path or get_socket_path())
+    except socket.error:
+        sock.close()
+        return None
+    return sock
+
+
+def send_message(stream, message):
+    stream.write(json.dumps(message) + '\n')
+    stream.flush()
+
+
+def write_data(stream, data):
+    encoding = getattr(stream, 'encoding', None) or 'UTF-8'
+    stream.write(data.encode(encoding, 'replace'))
+    stream.flush()
+
+
+def request(argv, cwd=None, socket_path=None, stdout=None, stderr=None):
+    """Run pybtex on the server and return the exit code.
+
+    Return None if the server is not running.
+    """
+
+    sock = connect(socket_path)
+    if sock is None:
+        return None
+    streams = {
+        'stdout': stdout or sys.stdout,
+        'stderr': stderr or sys.stderr,
+    }
+    sock_file = sock.makefile('rwb')
+    try:
+        send_message(sock_file, {'argv': argv, 'cwd': cwd or os.getcwd()})
+        for line in sock_file:
+            message = json.loads(line)
+            if 'exit_code' in message:
+                return message['exit_code']
+            write_data(streams[message['stream']], message['data'])
+    finally:
+        sock_file.close()
+        sock.close()
+    write_data(streams['stderr'], u'ERROR: pybtex server closed the connection\n')
+    return 1
+
+
+def main():
+    exit_code = request(sys.argv[1:])
+    if exit_code is None:
+        from pybtex.__main__ import main as run_pybtex
+        run_pybtex()
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
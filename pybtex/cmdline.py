@@ -27,6 +27,7 @@ import optparse
 from pybtex.__version__ import version
 
 from pybtex import errors
+from pybtex.context import activate, get_current_context
 from pybtex.textutils import capfirst, add_period
 from pybtex.plugin import find_plugin, enumerate_plugin_names
 
@@ -69,14 +70,15 @@ class CommandLine(object):
     def __init__(self):
         self.opt_parser = self.make_option_parser()
 
-    def __call__(self):
+    def __call__(self, argv=None, context=None):
         from pybtex.exceptions import PybtexError
         import pybtex.io
-        try:
-            self.main()
-        except PybtexError, error:
-            errors.print_error(error)
-            sys.exit(1)
+        with activate(context):
+            try:
+                self.main(argv)
+            except PybtexError, error:
+                errors.print_error(error)
+                sys.exit(1)
 
     def make_option_parser(self):
         opt_parser = optparse.OptionParser(
@@ -103,6 +105,9 @@ class CommandLine(object):
     def run(self, options, args):
         raise NotImplementedError
 
+    def check_num_args(self, options, args):
+        return len(args) == self.num_args
+
     def recognize_legacy_optons(self, args):
         """Grok some legacy long options starting with a single `-'."""
         return [
@@ -110,12 +115,14 @@ class CommandLine(object):
             for arg in args
         ]
 
-    def main(self):
-        args = self.recognize_legacy_optons(sys.argv[1:])
+    def main(self, argv=None):
+        if argv is None:
+            argv = sys.argv[1:]
+        args = self.recognize_legacy_optons(argv)
         options, args = self.opt_parser.parse_args(args)
-        if len(args) != self.num_args:
+        if not self.check_num_args(options, args):
             self.opt_parser.print_help()
             sys.exit(1)
 
         self.run(options, args)
-        sys.exit(errors.error_code)
+        sys.exit(get_current_context().error_code)
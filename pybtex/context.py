@@ -0,0 +1,157 @@
+# Copyright (c) 2009, 2010, 2011, 2012  Andrey Golovizin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Per-run state: error handling policy and output streams.
+
+Each thread has a current context. By default it is default_context, which
+uses the global settings from pybtex.errors and pybtex.io, so that
+errors.enable_strict_mode(), errors.capture() and errors.error_code work
+as before. To run several bibliographies independently (e.g. in several
+threads), give each of them its own Context:
+
+>>> from StringIO import StringIO
+>>> from pybtex.exceptions import PybtexError
+>>> context = Context(stderr=StringIO())
+>>> with activate(context):
+...     errors.report_error(PybtexError('something is wrong'))
+>>> print context.stderr.getvalue().strip()
+WARNING: Something is wrong.
+>>> context.error_code
+2
+>>> get_current_context() is default_context
+True
+
+The functions in pybtex.errors report to the current context. Parsers and
+the BibTeX interpreter remember the context they were created in.
+Caches of pure functions (see pybtex.utils.lru_cache) are thread-safe and
+shared by all contexts. A context may also carry a cache of parsed input
+files (see pybtex.diskcache.MemoryCache), which is used by the pybtex
+server to keep .bib and .bst data between runs.
+
+Each context has its own pybtex.kpathsea.Resolver, so input files are
+looked up in the TeX search path once per run. The default context lives as
+long as the process, so it gets a new Resolver each time it is activated
+(the engines activate it for each run). Outside of activate() it does not
+remember the results at all.
+
+>>> with activate():
+...     resolver = get_current_context().resolver
+...     get_current_context().resolver is resolver
+True
+>>> with activate():
+...     get_current_context().resolver is resolver
+False
+"""
+
+import threading
+from contextlib import contextmanager
+
+import pybtex.io
+from pybtex import errors
+from pybtex.kpathsea import Resolver
+
+
+class Context(object):
+    num_errors = 0
+
+    def __init__(self, strict=False, stderr=None, stdout=None, cache=None, resolver=None):
+        self.strict = strict
+        self.stderr = stderr if stderr is not None else pybtex.io.stderr
+        self.stdout = stdout if stdout is not None else pybtex.io.stdout
+        self.cache = cache
+        self.resolver = resolver if resolver is not None else Resolver()
+        self.error_code = 0
+
+    def print_error(self, exception, prefix='ERROR: '):
+        print >>self.stderr, errors.format_error(exception, prefix)
+
+    def report_error(self, exception):
+        if self.strict:
+            raise exception
+        else:
+            self.print_error(exception, 'WARNING: ')
+            self.error_code = 2
+            self.num_errors += 1
+
+
+class DefaultContext(Context):
+    """Context using the global settings from pybtex.errors and pybtex.io."""
+
+    cache = None
+
+    def __init__(self):
+        pass
+
+    @property
+    def resolver(self):
+        resolver = getattr(_local, 'resolver', None)
+        return resolver if resolver is not None else Resolver()
+
+    @property
+    def strict(self):
+        return errors.strict
+
+    @property
+    def stderr(self):
+        return errors.stderr
+
+    @property
+    def stdout(self):
+        return pybtex.io.stdout
+
+    def _get_error_code(self):
+        return errors.error_code
+
+    def _set_error_code(self, error_code):
+        errors.error_code = error_code
+
+    error_code = property(_get_error_code, _set_error_code)
+
+
+default_context = DefaultContext()
+_local = threading.local()
+
+
+def get_current_context():
+    return getattr(_local, 'context', default_context)
+
+
+@contextmanager
+def activate(context=None):
+    """Make the context current in this thread inside the with block.
+
+    If context is None, the current context stays active.
+    """
+
+    previous_context = get_current_context()
+    if context is None:
+        context = previous_context
+    new_run = context is default_context and getattr(_local, 'resolver', None) is None
+    if new_run:
+        _local.resolver = Resolver()
+    _local.context = context
+    try:
+        yield context
+    finally:
+        _local.context = previous_context
+        if new_run:
+            _local.resolver = None
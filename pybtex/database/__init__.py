@@ -35,9 +35,55 @@ class BibliographyDataError(PybtexError):
     pass
 
 
+class LazyEntry(object):
+    """A placeholder for an entry that is created on first access.
+
+    load() must return the Entry. Lazy entries must not have
+    a crossref field, as they are added to BibliographyData
+    without looking at their fields.
+    """
+
+    collection = None
+    key = None
+
+    def __init__(self, load):
+        self.load = load
+
+
+class LazyEntryDict(OrderedCaseInsensitiveDict):
+    """An OrderedCaseInsensitiveDict that replaces LazyEntry values
+    with real entries on first access.
+
+    >>> entries = LazyEntryDict()
+    >>> entries['uno'] = LazyEntry(lambda: Entry('article'))
+    >>> entries['dos'] = Entry('book')
+    >>> entries.keys()
+    ['uno', 'dos']
+    >>> entries._dict['uno']  # doctest: +ELLIPSIS
+    <pybtex.database.LazyEntry object at ...>
+    >>> entries['UNO']
+    Entry('article', fields={}, persons={})
+    >>> entries._dict['uno']
+    Entry('article', fields={}, persons={})
+
+    """
+
+    def __getitem__(self, key):
+        entry = super(LazyEntryDict, self).__getitem__(key)
+        if isinstance(entry, LazyEntry):
+            lazy_entry = entry
+            entry = lazy_entry.load()
+            entry.collection = lazy_entry.collection
+            entry.key = lazy_entry.key
+            self._dict[self._keys[key.lower()]] = entry
+        return entry
+
+
 class BibliographyData(object):
+    entries_class = OrderedCaseInsensitiveDict
+
     def __init__(self, entries=None, preamble=None, wanted_entries=None, min_crossrefs=2):
-        self.entries = OrderedCaseInsensitiveDict()
+        self.entries = self.entries_class()
         self.crossref_count = CaseInsensitiveDefaultDict(int)
         self.min_crossrefs = min_crossrefs
         self._preamble = []
@@ -88,8 +134,9 @@ class BibliographyData(object):
             return
         entry.collection = self
         entry.key = key
-        entry.key = key
         self.entries[key] = entry
+        if isinstance(entry, LazyEntry):
+            return
         try:
             crossref = entry.fields['crossref']
         except KeyError:
@@ -205,6 +252,29 @@ class BibliographyData(object):
         return expanded_citations + crossrefs
 
 
+class LazyBibliographyData(BibliographyData):
+    """BibliographyData that can hold LazyEntry objects.
+
+    Entries are created when they are accessed with entries[key]
+    (or entries.values(), entries.items(), etc.), iteration over the keys
+    does not create them.
+
+    >>> data = LazyBibliographyData()
+    >>> data.add_entry('uno', Entry('article', {'crossref': 'dos'}))
+    >>> data.add_entry('dos', LazyEntry(lambda: Entry('book', {'title': 'Two'})))
+    >>> list(data.entries)
+    ['uno', 'dos']
+    >>> print data.entries['uno'].fields['title']
+    Two
+    >>> entry = data.entries['dos']
+    >>> entry.key, entry.collection is data
+    ('dos', True)
+
+    """
+
+    entries_class = LazyEntryDict
+
+
 class FieldDict(dict):
     def __init__(self, parent, *args, **kwargw):
         self.parent = parent
@@ -235,9 +305,6 @@ class Entry(object):
         self.persons = dict(persons)
         self.collection = collection
 
-        # for BibTeX interpreter
-        self.vars = {}
-
     def __eq__(self, other):
         if not isinstance(other, Entry):
             return super(Entry, self) == other
@@ -21,9 +21,15 @@
 
 """convert bibliography database from one format to another
 """
+import os
+import time
+from itertools import izip
 from os import path
+from pybtex import errors
 from pybtex.exceptions import PybtexError
-from pybtex.plugin import find_plugin
+from pybtex.plugin import find_plugin, PluginNotFound
+from pybtex.utils import CaseInsensitiveSet
+from pybtex.database import BibliographyDataError
 
 class ConvertError(PybtexError):
     pass
@@ -32,14 +38,204 @@ class ConvertError(PybtexError):
 def convert(from_filename, to_filename,
         from_format=None, to_format=None,
         input_encoding=None, output_encoding=None,
-        parser_options=None):
+        parser_options=None, streaming=False):
+    """Convert a bibliography database from one format to another.
+
+    If streaming is True and both formats support it, entries are written
+    as soon as they are read, so memory usage does not depend on the size of
+    the database. Otherwise the whole database is read into memory first.
+    "-" means standard input or output.
+    """
+
     if parser_options is None:
         parser_options = {}
     input_format = find_plugin('pybtex.database.input', name=from_format, filename=from_filename)
     output_format = find_plugin('pybtex.database.output', name=to_format, filename=to_filename)
     
-    if from_filename == to_filename:
+    if from_filename == to_filename and from_filename != '-':
         raise ConvertError('input and output file can not be the same')
 
-    bib_data = input_format(input_encoding, **parser_options).parse_file(from_filename)
-    output_format(output_encoding).write_file(bib_data, to_filename)
+    parser = input_format(input_encoding, **parser_options)
+    writer = output_format(output_encoding)
+    if streaming and parser.streaming and writer.streaming:
+        parser.filename = from_filename
+        with parser.open_file(from_filename) as input_stream:
+            with writer.open_file(to_filename) as output_stream:
+                entries = unique_entries(parser.iter_entries(input_stream))
+                writer.write_entries(parser.data, entries, output_stream)
+    else:
+        bib_data = parser.parse_file(from_filename)
+        writer.write_file(bib_data, to_filename)
+
+
+def unique_entries(entries):
+    """Skip repeated entries, like BibliographyData.add_entry() does."""
+
+    keys = CaseInsensitiveSet()
+    for key, entry in entries:
+        if key in keys:
+            errors.report_error(BibliographyDataError('repeated bibliograhpy entry: %s' % key))
+            continue
+        keys.add(key)
+        yield key, entry
+
+
+def find_input_files(paths, from_format=None):
+    """Yield (filename, base_dir) pairs for the given files and directories.
+
+    Directories are searched recursively for files of the given format (or
+    of any known format if from_format is None). base_dir is the directory
+    the file was found in, or None for files given explicitly.
+    """
+
+    known_suffixes = {}
+
+    def is_known_file_type(filename):
+        suffix = path.splitext(filename)[1]
+        if suffix not in known_suffixes:
+            try:
+                input_format = find_plugin('pybtex.database.input', name=from_format, filename=filename)
+            except PluginNotFound:
+                known_suffixes[suffix] = False
+            else:
+                known_suffixes[suffix] = suffix in input_format.suffixes
+        return known_suffixes[suffix]
+
+    for filename in paths:
+        if not path.isdir(filename):
+            yield filename, None
+            continue
+        for dirpath, dirnames, filenames in os.walk(filename):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if is_known_file_type(name):
+                    yield path.join(dirpath, name), filename
+
+
+def make_output_filename(filename, base_dir, to_format, output_dir=None):
+    """Replace the suffix of the filename with the default suffix of to_format.
+
+    If output_dir is given, the file is placed there, keeping its path
+    relative to base_dir.
+
+    >>> from pybtex.database.output.bibyaml import Writer
+    >>> print make_output_filename('a/b/c.bib', None, Writer)
+    a/b/c.yaml
+    >>> print make_output_filename('a/b/c.bib', None, Writer, 'out')
+    out/c.yaml
+    >>> print make_output_filename('a/b/c.bib', 'a', Writer, 'out')
+    out/b/c.yaml
+    """
+
+    output_format = find_plugin('pybtex.database.output', name=to_format)
+    basename = path.splitext(filename)[0] + output_format.get_default_suffix()
+    if output_dir is None:
+        return basename
+    if base_dir is None:
+        return path.join(output_dir, path.basename(basename))
+    return path.join(output_dir, path.relpath(basename, base_dir))
+
+
+def check_output_filenames(jobs):
+    """Raise ConvertError if several files would be converted to the same file.
+
+    >>> check_output_filenames([('a/x.bib', 'out/x.yaml'), ('b/y.bib', 'out/y.yaml')])
+    >>> check_output_filenames([('a/x.bib', 'out/x.yaml'), ('b/x.bib', 'out/x.yaml')])
+    Traceback (most recent call last):
+    ...
+    ConvertError: output file out/x.yaml would be written for both a/x.bib and b/x.bib
+    """
+
+    input_filenames = {}
+    for from_filename, to_filename in jobs:
+        output_filename = path.normcase(path.abspath(to_filename))
+        if output_filename in input_filenames:
+            raise ConvertError(u'output file {0} would be written for both {1} and {2}'.format(
+                to_filename, input_filenames[output_filename], from_filename,
+            ))
+        input_filenames[output_filename] = from_filename
+
+
+def _convert_job(job):
+    """Run a single conversion and return a (message, error_code, size, time) tuple."""
+
+    from_filename, to_filename, kwargs = job
+    errors.error_code = 0
+    start = time.time()
+    try:
+        output_dir = path.dirname(to_filename)
+        if output_dir and not path.isdir(output_dir):
+            os.makedirs(output_dir)
+        convert(from_filename, to_filename, **kwargs)
+    except PybtexError, error:
+        if error.filename is None:
+            error.filename = from_filename
+        return errors.format_error(error), 1, 0, time.time() - start
+    except Exception, error:
+        message = u'{0}: ERROR: {1}'.format(from_filename, error)
+        return message, 1, 0, time.time() - start
+    return None, errors.error_code, path.getsize(from_filename), time.time() - start
+
+
+def convert_batch(jobs, processes=None, **kwargs):
+    """Convert many files in a pool of worker processes.
+
+    jobs is a list of (from_filename, to_filename) pairs; other keyword
+    arguments are passed to convert(). Failed conversions are reported and
+    do not stop the batch. Returns a BatchResult.
+    """
+
+    check_output_filenames(jobs)
+    tasks = [(from_filename, to_filename, kwargs) for from_filename, to_filename in jobs]
+    result = BatchResult()
+    if processes == 1:
+        results = (_convert_job(task) for task in tasks)
+        pool = None
+    else:
+        from multiprocessing import Pool
+        pool = Pool(processes)
+        results = pool.imap(_convert_job, tasks)
+    try:
+        for (from_filename, to_filename, kwargs), job_result in izip(tasks, results):
+            result.add(from_filename, *job_result)
+    finally:
+        if pool is not None:
+            pool.terminate()
+    result.finish()
+    return result
+
+
+class BatchResult(object):
+    def __init__(self):
+        self.start = time.time()
+        self.elapsed = None
+        self.num_files = 0
+        self.failed = []
+        self.size = 0
+        self.error_code = 0
+
+    def add(self, filename, message, error_code, size, seconds):
+        self.num_files += 1
+        self.size += size
+        self.error_code = max(self.error_code, error_code)
+        if message is not None:
+            self.failed.append(filename)
+            print >>errors.stderr, message
+
+    def finish(self):
+        self.elapsed = time.time() - self.start
+
+    def summary(self):
+        elapsed = max(self.elapsed, 1e-6)
+        return (
+            u'converted {converted} of {total} files '
+            u'({megabytes:.1f} MB) in {elapsed:.2f} s: '
+            u'{files_per_second:.1f} files/s, {mb_per_second:.2f} MB/s'
+        ).format(
+            converted=self.num_files - len(self.failed),
+            total=self.num_files,
+            megabytes=self.size / 1e6,
+            elapsed=self.elapsed,
+            files_per_second=self.num_files / elapsed,
+            mb_per_second=self.size / 1e6 / elapsed,
+        )
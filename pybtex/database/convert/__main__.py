@@ -33,6 +33,12 @@ class PybtexConvertCommandLine(CommandLine):
 pybtex-convert converts bibliography database files between supported formats
 (currently BibTeX, BibTeXML and YAML).
 
+Use "-" as a file name to read from standard input or write to standard
+output.
+
+With --batch, many files are converted in parallel, for example:
+pybtex-convert --batch -t yaml -o yaml-dir bib-dir
+
     """.strip()
 
     num_args = 2
@@ -54,6 +60,26 @@ pybtex-convert converts bibliography database files between supported formats
                 action='store_true', dest='keyless_entries',
                 help='allow BibTeX entries without keys and generate unnamed-<number> keys for them'
             ),
+            make_option(
+                '--batch',
+                action='store_true', dest='batch',
+                help='convert many files at once: with --to, every argument is an input file or a directory to search for input files, otherwise arguments are pairs of input and output files'
+            ),
+            make_option(
+                '-j', '--jobs',
+                type='int', dest='jobs', metavar='NUMBER',
+                help='number of parallel conversions in batch mode; default is the number of CPUs'
+            ),
+            make_option(
+                '-o', '--output-dir',
+                dest='output_dir', metavar='DIR',
+                help='directory to write output files to in batch mode; default is next to the input files'
+            ),
+            make_option(
+                '--stream',
+                action='store_true', dest='streaming',
+                help='write entries as soon as they are read instead of loading the whole database into memory, if both formats allow it'
+            ),
         )),
         ('encoding options', (
             make_option(
@@ -76,17 +102,58 @@ pybtex-convert converts bibliography database files between supported formats
     )
     option_defaults = {
         'keyless_entries': False,
+        'streaming': False,
+        'batch': False,
     }
 
+    def check_num_args(self, options, args):
+        if not options.batch:
+            return len(args) == self.num_args
+        elif options.to_format:
+            return len(args) >= 1
+        else:
+            return len(args) >= 2 and len(args) % 2 == 0
+
     def run(self, options, args):
         from pybtex.database.convert import convert, ConvertError
 
+        if options.batch:
+            return self.run_batch(options, args)
+
         convert(args[0], args[1],
                 options.from_format,
                 options.to_format,
                 input_encoding=options.input_encoding or options.encoding,
                 output_encoding=options.output_encoding or options.encoding,
-                parser_options = {'keyless_entries': options.keyless_entries})
+                parser_options = {'keyless_entries': options.keyless_entries},
+                streaming=options.streaming)
+
+    def run_batch(self, options, args):
+        import sys
+        from pybtex import errors
+        from pybtex.database.convert import (
+            convert_batch, find_input_files, make_output_filename,
+        )
+
+        if options.to_format:
+            jobs = [
+                (filename, make_output_filename(filename, base_dir, options.to_format, options.output_dir))
+                for filename, base_dir in find_input_files(args, options.from_format)
+            ]
+        else:
+            jobs = zip(args[::2], args[1::2])
+
+        result = convert_batch(jobs, options.jobs,
+                from_format=options.from_format,
+                to_format=options.to_format,
+                input_encoding=options.input_encoding or options.encoding,
+                output_encoding=options.output_encoding or options.encoding,
+                parser_options = {'keyless_entries': options.keyless_entries},
+                streaming=options.streaming)
+        print >>errors.stderr, result.summary()
+        if result.failed:
+            sys.exit(1)
+        errors.error_code = result.error_code
 
 main = PybtexConvertCommandLine()
 
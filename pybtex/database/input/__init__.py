@@ -21,11 +21,14 @@
 
 from __future__ import with_statement
 
+import os
+import hashlib
 from os import path
 
 import pybtex.io
 from pybtex.plugin import Plugin
-from pybtex.database import BibliographyData
+from pybtex.context import get_current_context, activate
+from pybtex.database import BibliographyData, Entry
 from pybtex.exceptions import PybtexError
 
 
@@ -34,20 +37,36 @@ class BaseParser(Plugin):
     filename = '<INPUT>'
 
     unicode_io = False
+    streaming = False
+    data_class = BibliographyData
 
-    def __init__(self, encoding=None, wanted_entries=None, min_crossrefs=2, **kwargs):
+    def __init__(self, encoding=None, wanted_entries=None, min_crossrefs=2, context=None, **kwargs):
         self.encoding = encoding or pybtex.io.get_default_encoding()
-        self.data = BibliographyData(
-            wanted_entries=wanted_entries,
-            min_crossrefs=min_crossrefs,
+        self.context = context if context is not None else get_current_context()
+        self.wanted_entries = wanted_entries
+        self.min_crossrefs = min_crossrefs
+        self.data = self.make_data()
+
+    def make_data(self):
+        return self.data_class(
+            wanted_entries=self.wanted_entries,
+            min_crossrefs=self.min_crossrefs,
         )
 
+    def open_file(self, filename):
+        """Open the file for reading, or standard input if filename is "-"."""
+
+        if filename == '-':
+            mode = 'r' if self.unicode_io else 'rb'
+            return pybtex.io.open_std_stream(mode, encoding=self.encoding)
+        open_file = pybtex.io.open_unicode if self.unicode_io else pybtex.io.open_raw
+        return open_file(filename, encoding=self.encoding)
+
     def parse_file(self, filename, file_suffix=None):
         if file_suffix is not None:
             filename = filename + file_suffix
         self.filename = filename
-        open_file = pybtex.io.open_unicode if self.unicode_io else pybtex.io.open_raw
-        with open_file(filename, encoding=self.encoding) as f:
+        with self.open_file(filename) as f:
             try:
                 self.parse_stream(f)
             except UnicodeDecodeError, e:
@@ -55,9 +74,97 @@ class BaseParser(Plugin):
         return self.data
 
     def parse_files(self, base_filenames, file_suffix=None):
-        for filename in base_filenames:
-            self.parse_file(filename, file_suffix)
+        """Parse the files and return the resulting BibliographyData.
+
+        If the context has a memory cache (see pybtex.context), files that
+        have not changed since the last run are not parsed again.
+        """
+
+        with activate(self.context):
+            cache = self.context.cache
+            for filename in base_filenames:
+                cache_key = None
+                if cache is not None:
+                    cache_key = self.get_cache_key(filename, file_suffix)
+                if cache_key is not None:
+                    parsed_data = cache.load(cache_key)
+                    if parsed_data is not None:
+                        self.add_parsed_data(*parsed_data)
+                        continue
+
+                num_errors = self.context.num_errors
+                num_entries = len(self.data.entries)
+                num_preamble_items = len(self.data._preamble)
+                self.parse_file(filename, file_suffix)
+                # do not cache data with errors, or the warnings would be lost
+                if cache_key is not None and self.context.num_errors == num_errors:
+                    cache.save(cache_key, self.get_parsed_data(num_entries, num_preamble_items))
         return self.data
 
+    def get_parsed_data(self, num_entries, num_preamble_items):
+        """Return the entries and the preamble added after the given position."""
+
+        entries = []
+        for key in self.data.entries.keys()[num_entries:]:
+            entry = self.data.entries[key]
+            # copy the entry without the reference to the whole collection
+            entries.append((key, Entry(entry.type, entry.fields, entry.persons)))
+        return entries, self.data._preamble[num_preamble_items:]
+
+    def add_parsed_data(self, entries, preamble):
+        for key, entry in entries:
+            self.data.add_entry(key, entry)
+        self.data.add_to_preamble(*preamble)
+
+    def get_cache_key(self, filename, file_suffix=None):
+        """Return a key identifying the data parsed from the file,
+        or None if the data cannot be cached.
+
+        What is added to self.data depends on what is already there,
+        so the key includes the relevant state of self.data.
+        """
+
+        if file_suffix is not None:
+            filename = filename + file_suffix
+        if filename == '-':
+            return None
+        filename = pybtex.io.resolve_filename(filename)
+        try:
+            stat = os.stat(filename)
+        except EnvironmentError:
+            return None
+        return (
+            type(self).__module__, type(self).__name__,
+            self.encoding, self.data.min_crossrefs, self.get_cache_options(),
+            (path.abspath(filename), stat.st_mtime, stat.st_size),
+            self.get_data_state(),
+        )
+
+    def get_data_state(self):
+        data = self.data
+        wanted_entries = data.wanted_entries
+        if wanted_entries is not None:
+            wanted_entries = sorted(wanted_entries)
+        state = (
+            sorted(key.lower() for key in data.entries),
+            wanted_entries,
+            sorted((key.lower(), count) for key, count in data.crossref_count.iteritems()),
+        )
+        return hashlib.sha1(repr(state)).hexdigest()
+
+    def get_cache_options(self):
+        """Return a hashable value describing parser options that
+        affect the parsed data."""
+
+        return ()
+
     def parse_stream(self, stream):
         raise NotImplementedError
+
+    def iter_entries(self, stream):
+        """Parse the stream incrementally and yield (key, entry) pairs.
+
+        Entries are not added to self.data, but the preamble is.
+        Only supported by parsers with streaming = True.
+        """
+        raise NotImplementedError
@@ -62,8 +62,11 @@ Gaub, Hermann E.
 from string import ascii_letters, digits
 
 import re
+import hashlib
+from bisect import bisect_right
+
 import pybtex.io
-from pybtex.database import Entry, Person
+from pybtex.database import Entry, Person, LazyEntry, LazyBibliographyData
 from pybtex.database.input import BaseParser
 from pybtex.bibtex.utils import split_name_list
 from pybtex.exceptions import PybtexError
@@ -104,6 +107,36 @@ class SkipEntry(Exception):
 class UndefinedMacro(PybtexSyntaxError):
     error_type = 'Undefined string'
 
+
+class IncompleteCommand(Exception):
+    pass
+
+
+def split_commands(lines):
+    r"""Group lines into chunks, each starting with a line beginning with "@".
+
+    A chunk usually contains exactly one command, but a command may span
+    several chunks if some line inside it starts with "@".
+
+    >>> list(split_commands([
+    ...     '% comment\n',
+    ...     '@string{x = "x"}\n',
+    ...     '@article{a,\n',
+    ...     '  title = "a"}\n',
+    ...     '  @book{b}',
+    ... ]))
+    ['% comment\n', '@string{x = "x"}\n', '@article{a,\n  title = "a"}\n', '  @book{b}']
+    """
+
+    chunk = []
+    for line in lines:
+        if chunk and line.lstrip().startswith('@'):
+            yield ''.join(chunk)
+            chunk = []
+        chunk.append(line)
+    if chunk:
+        yield ''.join(chunk)
+
 class BibTeXEntryIterator(Scanner):
     NAME_CHARS = ascii_letters + u'@!$&*+-./:;<>?[\\]^_`|~\x7f'
     NAME = Pattern(ur'[{0}][{1}]*'.format(re.escape(NAME_CHARS), re.escape(NAME_CHARS + digits)), 'a valid name')
@@ -121,6 +154,7 @@ class BibTeXEntryIterator(Scanner):
     AT = Literal(u'@')
 
     command_start = None
+    command_end = None
     current_command = None
     current_entry_key = None
     current_fields = None
@@ -161,18 +195,29 @@ class BibTeXEntryIterator(Scanner):
         return True
 
     def parse_bibliography(self):
+        """Yield the parsed commands.
+
+        After each command is yielded, the source span of the command is
+        available as text[command_start:command_end], and the names of the
+        macros it used are in current_macros_used.
+        """
+
         while True:
             if not self.skip_to([self.AT]):
                 return
             self.command_start = self.pos - 1
             try:
-                yield tuple(self.parse_command())
+                command = tuple(self.parse_command())
             except PybtexSyntaxError as error:
                 self.handle_error(error)
             except SkipEntry:
                 pass
+            else:
+                self.command_end = self.pos
+                yield command
 
     def parse_command(self):
+        self.current_macros_used = set()
         self.current_command = None
         self.current_entry_key = None
         self.current_fields = []
@@ -270,6 +315,7 @@ class BibTeXEntryIterator(Scanner):
         return ''.join(part.value for part in parts)[:-1]
 
     def substitute_macro(self, name):
+        self.current_macros_used.add(name.lower())
         try:
             return self.macros[name.lower()]
         except KeyError:
@@ -295,27 +341,470 @@ class BibTeXEntryIterator(Scanner):
                 raise PybtexSyntaxError('unbalanced braces', self)
 
 
+class LazyBibTeXEntryIterator(BibTeXEntryIterator):
+    """A BibTeXEntryIterator that does not parse the fields of entries.
+
+    Instead of the list of fields, entries get a function that parses
+    the fields when called. The end of an entry is found by matching
+    braces. After a syntax error, BibTeXEntryIterator goes on at the next
+    @, so entries with an @ in the body are parsed right away, as well as
+    entries delimited with parentheses and entries that may have a
+    crossref field.
+
+    >>> entries = list(LazyBibTeXEntryIterator(u'''
+    ... @string{j = "Journal"}
+    ... @article{one, title = {One {TeX}}, journal = j}
+    ... @string{j = "Magazine"}
+    ... '''))
+    >>> entry_type, (key, load_fields) = entries[1]
+    >>> print key
+    one
+    >>> load_fields()
+    [(u'title', [u'One {TeX}']), (u'journal', [u'Journal'])]
+
+    """
+
+    BRACES = re.compile(ur'[{}@]')
+    CROSSREF = re.compile(ur'crossref', re.IGNORECASE)
+
+    command_lineno = None
+    lazy_body = False
+
+    def parse_command(self):
+        self.command_lineno = self.lineno
+        return super(LazyBibTeXEntryIterator, self).parse_command()
+
+    def parse_string_body(self, body_end):
+        # do not change the macros seen by the entries parsed so far
+        self.macros = dict(self.macros)
+        super(LazyBibTeXEntryIterator, self).parse_string_body(body_end)
+
+    def parse_entry_body(self, body_end):
+        self.lazy_body = body_end is self.RBRACE and not self.keyless_entries
+        super(LazyBibTeXEntryIterator, self).parse_entry_body(body_end)
+
+    def parse_entry_fields(self):
+        body_end = self.find_body_end() if self.lazy_body else None
+        if body_end is None or self.CROSSREF.search(self.text, self.pos, body_end):
+            return super(LazyBibTeXEntryIterator, self).parse_entry_fields()
+        self.current_fields = self.make_field_loader()
+        self.lineno += self.text.count('\n', self.pos, body_end) + self.text.count('\r', self.pos, body_end)
+        self.pos = body_end
+
+    def find_body_end(self):
+        """Return the position of the closing brace of the entry body,
+        or None if the body cannot be skipped safely."""
+
+        level = 0
+        for brace in self.BRACES.finditer(self.text, self.pos):
+            if brace.group() == u'@':
+                return None
+            elif brace.group() == u'{':
+                level += 1
+            elif level:
+                level -= 1
+            else:
+                return brace.start()
+        return None
+
+    def make_field_loader(self):
+        command_start = self.command_start
+        command_lineno = self.command_lineno
+        macros = self.macros
+
+        def load_fields():
+            entry_iterator = BibTeXEntryIterator(
+                self.text,
+                keyless_entries=self.keyless_entries,
+                macros=macros,
+                handle_error=self.handle_error,
+                filename=self.filename,
+            )
+            entry_iterator.pos = command_start
+            entry_iterator.lineno = command_lineno
+            entry_type, (key, fields) = next(iter(entry_iterator))
+            return fields
+        return load_fields
+
+
+def common_prefix_length(a, b, block_size=4096):
+    """Return the length of the common prefix of two strings.
+
+    The strings are compared block by block, then character by character.
+
+    >>> common_prefix_length('abcdef', 'abcxyz', block_size=2)
+    3
+    >>> common_prefix_length('abc', 'abcd')
+    3
+    >>> common_prefix_length('abc', 'xyz')
+    0
+    """
+
+    max_length = min(len(a), len(b))
+    length = 0
+    while length < max_length and a[length:length + block_size] == b[length:length + block_size]:
+        length += block_size
+    length = min(length, max_length)
+    end = min(length + block_size, max_length)
+    while length < end and a[length] == b[length]:
+        length += 1
+    return length
+
+
+def common_suffix_length(a, b, max_length, block_size=4096):
+    """Return the length of the common suffix of two strings,
+    but no more than max_length.
+
+    >>> common_suffix_length('abcdef', 'xyzdef', 6, block_size=2)
+    3
+    >>> common_suffix_length('abcdef', 'xyzdef', 2)
+    2
+    >>> common_suffix_length('abc', 'xyz', 3)
+    0
+    """
+
+    length = 0
+    while length + block_size <= max_length and a[len(a) - length - block_size:len(a) - length] == b[len(b) - length - block_size:len(b) - length]:
+        length += block_size
+    end = min(length + block_size, max_length)
+    while length < end and a[len(a) - length - 1] == b[len(b) - length - 1]:
+        length += 1
+    return length
+
+
+class ParsedCommand(object):
+    """A command parsed by Parser.parse_incremental().
+
+    For entries, value is a (key, entry) pair, for @string commands it is
+    a (macro name, macro value after the command) pair, and for @preamble
+    it is the preamble text. Unnamed entries have None for the key.
+    """
+
+    def __init__(self, command, value, text_hash, macros_used, has_errors=False):
+        self.command = command
+        self.value = value
+        self.text_hash = text_hash
+        self.macros_used = macros_used
+        self.has_errors = has_errors
+
+    def is_entry(self):
+        return self.command not in ('string', 'preamble')
+
+
+class ParsedText(object):
+    """The result of Parser.parse_incremental().
+
+    Besides the BibliographyData, it keeps the source text and the parsed
+    commands: text[starts[i]:ends[i]] is the source of commands[i].
+    """
+
+    def __init__(self, text, data, commands, starts, ends):
+        self.text = text
+        self.data = data
+        self.commands = commands
+        self.starts = starts
+        self.ends = ends
+
+
 class Parser(BaseParser):
     name = 'bibtex'
     suffixes = '.bib',
     unicode_io = True
+    streaming = True
 
     macros = None
+    # iter_entries() gives up waiting for the end of a command
+    # once this many characters have been buffered
+    max_command_size = 1024 * 1024
 
     def __init__(self,
             encoding=None,
             macros=month_names,
             person_fields=Person.valid_roles,
             keyless_entries=False,
+            lazy=False,
             **kwargs
         ):
+        self.lazy = lazy
+        if lazy:
+            self.data_class = LazyBibliographyData
         BaseParser.__init__(self, encoding, **kwargs)
 
         self.macros = dict(macros)
         self.person_fields = person_fields
         self.keyless_entries = keyless_entries
 
+    def get_cache_options(self):
+        return (
+            tuple(sorted(self.macros.iteritems())),
+            tuple(self.person_fields),
+            self.keyless_entries,
+        )
+
+    def parse_incremental(self, text, previous=None):
+        r"""Parse the text and return a ParsedText object.
+
+        If previous (the ParsedText returned by the previous call) is given,
+        only the commands touched by the edit are parsed again, together
+        with the commands using the @string macros whose values have
+        changed. The previous object is updated and returned; its
+        BibliographyData is updated in place when possible.
+
+        Unlike parse_stream(), this method parses all entries,
+        even the unwanted ones.
+
+        >>> parser = Parser()
+        >>> parsed = parser.parse_incremental(u'''
+        ... @string{j = "Journal"}
+        ... @article{one, title = "One", journal = j}
+        ... @article{two, title = "Two"}
+        ... ''')
+        >>> print parsed.data.entries['one'].fields['journal']
+        Journal
+        >>> two = parsed.data.entries['two']
+        >>> parsed = parser.parse_incremental(parsed.text.replace('"One"', '"One!"'), parsed)
+        >>> print parsed.data.entries['one'].fields['title']
+        One!
+        >>> parsed.data.entries['two'] is two
+        True
+        >>> parsed = parser.parse_incremental(parsed.text.replace('"Journal"', '"Magazine"'), parsed)
+        >>> print parsed.data.entries['one'].fields['journal']
+        Magazine
+        >>> parsed = parser.parse_incremental(parsed.text + u'@misc{three}\n', parsed)
+        >>> parsed.data.entries.keys()
+        [u'one', u'two', u'three']
+
+        """
+
+        if previous is None or self.keyless_entries:
+            return self.parse_text_with_spans(text)
+        return self.reparse_text(text, previous)
+
+    def count_lines(self, text, start, end):
+        """Count line breaks in text[start:end] the way Scanner does."""
+
+        return text.count('\n', start, end) + text.count('\r', start, end)
+
+    def make_span_iterator(self, text, pos, macros, handle_error, lineno=None):
+        if lineno is None:
+            lineno = 1 + self.count_lines(text, 0, pos)
+        entry_iterator = BibTeXEntryIterator(
+            text,
+            keyless_entries=self.keyless_entries,
+            handle_error=handle_error,
+            filename=self.filename,
+            macros=macros,
+        )
+        entry_iterator.pos = pos
+        entry_iterator.lineno = lineno
+        return entry_iterator
+
+    def make_parsed_command(self, entry_iterator, command, has_errors):
+        entry_type, args = command
+        macros_used = frozenset(entry_iterator.current_macros_used)
+        if entry_type == 'string':
+            name = args[0]
+            value = name, entry_iterator.macros.get(name)
+            if has_errors:
+                # the value may be left over from an earlier @string
+                macros_used |= frozenset([name])
+        elif entry_type == 'preamble':
+            value = textutils.normalize_whitespace(self.flatten_value_list(*args))
+        else:
+            key, entry = self.make_entry(entry_type, *args)
+            # unnamed entries are numbered in make_parsed_data()
+            value = args[0], entry
+        source = entry_iterator.text[entry_iterator.command_start:entry_iterator.command_end]
+        return ParsedCommand(
+            entry_type, value,
+            text_hash=hashlib.sha1(source.encode('UTF-8')).digest(),
+            macros_used=macros_used,
+            has_errors=has_errors,
+        )
+
+    def iter_parsed_commands(self, text, pos, macros, lineno=None):
+        def handle_error(error):
+            errors.append(error)
+            self.handle_error(error)
+
+        errors = []
+        entry_iterator = self.make_span_iterator(text, pos, macros, handle_error, lineno)
+        for command in entry_iterator:
+            yield (
+                self.make_parsed_command(entry_iterator, command, bool(errors)),
+                entry_iterator.command_start,
+                entry_iterator.command_end,
+            )
+            del errors[:]
+
+    def make_parsed_data(self, commands):
+        data = self.make_data()
+        unnamed_entry_counter = 1
+        for command in commands:
+            if command.command == 'preamble':
+                data.add_to_preamble(command.value)
+            elif command.is_entry():
+                key, entry = command.value
+                if key is None:
+                    key = 'unnamed-%i' % unnamed_entry_counter
+                    unnamed_entry_counter += 1
+                data.add_entry(key, entry)
+        return data
+
+    def update_macros(self, macros, commands):
+        for command in commands:
+            if command.command == 'string':
+                name, value = command.value
+                if value is not None:
+                    macros[name] = value
+        return macros
+
+    def parse_text_with_spans(self, text):
+        self.unnamed_entry_counter = 1
+        commands = []
+        starts = []
+        ends = []
+        for command, start, end in self.iter_parsed_commands(text, 0, self.macros):
+            commands.append(command)
+            starts.append(start)
+            ends.append(end)
+        self.data = self.make_parsed_data(commands)
+        return ParsedText(text, self.data, commands, starts, ends)
+
+    def reparse_text(self, text, parsed):
+        old_text = parsed.text
+        commands, starts, ends = parsed.commands, parsed.starts, parsed.ends
+        if text == old_text:
+            return parsed
+        prefix = common_prefix_length(old_text, text)
+        suffix = common_suffix_length(old_text, text, min(len(old_text), len(text)) - prefix)
+        shift = len(text) - len(old_text)
+        new_change_end = len(text) - suffix
+
+        # restart right after the last command before the edit
+        first = bisect_right(ends, prefix)
+        # after a syntax error, the parser may have looked past the end of the command
+        while first and commands[first - 1].has_errors:
+            first -= 1
+        pos = ends[first - 1] if first else 0
+        macros = self.update_macros(dict(self.macros), commands[:first])
+        new_commands = []
+        new_starts = []
+        new_ends = []
+        last = len(commands)
+        for command, start, end in self.iter_parsed_commands(text, pos, macros):
+            new_commands.append(command)
+            new_starts.append(start)
+            new_ends.append(end)
+            if end >= new_change_end:
+                # the rest of the text is the same as before
+                index = bisect_right(ends, end - shift) - 1
+                if index >= first and ends[index] == end - shift:
+                    last = index + 1
+                    break
+        old_commands = commands[first:last]
+        commands[first:last] = new_commands
+        starts[first:] = new_starts + [start + shift for start in starts[last:]]
+        ends[first:] = new_ends + [end + shift for end in ends[last:]]
+        parsed.text = text
+        replaced = [(old_commands, new_commands)]
+
+        # parse the commands using the changed macros again
+        old_macros = self.update_macros(dict(macros), old_commands)
+        new_macros = self.update_macros(dict(macros), new_commands)
+        changed_macros = set(
+            name for name in set(old_macros) | set(new_macros)
+            if old_macros.get(name) != new_macros.get(name)
+        )
+        index = first + len(new_commands)
+        # count the lines incrementally, not from the start of the text for each command
+        line_pos = 0
+        lineno = 1
+        while changed_macros and index < len(commands):
+            old_command = new_command = commands[index]
+            if old_command.macros_used & changed_macros:
+                lineno += self.count_lines(text, line_pos, starts[index])
+                line_pos = starts[index]
+                new_command, start, end = next(self.iter_parsed_commands(
+                    text, starts[index], new_macros, lineno,
+                ))
+                commands[index] = new_command
+                replaced.append(([old_command], [new_command]))
+            self.update_macros(old_macros, [old_command])
+            self.update_macros(new_macros, [new_command])
+            if old_command.command == 'string':
+                name = old_command.value[0]
+                if old_macros.get(name) == new_macros.get(name):
+                    changed_macros.discard(name)
+                else:
+                    changed_macros.add(name)
+            index += 1
+
+        if not self.patch_data(parsed.data, replaced):
+            parsed.data = self.make_parsed_data(commands)
+        self.data = parsed.data
+        return parsed
+
+    def patch_data(self, data, replaced):
+        """Replace the changed entries in data.
+
+        Return False if the changes cannot be applied in place.
+        """
+
+        if data.wanted_entries is not None:
+            return False
+        changes = []
+        for old_commands, new_commands in replaced:
+            if len(old_commands) != len(new_commands):
+                return False
+            for old_command, new_command in zip(old_commands, new_commands):
+                if old_command.command != new_command.command and not (
+                    old_command.is_entry() and new_command.is_entry()
+                ):
+                    return False
+                if old_command.command == 'preamble':
+                    if old_command.value != new_command.value:
+                        return False
+                elif old_command.is_entry():
+                    old_key, old_entry = old_command.value
+                    new_key, new_entry = new_command.value
+                    if old_key is None or old_key != new_key:
+                        return False
+                    changes.append((old_key, old_entry, new_entry))
+
+        for key, old_entry, new_entry in changes:
+            if data.entries.get(key) is not old_entry:
+                # a duplicate entry, ignored by add_entry()
+                continue
+            old_crossref = old_entry.fields.get('crossref')
+            new_crossref = new_entry.fields.get('crossref')
+            if old_crossref is not None:
+                data.crossref_count[old_crossref] -= 1
+                if not data.crossref_count[old_crossref]:
+                    del data.crossref_count[old_crossref]
+            if new_crossref is not None:
+                data.crossref_count[new_crossref] += 1
+            new_entry.collection = data
+            new_entry.key = key
+            data.entries[key] = new_entry
+        return True
+
+    def get_cache_key(self, filename, file_suffix=None):
+        # caching would create all lazy entries
+        if self.lazy:
+            return None
+        return super(Parser, self).get_cache_key(filename, file_suffix)
+
     def process_entry(self, entry_type, key, fields):
+        if callable(fields):
+            self.data.add_entry(key, self.make_lazy_entry(entry_type, key, fields))
+        else:
+            self.data.add_entry(*self.make_entry(entry_type, key, fields))
+
+    def make_lazy_entry(self, entry_type, key, load_fields):
+        return LazyEntry(lambda: self.make_entry(entry_type, key, load_fields())[1])
+
+    def make_entry(self, entry_type, key, fields):
         entry = Entry(entry_type)
 
         if key is None:
@@ -329,7 +818,7 @@ class Parser(BaseParser):
                     entry.add_person(Person(name), field_name)
             else:
                 entry.fields[field_name] = field_value
-        self.data.add_entry(key, entry)
+        return key, entry
 
     def process_preamble(self, value_list):
         value = textutils.normalize_whitespace(self.flatten_value_list(value_list))
@@ -339,22 +828,25 @@ class Parser(BaseParser):
         return ''.join(value_list)
 
     def handle_error(self, error):
-        from pybtex.errors import report_error
-        report_error(error)
-
-    def parse_stream(self, stream):
-        self.unnamed_entry_counter = 1
-        text = stream.read()
-        self.command_start = 0
+        self.context.report_error(error)
 
-        entry_iterator = BibTeXEntryIterator(
+    def make_entry_iterator(self, text, handle_error, macros, lazy=False):
+        iterator_class = LazyBibTeXEntryIterator if lazy else BibTeXEntryIterator
+        return iterator_class(
             text,
             keyless_entries=self.keyless_entries,
-            handle_error=self.handle_error,
+            handle_error=handle_error,
             want_entry=self.data.want_entry,
             filename=self.filename,
-            macros=self.macros,
+            macros=macros,
         )
+
+    def parse_stream(self, stream):
+        self.unnamed_entry_counter = 1
+        text = stream.read()
+        self.command_start = 0
+
+        entry_iterator = self.make_entry_iterator(text, self.handle_error, self.macros, lazy=self.lazy)
         for entry in entry_iterator:
             entry_type = entry[0]
             if entry_type == 'string':
@@ -364,3 +856,66 @@ class Parser(BaseParser):
             else:
                 self.process_entry(entry_type, *entry[1])
         return self.data
+
+    def iter_entries(self, stream):
+        """Parse the stream command by command, yielding (key, entry) pairs.
+
+        The stream is read line by line and split into chunks with
+        split_commands(). Each chunk is parsed tentatively: if it ends in the
+        middle of a command, it is joined with the next chunk and parsed
+        again. Errors are reported only after the chunk has been parsed
+        successfully, so the results are the same as with parse_stream().
+
+        A malformed command (like one with an unclosed brace) would swallow
+        the rest of the file, so at most max_command_size characters are
+        buffered: the buffer is then parsed with the usual error handling,
+        and parsing starts afresh with the next chunk. In this case the
+        results may differ from parse_stream(), which gives up at the
+        end of the file instead.
+        """
+
+        def handle_incomplete_command(error):
+            if isinstance(error, PrematureEOF):
+                raise IncompleteCommand
+            chunk_errors.append(error)
+
+        def parse_chunk(handle_error):
+            entry_iterator = self.make_entry_iterator(text, handle_error, macros)
+            entry_iterator.lineno = lineno
+            return list(entry_iterator), entry_iterator.macros
+
+        def process_commands(commands):
+            for command in commands:
+                entry_type = command[0]
+                if entry_type == 'string':
+                    pass
+                elif entry_type == 'preamble':
+                    self.process_preamble(*command[1])
+                else:
+                    yield self.make_entry(entry_type, *command[1])
+
+        self.unnamed_entry_counter = 1
+        macros = self.macros
+        lineno = 1
+        text = u''
+        for chunk in split_commands(stream):
+            text += chunk
+            chunk_errors = []
+            try:
+                commands, macros = parse_chunk(handle_incomplete_command)
+            except IncompleteCommand:
+                if len(text) < self.max_command_size:
+                    continue
+                commands, macros = parse_chunk(self.handle_error)
+                chunk_errors = []
+            for error in chunk_errors:
+                self.handle_error(error)
+            for key, entry in process_commands(commands):
+                yield key, entry
+            lineno += len(BibTeXEntryIterator.NEWLINE.findall(text))
+            text = u''
+
+        if text:
+            commands, macros = parse_chunk(self.handle_error)
+            for key, entry in process_commands(commands):
+                yield key, entry
@@ -34,13 +34,28 @@ def remove_ns(s):
 class Parser(BaseParser):
     name = 'bibtexml'
     suffixes = '.xml', '.bibtexml'
+    streaming = True
 
     def parse_stream(self, stream):
-        t = ET.parse(stream)
-        entries = t.findall(bibtexns + 'entry')
-        self.data.add_entries(self.process_entry(entry) for entry in entries)
+        self.data.add_entries(self.iter_entries(stream))
         return self.data
 
+    def iter_entries(self, stream):
+        """Parse the stream entry by entry.
+
+        Each entry is processed as soon as its closing tag is seen, and then
+        the whole document tree is cleared, so memory usage does not grow
+        with the size of the file.
+        """
+
+        context = iter(ET.iterparse(stream, events=('start', 'end')))
+        event, root = context.next()
+        for event, element in context:
+            if event == 'end' and element.tag == bibtexns + 'entry':
+                key, entry = self.process_entry(element)
+                root.clear()
+                yield key, entry
+
     def process_entry(self, entry):
         def process_person(person_entry, role):
             persons = person_entry.findall(bibtexns + 'person')
@@ -19,29 +19,77 @@
 # TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+"""YAML bibliography parser.
+
+A .bibyaml file may consist of several YAML documents, each with its own
+``entries`` mapping and an optional ``preamble``.  Documents are loaded and
+processed one by one, so a large database split into many small documents
+never has to be held in memory at once.
+
+>>> from io import BytesIO
+>>> parser = Parser()
+>>> bib_data = parser.parse_stream(BytesIO(b'''
+... preamble: "%% a preamble"
+... entries:
+...     first:
+...         type: article
+...         title: The First
+... ---
+... entries:
+...     second:
+...         type: book
+...         title: The Second
+...         author:
+...             - first: Joe
+...               last: Doe
+... '''))
+>>> print bib_data.preamble()
+%% a preamble
+>>> bib_data.entries.keys()
+['first', 'second']
+>>> print bib_data.entries['second'].fields['title']
+The Second
+>>> print unicode(bib_data.entries['second'].persons['author'][0])
+Doe, Joe
+
+"""
+
 import yaml
 from pybtex.database.input import BaseParser
 from pybtex.database import Entry, Person
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 
 class Parser(BaseParser):
     name = 'bibyaml'
     aliases = 'yaml',
     suffixes = '.yaml', '.bibyaml'
+    streaming = True
 
     def parse_stream(self, stream):
-        t = yaml.safe_load(stream)
+        self.data.add_entries(self.iter_entries(stream))
+        return self.data
 
-        entries = ((key, self.process_entry(entry))
-                for (key, entry) in t['entries'].iteritems())
+    def iter_entries(self, stream):
+        for document in yaml.load_all(stream, Loader=SafeLoader):
+            for key, entry in self.process_document(document):
+                yield key, entry
+
+    def process_document(self, t):
+        if not t:
+            return
 
         try:
             self.data.add_to_preamble(t['preamble'])
         except KeyError:
             pass
 
-        self.data.add_entries(entries)
-        return self.data
+        for (key, entry) in t.get('entries', {}).iteritems():
+            yield key, self.process_entry(entry)
 
     def process_entry(self, entry):
         e = Entry(entry['type']) 
@@ -27,16 +27,33 @@ from pybtex.plugin import Plugin
 
 class BaseWriter(Plugin):
     unicode_io = False
+    streaming = False
     default_plugin = 'bibtex'
 
     def __init__(self, encoding=None):
         self.encoding = encoding or pybtex.io.get_default_encoding()
 
-    def write_file(self, bib_data, filename):
-        open_file = pybtex.io.open_unicode if self.unicode_io else pybtex.io.open_raw
+    def open_file(self, filename):
+        """Open the file for writing, or standard output if filename is "-"."""
+
         mode = 'w' if self.unicode_io else 'wb'
-        with open_file(filename, mode, encoding=self.encoding) as stream:
+        if filename == '-':
+            return pybtex.io.open_std_stream(mode, encoding=self.encoding)
+        open_file = pybtex.io.open_unicode if self.unicode_io else pybtex.io.open_raw
+        return open_file(filename, mode, encoding=self.encoding)
+
+    def write_file(self, bib_data, filename):
+        with self.open_file(filename) as stream:
             self.write_stream(bib_data, stream)
 
     def write_stream(self, bib_data, stream):
         raise NotImplementedError
+
+    def write_entries(self, bib_data, entries, stream):
+        """Write (key, entry) pairs to the stream as they are produced.
+
+        bib_data is the BibliographyData the entries are read into. Its
+        preamble may grow while the entries are being consumed.
+        Only supported by writers with streaming = True.
+        """
+        raise NotImplementedError
@@ -31,6 +31,7 @@ class Writer(BaseWriter):
     name = 'bibtex'
     suffixes = '.bib',
     unicode_io = True
+    streaming = True
 
     def quote(self, s):
         """
@@ -76,49 +77,81 @@ class Writer(BaseWriter):
         ...     print error
         String has unmatched braces: {{test}
 
+        Special characters like {\\'e} are scanned as in BibTeX,
+        which accepts some strings with unclosed special characters:
+
+        >>> w.check_braces('{\\\\')
+        >>> w.check_braces('a {\\\\a')
+
         """
 
-        tokens = list(scan_bibtex_string(s))
-        if tokens:
-            end_brace_level = tokens[-1][1]
-            if end_brace_level != 0:
-                raise BibTeXError('String has unmatched braces: %s' % s)
+        brace_level = 0
+        if '{\\' in s:
+            # special characters need the full BibTeX scanner
+            tokens = list(scan_bibtex_string(s))
+            brace_level = tokens[-1][1]
+        elif '{' in s:
+            for char in s:
+                if char == '{':
+                    brace_level += 1
+                elif char == '}' and brace_level > 0:
+                    brace_level -= 1
+        if brace_level != 0:
+            raise BibTeXError('String has unmatched braces: %s' % s)
 
-    def write_stream(self, bib_data, stream):
-        def write_field(type, value):
-            stream.write(u',\n    %s = %s' % (type, self.quote(value)))
-        def format_name(person):
-            def join(l):
-                return ' '.join([name for name in l if name])
-            first = person.get_part_as_text('first')
-            middle = person.get_part_as_text('middle')
+    def format_name(self, person):
+        """
+        >>> from pybtex.database import Person
+        >>> w = Writer()
+        >>> print w.format_name(Person('de Last, Jr, First Middle'))
+        de Last, Jr, First Middle
+        >>> print w.format_name(Person('Last'))
+        Last
+        """
+
+        last = person.get_part_as_text('last')
+        lineage = person.get_part_as_text('lineage')
+        first = person.get_part_as_text('first')
+        middle = person.get_part_as_text('middle')
+        parts = []
+        if last:
             prelast = person.get_part_as_text('prelast')
-            last = person.get_part_as_text('last')
-            lineage = person.get_part_as_text('lineage')
-            s = '' 
-            if last:
-                s += join([prelast, last])
-            if lineage:
-                s += ', %s' % lineage
-            if first or middle:
-                s += ', '
-                s += join([first, middle])
-            return s
-        def write_persons(persons, role):
-#            persons = getattr(entry, role + 's')
+            parts.append(prelast + ' ' + last if prelast else last)
+        if lineage:
+            parts.append(', ' + lineage)
+        if first or middle:
+            parts.append(', ')
+            parts.append(first + ' ' + middle if first and middle else first or middle)
+        return ''.join(parts)
+
+    def format_entry(self, key, entry):
+        """Return the BibTeX markup for a single entry as one string."""
+
+        parts = [u'@%s{%s' % (entry.type, key)]
+        for role, persons in entry.persons.iteritems():
             if persons:
-                write_field(role, u' and '.join([format_name(person) for person in persons]))
-        def write_preamble(preamble):
-            if preamble:
-                stream.write(u'@preamble{%s}\n\n' % self.quote(preamble))
+                names = u' and '.join([self.format_name(person) for person in persons])
+                parts.append(u',\n    %s = %s' % (role, self.quote(names)))
+        for type, value in entry.fields.iteritems():
+            parts.append(u',\n    %s = %s' % (type, self.quote(value)))
+        parts.append(u'\n}\n\n')
+        return u''.join(parts)
 
-        write_preamble(bib_data.preamble())
+    def write_preamble(self, preamble, stream):
+        if preamble:
+            stream.write(u'@preamble{%s}\n\n' % self.quote(preamble))
+
+    def write_stream(self, bib_data, stream):
+        self.write_preamble(bib_data.preamble(), stream)
         for key, entry in bib_data.entries.iteritems():
-            stream.write(u'@%s' % entry.type)
-            stream.write(u'{%s' % key)
-#            for role in ('author', 'editor'):
-            for role, persons in entry.persons.iteritems():
-                write_persons(persons, role)
-            for type, value in entry.fields.iteritems():
-                write_field(type, value)
-            stream.write(u'\n}\n\n')
+            stream.write(self.format_entry(key, entry))
+
+    def write_entries(self, bib_data, entries, stream):
+        # preamble parts are written as soon as the parser has seen them
+        written_preamble = u''
+        for key, entry in entries:
+            preamble = bib_data.preamble()
+            self.write_preamble(preamble[len(written_preamble):], stream)
+            written_preamble = preamble
+            stream.write(self.format_entry(key, entry))
+        self.write_preamble(bib_data.preamble()[len(written_preamble):], stream)
@@ -19,7 +19,6 @@
 # TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from xml.etree import cElementTree as ET
 from pybtex.database import Entry
 from pybtex.database.output import BaseWriter
 
@@ -29,12 +28,61 @@ doctype = """<!DOCTYPE bibtex:file PUBLIC
         "bibtexml.dtd" >
 """
 
-class PrettyTreeBuilder(object):
-    def __init__(self):
-        self.tree_builder = ET.TreeBuilder()
-        self.close = self.tree_builder.close
-        self.data = self.tree_builder.data
+
+def escape_cdata(text):
+    """
+    >>> print escape_cdata(u'Tom & Jerry <3')
+    Tom &amp; Jerry &lt;3
+    """
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def escape_attrib(text):
+    r"""
+    >>> print escape_attrib(u'"quoted"\nkey')
+    &quot;quoted&quot;&#10;key
+    """
+    return escape_cdata(text).replace('"', '&quot;').replace('\n', '&#10;')
+
+
+class PrettyXMLWriter(object):
+    """Write indented XML directly to a byte stream.
+
+    The output is the same as ElementTree would produce for a tree with the
+    same whitespace, but nothing is kept in memory except the current
+    element stack and the text buffered since the last flush().
+
+    >>> from io import BytesIO
+    >>> stream = BytesIO()
+    >>> w = PrettyXMLWriter(stream, 'UTF-8')
+    >>> w.start('file', {'name': 'a & b'})
+    >>> w.element('title', u'Tom & Jerry')
+    >>> w.element('empty', u'')
+    >>> w.end()
+    >>> w.flush()
+    >>> print stream.getvalue()
+    <file name="a &amp; b">
+        <title>Tom &amp; Jerry</title>
+        <empty />
+    </file>
+    <BLANKLINE>
+    """
+
+    def __init__(self, stream, encoding):
+        self.stream = stream
+        self.encoding = encoding
         self.stack = []
+        self.buffer = []
+        self.data = self.buffer.append
+
+    def flush(self):
+        text = u''.join(self.buffer)
+        self.stream.write(text.encode(self.encoding, 'xmlcharrefreplace'))
+        del self.buffer[:]
+
+    def write_declaration(self):
+        if self.encoding not in ('utf-8', 'us-ascii'):
+            self.data(u"<?xml version='1.0' encoding='%s'?>\n" % self.encoding)
 
     def newline(self):
         self.data('\n')
@@ -42,12 +90,18 @@ class PrettyTreeBuilder(object):
     def indent_line(self):
         self.data(' ' * len(self.stack) * 4)
 
+    def start_tag(self, tag, attrs, empty=False):
+        self.data('<' + tag)
+        for name, value in sorted(attrs.iteritems()):
+            self.data(' %s="%s"' % (name, escape_attrib(value)))
+        self.data(' />' if empty else '>')
+
     def start(self, tag, attrs=None, newline=True):
         if attrs is None:
             attrs = {}
         self.indent_line()
         self.stack.append(tag)
-        self.tree_builder.start(tag, attrs)
+        self.start_tag(tag, attrs)
         if newline:
             self.newline()
 
@@ -55,13 +109,18 @@ class PrettyTreeBuilder(object):
         tag = self.stack.pop()
         if indent:
             self.indent_line()
-        self.tree_builder.end(tag)
+        self.data('</%s>' % tag)
         self.newline()
 
     def element(self, tag, data):
-        self.start(tag, newline=False)
-        self.data(data)
-        self.end(indent=False)
+        self.indent_line()
+        if data:
+            self.start_tag(tag, {})
+            self.data(escape_cdata(data))
+            self.data('</%s>' % tag)
+        else:
+            self.start_tag(tag, {}, empty=True)
+        self.newline()
 
 
 class Writer(BaseWriter):
@@ -69,8 +128,12 @@ class Writer(BaseWriter):
 
     name = 'bibtexml'
     suffixes = '.xml', '.bibtexml'
+    streaming = True
 
     def write_stream(self, bib_data, stream):
+        self.write_entries(bib_data, bib_data.entries.iteritems(), stream)
+
+    def write_entries(self, bib_data, entries, stream):
         def write_persons(persons, role):
             if persons:
                 w.start('bibtex:' + role)
@@ -83,11 +146,12 @@ class Writer(BaseWriter):
                     w.end()
                 w.end()
 
-        w = PrettyTreeBuilder()
-        bibtex_file = w.start('bibtex:file', {'xmlns:bibtex': 'http://bibtexml.sf.net/'})
+        w = PrettyXMLWriter(stream, self.encoding)
+        w.write_declaration()
+        w.start('bibtex:file', {'xmlns:bibtex': 'http://bibtexml.sf.net/'})
         w.newline()
 
-        for key, entry in bib_data.entries.iteritems():
+        for key, entry in entries:
             w.start('bibtex:entry', dict(id=key))
             w.start('bibtex:' + entry.type)
             for field_name, field_value in entry.fields.iteritems():
@@ -97,8 +161,6 @@ class Writer(BaseWriter):
             w.end()
             w.end()
             w.newline()
+            w.flush()
         w.end()
-
-        tree = ET.ElementTree(w.close())
-        tree.write(stream, self.encoding)
-        stream.write(b'\n')
+        w.flush()
@@ -30,8 +30,12 @@ class Writer(BaseWriter):
     name = 'bibyaml'
     aliases = 'yaml',
     suffixes = '.yaml', '.bibyaml'
+    streaming = True
 
-    def write_stream(self, bib_data, stream):
+    # number of entries per YAML document in streaming mode
+    entries_per_document = 100
+
+    def process_entry(self, entry):
         def process_person_roles(entry):
             for role, persons in entry.persons.iteritems():
                 yield role, list(process_persons(persons))
@@ -45,16 +49,49 @@ class Writer(BaseWriter):
         def process_persons(persons):
             for person in persons:
                 yield dict(process_person(person))
-                
-        def process_entries(bib_data):
-            for key, entry in bib_data.iteritems():
-                fields = dict(entry.fields)
-                fields['type'] = entry.type
-                fields.update(process_person_roles(entry))
-                yield key, fields
-
-        data = {'entries': dict(process_entries(bib_data.entries))}
+
+        fields = dict(entry.fields)
+        fields['type'] = entry.type
+        fields.update(process_person_roles(entry))
+        return fields
+
+    def dump(self, documents, stream):
+        yaml.safe_dump_all(documents, stream, allow_unicode=True, encoding='UTF-8', default_flow_style=False, indent=4)
+
+    def write_stream(self, bib_data, stream):
+        entries = bib_data.entries.iteritems()
+        data = {'entries': dict((key, self.process_entry(entry)) for key, entry in entries)}
         preamble = bib_data.preamble()
         if preamble:
             data['preamble'] = preamble
-        yaml.safe_dump(data, stream, allow_unicode=True, encoding='UTF-8', default_flow_style=False, indent=4)
+        self.dump([data], stream)
+
+    def write_entries(self, bib_data, entries, stream):
+        """Write entries as a series of YAML documents.
+
+        Every document holds up to entries_per_document entries and the part
+        of the preamble that has been read since the previous document.
+        """
+
+        def iter_documents():
+            written_preamble = u''
+            document_entries = {}
+            for key, entry in entries:
+                document_entries[key] = self.process_entry(entry)
+                if len(document_entries) >= self.entries_per_document:
+                    yield make_document(document_entries, written_preamble)
+                    written_preamble = bib_data.preamble()
+                    document_entries = {}
+            if document_entries or bib_data.preamble() != written_preamble:
+                yield make_document(document_entries, written_preamble)
+
+        def make_document(document_entries, written_preamble):
+            data = {}
+            if document_entries:
+                data['entries'] = document_entries
+            preamble = bib_data.preamble()[len(written_preamble):]
+            if preamble:
+                data['preamble'] = preamble
+            return data
+
+        self.dump(iter_documents(), stream)
@@ -0,0 +1,186 @@
+# Copyright (c) 2009, 2010, 2011, 2012  Andrey Golovizin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Persistent on-disk cache for expensive-to-compute data.
+
+Cached values are pickled to separate files in the cache directory.
+Writes go to a temporary file which is then renamed over the old one,
+so concurrent pybtex processes never see a partially written file.
+
+The cache directory is $PYBTEX_CACHE_DIR if set, or $XDG_CACHE_HOME/pybtex
+(~/.cache/pybtex by default). Setting PYBTEX_CACHE_DIR to an empty string
+disables the cache.
+
+Each section of the cache keeps at most max_files values. When there are
+more, the values that were not used for the longest time are removed.
+
+>>> import tempfile, shutil
+>>> cache = DiskCache('test', tempfile.mkdtemp())
+>>> print cache.load('some key')
+None
+>>> cache.save('some key', [1, 2, 3])
+>>> cache.load('some key')
+[1, 2, 3]
+>>> shutil.rmtree(cache.base_dir)
+
+>>> cache = DiskCache('test', tempfile.mkdtemp(), max_files=2)
+>>> cache.save('first', 1)
+>>> cache.save('second', 2)
+>>> os.utime(cache.get_filename('first'), (0, 0))
+>>> cache.save('third', 3)
+>>> print cache.load('first')
+None
+>>> cache.load('second'), cache.load('third')
+(2, 3)
+>>> shutil.rmtree(cache.base_dir)
+
+MemoryCache has the same interface but keeps the pickled values in memory.
+Each load() returns a fresh copy, so callers may modify the loaded data.
+
+>>> cache = MemoryCache()
+>>> cache.save(('some', 'key'), [1, 2, 3])
+>>> data = cache.load(('some', 'key'))
+>>> data.append(4)
+>>> cache.load(('some', 'key'))
+[1, 2, 3]
+
+"""
+
+import os
+import hashlib
+import tempfile
+import cPickle as pickle
+from os import path
+
+from pybtex.io import rename
+from pybtex.utils import LRUCache
+
+
+def get_cache_dir():
+    """Return the base cache directory, or None if the cache is disabled."""
+
+    cache_dir = os.environ.get('PYBTEX_CACHE_DIR')
+    if cache_dir is not None:
+        return cache_dir or None
+    xdg_cache_home = os.environ.get('XDG_CACHE_HOME') or path.join('~', '.cache')
+    return path.join(path.expanduser(xdg_cache_home), 'pybtex')
+
+
+class DiskCache(object):
+    """A named section of the cache directory.
+
+    Any I/O or unpickling problems are treated as cache misses.
+    """
+
+    def __init__(self, name, base_dir=None, max_files=1000):
+        if base_dir is None:
+            base_dir = get_cache_dir()
+        self.name = name
+        self.base_dir = base_dir
+        self.max_files = max_files
+        self.directory = path.join(base_dir, name) if base_dir else None
+
+    def get_filename(self, key):
+        if isinstance(key, unicode):
+            key = key.encode('UTF-8')
+        return path.join(self.directory, hashlib.sha1(key).hexdigest())
+
+    def load(self, key):
+        if not self.directory:
+            return None
+        filename = self.get_filename(key)
+        try:
+            with open(filename, 'rb') as cache_file:
+                value = pickle.load(cache_file)
+        except Exception:
+            return None
+        try:
+            # the modification time tells prune() when the value was last used
+            os.utime(filename, None)
+        except EnvironmentError:
+            pass
+        return value
+
+    def save(self, key, value):
+        if not self.directory:
+            return
+        filename = self.get_filename(key)
+        is_new = not path.exists(filename)
+        try:
+            if not path.isdir(self.directory):
+                os.makedirs(self.directory)
+            fd, tmp_filename = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+        except EnvironmentError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                pickle.dump(value, tmp_file, pickle.HIGHEST_PROTOCOL)
+            rename(tmp_filename, filename)
+        except Exception:
+            try:
+                os.remove(tmp_filename)
+            except EnvironmentError:
+                pass
+        else:
+            if is_new:
+                self.prune()
+
+    def prune(self):
+        """Remove the least recently used values if there are more than max_files."""
+
+        try:
+            filenames = [
+                path.join(self.directory, filename)
+                for filename in os.listdir(self.directory)
+                if not filename.startswith('.')
+            ]
+        except EnvironmentError:
+            return
+        if len(filenames) <= self.max_files:
+            return
+        mtimes = {}
+        for filename in filenames:
+            try:
+                mtimes[filename] = path.getmtime(filename)
+            except EnvironmentError:
+                pass
+        for filename in sorted(mtimes, key=mtimes.get)[:len(mtimes) - self.max_files]:
+            try:
+                os.remove(filename)
+            except EnvironmentError:
+                pass
+
+
+class MemoryCache(object):
+    """An in-memory cache of pickled values with at most maxsize items."""
+
+    def __init__(self, maxsize=64):
+        self.data = LRUCache(maxsize, 'memory')
+
+    def load(self, key):
+        pickled_value = self.data.get(key)
+        if pickled_value is None:
+            return None
+        return pickle.loads(pickled_value)
+
+    def save(self, key, value):
+        self.data.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
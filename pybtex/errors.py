@@ -63,14 +63,10 @@ def format_error(exception, prefix='ERROR: '):
 
 
 def print_error(exception, prefix='ERROR: '):
-    print >>stderr, format_error(exception, prefix)
+    from pybtex.context import get_current_context
+    get_current_context().print_error(exception, prefix)
 
 
 def report_error(exception):
-    global error_code
-
-    if strict:
-        raise exception
-    else:
-        print_error(exception, 'WARNING: ')
-        error_code = 2
+    from pybtex.context import get_current_context
+    get_current_context().report_error(exception)
@@ -0,0 +1,204 @@
+# Copyright (c) 2009, 2010, 2011, 2012  Andrey Golovizin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Skip make_bibliography() if nothing has changed since the last run.
+
+A fingerprint is a hash of everything the output depends on: the citations,
+the options, the pybtex version and the resolved names and contents of the
+input files. Classes (like the style) are identified by their names and the
+modification time of their source files. It is saved to a file next to the output file, together
+with a hash of the output, the warnings and the exit code of the run.
+
+If the fingerprint and the output file did not change since then,
+the warnings are printed again and the run is skipped:
+
+>>> import os, shutil, tempfile
+>>> from StringIO import StringIO
+>>> from pybtex.context import Context
+>>> directory = tempfile.mkdtemp()
+>>> output_filename = os.path.join(directory, 'test.bbl')
+>>> def make_bibliography(context):
+...     fingerprint = Fingerprint(output_filename)
+...     fingerprint.add('some input data')
+...     if fingerprint.replay(context):
+...         return 'skipped'
+...     with fingerprint.record(context):
+...         errors.report_error(PybtexError('some warning'))
+...         output = 'some output'
+...     pybtex.io.write_if_changed(output_filename, output)
+...     fingerprint.save(output)
+...     return 'done'
+>>> context = Context(stderr=StringIO())
+>>> make_bibliography(context)
+'done'
+>>> make_bibliography(context)
+'skipped'
+>>> print context.stderr.getvalue().strip()
+WARNING: Some warning.
+WARNING: Some warning.
+>>> context.error_code
+2
+>>> os.remove(output_filename)
+>>> make_bibliography(context)
+'done'
+>>> shutil.rmtree(directory)
+
+"""
+
+import sys
+import json
+import hashlib
+from os import path
+from StringIO import StringIO
+from contextlib import contextmanager
+
+import pybtex.io
+from pybtex import errors
+from pybtex.__version__ import version
+from pybtex.context import Context, activate
+from pybtex.exceptions import PybtexError
+
+
+def hash_file(filename):
+    sha = hashlib.sha1()
+    try:
+        with open(filename, 'rb') as input_file:
+            for chunk in iter(lambda: input_file.read(65536), ''):
+                sha.update(chunk)
+    except EnvironmentError:
+        return None
+    return sha.hexdigest()
+
+
+def get_module_stamp(module_name):
+    """Return the path and the modification time of the module source."""
+
+    module = sys.modules.get(module_name)
+    filename = getattr(module, '__file__', None)
+    if filename is None:
+        return None
+    if filename.endswith(('.pyc', '.pyo')) and path.exists(filename[:-1]):
+        filename = filename[:-1]
+    try:
+        return path.abspath(filename), path.getmtime(filename)
+    except EnvironmentError:
+        return None
+
+
+class TeeStream(object):
+    def __init__(self, *streams):
+        self.streams = streams
+
+    def write(self, data):
+        for stream in self.streams:
+            stream.write(data)
+
+    def flush(self):
+        for stream in self.streams:
+            stream.flush()
+
+
+class Fingerprint(object):
+    def __init__(self, output_filename):
+        self.output_filename = output_filename
+        self.filename = output_filename + path.extsep + 'fingerprint'
+        self.sha = hashlib.sha1()
+        self.messages = u''
+        self.error_code = 0
+        self.add(version)
+
+    def add(self, *values):
+        for value in values:
+            if isinstance(value, type):
+                value = value.__module__, value.__name__, get_module_stamp(value.__module__)
+            self.sha.update(repr(value))
+
+    def add_options(self, **options):
+        for name, value in sorted(options.iteritems()):
+            self.add(name, value)
+
+    def add_files(self, filenames):
+        for filename in pybtex.io.resolve_filenames(filenames):
+            self.add(path.abspath(filename), hash_file(filename))
+
+    def hexdigest(self):
+        return self.sha.hexdigest()
+
+    def load(self):
+        try:
+            with open(self.filename, 'rb') as fingerprint_file:
+                return json.load(fingerprint_file)
+        except (EnvironmentError, ValueError):
+            return None
+
+    def replay(self, context):
+        """If nothing has changed since the last run, report the saved
+        warnings to the context and return True."""
+
+        saved = self.load()
+        if (
+            not saved
+            or saved.get('fingerprint') != self.hexdigest()
+            or saved.get('output') != hash_file(self.output_filename)
+        ):
+            return False
+        if saved['messages']:
+            context.stderr.write(saved['messages'])
+        if saved['error_code']:
+            context.error_code = saved['error_code']
+        return True
+
+    @contextmanager
+    def record(self, context):
+        """Run the with block in a copy of the context, recording the warnings."""
+
+        messages = StringIO()
+        run_context = Context(
+            strict=context.strict,
+            stderr=TeeStream(context.stderr, messages),
+            stdout=context.stdout,
+            cache=context.cache,
+            resolver=context.resolver,
+        )
+        try:
+            with activate(run_context):
+                yield run_context
+        finally:
+            context.num_errors += run_context.num_errors
+            if run_context.error_code:
+                context.error_code = run_context.error_code
+        self.messages = messages.getvalue()
+        self.error_code = run_context.error_code
+
+    def save(self, output_data):
+        """Save the fingerprint after the output file has been written."""
+
+        data = json.dumps({
+            'fingerprint': self.hexdigest(),
+            'output': hashlib.sha1(output_data).hexdigest(),
+            'messages': self.messages,
+            'error_code': self.error_code,
+        })
+        try:
+            pybtex.io.write_if_changed(self.filename, data)
+        except PybtexError:
+            pass  # not fatal, the bibliography will be rebuilt next time
@@ -25,11 +25,12 @@
 from __future__ import absolute_import
 
 import io
+import os
 import sys
+import binascii
 from os import path, environ
 
 from pybtex.exceptions import PybtexError
-from pybtex.kpathsea import kpsewhich
 
 
 def get_default_encoding():
@@ -41,12 +42,39 @@ def get_stream_encoding(stream):
     return stream_encoding or get_default_encoding()
 
 
-def _open_existing(opener, filename, mode, locate, **kwargs):
+def _resolve(filename, locate):
     if not path.isfile(filename):
         found = locate(filename)
         if found:
-            filename = found
-    return opener(filename, mode, **kwargs)
+            return found
+    return filename
+
+
+def _locate(filename):
+    from pybtex.context import get_current_context
+    return get_current_context().resolver.find(filename)
+
+
+def _open_existing(opener, filename, mode, locate, **kwargs):
+    return opener(_resolve(filename, locate), mode, **kwargs)
+
+
+def resolve_filename(filename):
+    """Return the path the file would be opened from for reading,
+    looking it up in the TeX search path if necessary (see pybtex.kpathsea)."""
+    return _resolve(filename, _locate)
+
+
+def resolve_filenames(filenames):
+    """Like resolve_filename(), but for several files at once,
+    so that kpsewhich is run at most once."""
+
+    from pybtex.context import get_current_context
+    filenames = list(filenames)
+    found = get_current_context().resolver.find_all(
+        filename for filename in filenames if not path.isfile(filename)
+    )
+    return [found.get(filename) or filename for filename in filenames]
 
 
 def _open_or_create(opener, filename, mode, environ, **kwargs):
@@ -68,11 +96,102 @@ def _open(opener, filename, mode, **kwargs):
         if write_mode:
             return _open_or_create(opener, filename, mode, environ, **kwargs)
         else:
-            return _open_existing(opener, filename, mode, locate=kpsewhich, **kwargs)
+            return _open_existing(opener, filename, mode, locate=_locate, **kwargs)
     except EnvironmentError, error:
         raise PybtexError("unable to open %s. %s" % (filename, error.strerror))
 
 
+def rename(src, dst):
+    """Rename src to dst, replacing dst if it exists.
+
+    On Windows, os.rename() does not replace existing files, so dst is
+    removed first there and the replacement is not atomic.
+    """
+
+    try:
+        os.rename(src, dst)
+    except OSError:
+        if os.name != 'nt' or not path.exists(dst):
+            raise
+        os.remove(dst)
+        os.rename(src, dst)
+
+
+def _replace_file(filename, data):
+    """Write data to a temporary file and rename it over filename."""
+
+    directory, basename = path.split(filename)
+    tmp_filename = path.join(directory, '.{0}.{1}.{2}.tmp'.format(
+        basename, os.getpid(), binascii.hexlify(os.urandom(4)),
+    ))
+    # unlike tempfile.mkstemp(), respect the umask
+    fd = os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0666)
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(data)
+        rename(tmp_filename, filename)
+    except:
+        try:
+            os.remove(tmp_filename)
+        except EnvironmentError:
+            pass
+        raise
+
+
+def _replace_if_changed(filename, data):
+    try:
+        with open(filename, 'rb') as old_file:
+            if old_file.read() == data:
+                return False
+    except EnvironmentError:
+        pass
+    _replace_file(filename, data)
+    return True
+
+
+def _write_if_changed(filename, data, environ):
+    try:
+        return _replace_if_changed(filename, data)
+    except EnvironmentError, error:
+        if 'TEXMFOUTPUT' in environ:
+            new_filename = path.join(environ['TEXMFOUTPUT'], filename)
+            try:
+                return _replace_if_changed(new_filename, data)
+            except EnvironmentError:
+                pass
+        raise error
+
+
+def write_if_changed(filename, data):
+    """Atomically replace the contents of the file with data (a byte string).
+
+    The file is left untouched (and keeps its modification time)
+    if it already contains exactly the same data.
+    Return True if the file has been written.
+    """
+
+    try:
+        return _write_if_changed(filename, data, environ)
+    except EnvironmentError, error:
+        raise PybtexError("unable to write %s. %s" % (filename, error.strerror))
+
+
+class StringOutput(io.StringIO):
+    """An in-memory text file that keeps its contents after closing."""
+
+    value = None
+
+    def close(self):
+        if not self.closed:
+            self.value = io.StringIO.getvalue(self)
+        io.StringIO.close(self)
+
+    def getvalue(self):
+        if self.closed:
+            return self.value
+        return io.StringIO.getvalue(self)
+
+
 def open_raw(filename, mode='rb', encoding=None):
     return _open(io.open, filename, mode)
 
@@ -83,6 +202,24 @@ def open_unicode(filename, mode='r', encoding=None):
     return _open(io.open, filename, mode, encoding=encoding)
 
 
+def open_std_stream(mode='r', encoding=None):
+    """Open standard input (or output, if mode is "w") as a file object.
+
+    Closing the returned object does not close the underlying file.
+    """
+
+    if 'w' in mode:
+        std_stream = sys.stdout
+        std_stream.flush()
+    else:
+        std_stream = sys.stdin
+    if 'b' in mode:
+        encoding = None
+    elif encoding is None:
+        encoding = get_default_encoding()
+    return io.open(std_stream.fileno(), mode, encoding=encoding, closefd=False)
+
+
 def reader(stream, encoding=None, errors='strict'):
     if encoding is None:
         encoding = get_stream_encoding(stream)
@@ -19,10 +19,320 @@
 # TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+"""Find TeX input files like kpsewhich does, without running it for every file.
+
+Resolver looks for .bib files in BIBINPUTS, for .bst files in BSTINPUTS and
+for other files in TEXINPUTS. If the variable is not set or has an empty
+element (which stands for the default path), the search path is taken from
+"kpsewhich -show-path" instead. It is run once per file type and
+environment in each process (pybtex.utils.reset_caches() forgets the results,
+e.g. after texmf.cnf has been changed).
+
+As in kpathsea, path elements ending with // include all subdirectories,
+and elements starting with !! are only looked up in the ls-R database of
+the TeX tree. Lookups in ls-R databases are cached on disk (see
+pybtex.diskcache) until the ls-R file changes.
+
+Files that cannot be found reliably this way (for example, files found in
+several subdirectories, or path elements with kpathsea variables) are looked
+up with kpsewhich, which is run once for all such files. If kpsewhich is not
+installed, such files are not found.
+"""
+
+import os
+import sys
+from os import path
 from subprocess import Popen, PIPE
 
+from pybtex.diskcache import DiskCache
+from pybtex.utils import lru_cache
+
+
+# file suffix -> (search path variable, kpsewhich file format)
+file_types = {
+    '.bib': ('BIBINPUTS', 'bib'),
+    '.bst': ('BSTINPUTS', 'bst'),
+}
+default_file_type = 'TEXINPUTS', 'tex'
+
+# the file cannot be found without kpsewhich
+UNKNOWN = object()
+
+
+def encode_filename(filename):
+    if isinstance(filename, unicode):
+        return filename.encode(sys.getfilesystemencoding() or 'UTF-8')
+    return filename
+
+
+def get_stamp(filename):
+    try:
+        stat = os.stat(filename)
+    except EnvironmentError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+
+def find_program(name, search_path):
+    for directory in (search_path or '').split(os.pathsep):
+        program = path.join(directory, name)
+        if path.isfile(program) and os.access(program, os.X_OK):
+            return program
+    return None
+
+
+def run_kpsewhich(args, environ=None):
+    """Run kpsewhich with the given environment and return the lines of its
+    output, or None if kpsewhich cannot be run."""
+
+    try:
+        process = Popen(['kpsewhich'] + args, stdout=PIPE, stderr=PIPE, env=environ)
+    except OSError:
+        return None
+    return process.communicate()[0].splitlines()
+
+
+@lru_cache(maxsize=64)
+def show_path(file_format, environ_items, kpsewhich_stamp=None):
+    """Return the output of kpsewhich -show-path, or None if kpsewhich
+    cannot be run.
+
+    environ_items is a tuple of (name, value) pairs. kpsewhich_stamp only
+    makes the results of different kpsewhich installations cached separately.
+    """
+
+    return run_kpsewhich(['-show-path=' + file_format], dict(environ_items))
+
+
 def kpsewhich(filename):
-    p = Popen(['kpsewhich', filename], stdout=PIPE, stderr=PIPE)
-    path = p.communicate()[0].rstrip()
-    if p.returncode == 0:
-        return path
+    """Find the file with kpsewhich. Return None if it is not found."""
+
+    return kpsewhich_many([filename]).get(filename)
+
+
+def kpsewhich_many(filenames, environ=None):
+    """Find the files with a single kpsewhich call.
+
+    Return a dict mapping the names of the found files to their paths.
+    """
+
+    filenames = [
+        filename for filename in sorted(set(filenames))
+        if not filename.startswith('-')
+    ]
+    if not filenames:
+        return {}
+    args = [encode_filename(filename) for filename in filenames]
+    lines = iter(run_kpsewhich(args, environ) or [])
+    line = next(lines, None)
+    found = {}
+    # kpsewhich prints the paths of the found files in the order of the arguments
+    for filename in filenames:
+        if line is not None and path.basename(line) == path.basename(encode_filename(filename)):
+            found[filename] = line
+            line = next(lines, None)
+    return found
+
+
+class LsRDatabase(object):
+    """An ls-R file: the list of all files in a TeX tree."""
+
+    def __init__(self, filename, disk_cache):
+        self.filename = filename
+        self.root = path.dirname(filename)
+        self.stamp = get_stamp(filename)
+        self.disk_cache = disk_cache
+        self._text = None
+
+    @property
+    def text(self):
+        if self._text is None:
+            with open(self.filename, 'rb') as ls_r:
+                self._text = ls_r.read().replace('\r\n', '\n')
+        return self._text
+
+    def find(self, filename):
+        """Return the paths of all files with the given name (which may
+        include a directory part) listed in the database."""
+
+        cache_key = repr(('ls-R', path.abspath(self.filename), self.stamp, filename))
+        paths = self.disk_cache.load(cache_key)
+        if paths is None:
+            paths = list(self.iter_paths(filename))
+            self.disk_cache.save(cache_key, paths)
+        return paths
+
+    def iter_paths(self, filename):
+        text = self.text
+        subdirectory, basename = path.split(filename)
+        needle = '\n' + basename + '\n'
+        pos = text.find(needle)
+        while pos != -1:
+            # the list of files in a directory starts with the "directory:" line
+            block_start = text.rfind('\n\n', 0, pos)
+            if block_start == -1:
+                # the first list comes right after the comment line
+                block_start = text.find('\n') + 1
+            else:
+                block_start += 2
+            header = text[block_start:text.find('\n', block_start)]
+            if header.endswith(':'):
+                directory = path.normpath(path.join(self.root, header[:-1]))
+                if not subdirectory or directory.endswith(os.sep + subdirectory):
+                    yield path.join(directory, basename)
+            pos = text.find(needle, pos + 1)
+
+
+class Resolver(object):
+    """Find input files and remember the results.
+
+    The results are not checked again, so a Resolver should only be used
+    for a single run.
+    """
+
+    def __init__(self, environ=None, disk_cache=None):
+        self.environ = environ if environ is not None else os.environ
+        self.disk_cache = disk_cache if disk_cache is not None else DiskCache('kpathsea')
+        self.results = {}
+        self.search_paths = {}
+        self.databases = {}
+        self.directory_databases = {}
+        self.directory_trees = {}
+
+    def find(self, filename):
+        """Return the path of the file, or None if it is not found."""
+
+        return self.find_all([filename])[filename]
+
+    def find_all(self, filenames):
+        """Find the files, running kpsewhich at most once.
+
+        Return a dict mapping the filenames to their paths (or to None).
+        """
+
+        unknown = []
+        for filename in filenames:
+            if filename not in self.results:
+                result = self.search(filename)
+                if result is UNKNOWN:
+                    unknown.append(filename)
+                else:
+                    self.results[filename] = result
+        if unknown:
+            found = kpsewhich_many(unknown, self.environ)
+            for filename in unknown:
+                self.results[filename] = found.get(filename)
+        return dict((filename, self.results[filename]) for filename in filenames)
+
+    def search(self, filename):
+        filename = encode_filename(filename)
+        if path.isabs(filename):
+            return filename if path.isfile(filename) else None
+        search_path = self.get_search_path(filename)
+        if search_path is None:
+            return UNKNOWN
+        for element in search_path:
+            result = self.search_element(element, filename)
+            if result is not None:
+                return result
+        return None
+
+    def get_search_path(self, filename):
+        suffix = path.splitext(filename)[1].lower()
+        variable, file_format = file_types.get(suffix, default_file_type)
+        if file_format not in self.search_paths:
+            value = self.environ.get(variable)
+            if value is not None and all(value.split(os.pathsep)):
+                search_path = value.split(os.pathsep)
+            else:
+                search_path = self.get_default_search_path(file_format)
+            self.search_paths[file_format] = search_path
+        return self.search_paths[file_format]
+
+    def get_default_search_path(self, file_format):
+        """Return the search path reported by kpsewhich -show-path,
+        or None if it is unknown."""
+
+        kpsewhich_path = find_program('kpsewhich', self.environ.get('PATH'))
+        kpsewhich_stamp = None
+        if kpsewhich_path is not None:
+            kpsewhich_stamp = path.abspath(kpsewhich_path), get_stamp(kpsewhich_path)
+        lines = show_path(file_format, tuple(sorted(self.environ.iteritems())), kpsewhich_stamp)
+        if lines is None:
+            # kpsewhich is not installed, so only the current directory is searched
+            return ['.']
+        if not lines:
+            return None
+        return lines[0].split(os.pathsep)
+
+    def search_element(self, element, filename):
+        """Look for the file in a single element of the search path.
+
+        Return the path of the file, None if it is not there,
+        or UNKNOWN if the element is not supported.
+        """
+
+        if '$' in element or '{' in element:
+            return UNKNOWN
+        ls_r_only = element.startswith('!!')
+        if ls_r_only:
+            element = element[2:]
+        recursive = element.endswith('//')
+        directory = path.abspath(path.expanduser(element.rstrip('/') or '/'))
+
+        candidates = []
+        database = self.get_database(directory)
+        if database is not None:
+            candidates = [
+                candidate for candidate in database.find(filename)
+                if self.is_in_directory(candidate, filename, directory, recursive)
+                and path.isfile(candidate)
+            ]
+        if not candidates and not ls_r_only:
+            candidates = self.find_on_disk(filename, directory, recursive)
+        if not candidates:
+            return None
+        if len(candidates) > 1:
+            # kpsewhich knows which one comes first
+            return UNKNOWN
+        return candidates[0]
+
+    def is_in_directory(self, candidate, filename, directory, recursive):
+        candidate_directory = candidate[:-len(filename)].rstrip(os.sep)
+        if recursive:
+            return (
+                candidate_directory == directory
+                or candidate_directory.startswith(directory.rstrip(os.sep) + os.sep)
+            )
+        return candidate_directory == directory
+
+    def find_on_disk(self, filename, directory, recursive):
+        if not recursive:
+            candidate = path.join(directory, filename)
+            return [candidate] if path.isfile(candidate) else []
+        if directory not in self.directory_trees:
+            self.directory_trees[directory] = [
+                subdirectory for subdirectory, dirnames, filenames
+                in os.walk(directory, followlinks=True)
+            ]
+        candidates = (
+            path.join(subdirectory, filename)
+            for subdirectory in self.directory_trees[directory]
+        )
+        return [candidate for candidate in candidates if path.isfile(candidate)]
+
+    def get_database(self, directory):
+        """Return the ls-R database of the TeX tree containing the directory,
+        or None."""
+
+        if directory not in self.directory_databases:
+            parent = path.dirname(directory)
+            for name in 'ls-R', 'ls-r':
+                ls_r_filename = path.join(directory, name)
+                if path.isfile(ls_r_filename):
+                    database = LsRDatabase(ls_r_filename, self.disk_cache)
+                    break
+            else:
+                database = self.get_database(parent) if parent != directory else None
+            self.directory_databases[directory] = database
+        return self.directory_databases[directory]
@@ -0,0 +1,193 @@
+# Copyright (c) 2009, 2010, 2011, 2012  Andrey Golovizin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""A long-running pybtex process with warm caches.
+
+"pybtex --server" listens on a Unix domain socket and runs pybtex for the
+clients (see pybtex.client). Since all runs happen in the same process,
+Python startup, imports and plugin loading are done only once. Parsed .bst
+and .bib files are kept in a MemoryCache and reused until their
+modification time or size changes.
+
+Requests are processed one at a time, because each of them changes the
+working directory of the server process.
+
+"pybtex --server-stats" prints the statistics of the server caches.
+"""
+
+import os
+import sys
+import json
+import signal
+import traceback
+from SocketServer import UnixStreamServer, StreamRequestHandler
+
+from pybtex import errors
+from pybtex.client import get_socket_path, connect, send_message
+from pybtex.context import Context
+from pybtex.diskcache import MemoryCache
+from pybtex.exceptions import PybtexError
+from pybtex.utils import get_cache_stats
+
+
+class MessageWriter(object):
+    """A file-like object forwarding everything written to it to the client."""
+
+    encoding = 'UTF-8'
+
+    def __init__(self, stream, name):
+        self.stream = stream
+        self.name = name
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.decode(self.encoding, 'replace')
+        if data:
+            send_message(self.stream, {'stream': self.name, 'data': data})
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        pass
+
+
+class RequestHandler(StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        request = json.loads(line)
+        exit_code = self.server.run(
+            request['argv'], request['cwd'],
+            stdout=MessageWriter(self.wfile, 'stdout'),
+            stderr=MessageWriter(self.wfile, 'stderr'),
+        )
+        send_message(self.wfile, {'exit_code': exit_code})
+
+
+def remove_stale_socket(socket_path):
+    if not os.path.exists(socket_path):
+        return
+    sock = connect(socket_path)
+    if sock is not None:
+        sock.close()
+        raise PybtexError('pybtex server is already running on {0}'.format(socket_path))
+    os.remove(socket_path)
+
+
+def format_cache_stats(stats):
+    """
+    >>> print format_cache_stats({'memory': {'size': 1, 'hits': 2, 'misses': 3, 'evictions': 0}})
+    memory: size 1, hits 2, misses 3, evictions 0
+    """
+
+    return '\n'.join(
+        u'{0}: size {size}, hits {hits}, misses {misses}, evictions {evictions}'.format(name, **cache_stats)
+        for name, cache_stats in sorted(stats.iteritems())
+    )
+
+
+def get_exit_code(code):
+    if code is None:
+        return 0
+    elif isinstance(code, int):
+        return code
+    else:
+        print >>sys.stderr, code
+        return 1
+
+
+class Server(UnixStreamServer):
+    def __init__(self, socket_path=None, cache_size=64):
+        self.socket_path = socket_path or get_socket_path()
+        self.cache = MemoryCache(cache_size)
+        remove_stale_socket(self.socket_path)
+        UnixStreamServer.__init__(self, self.socket_path, RequestHandler)
+
+    def server_bind(self):
+        # do not let other users run pybtex on our behalf
+        umask = os.umask(0077)
+        try:
+            UnixStreamServer.server_bind(self)
+        finally:
+            os.umask(umask)
+
+    def server_close(self):
+        UnixStreamServer.server_close(self)
+        try:
+            os.remove(self.socket_path)
+        except EnvironmentError:
+            pass
+
+    def get_cache_stats(self):
+        stats = get_cache_stats()
+        stats['memory'] = self.cache.data.stats()
+        return stats
+
+    def run(self, argv, cwd, stdout, stderr):
+        """Run pybtex with the given arguments and return the exit code."""
+
+        from pybtex.__main__ import main
+
+        context = Context(stdout=stdout, stderr=stderr, cache=self.cache)
+        if '--server' in argv:
+            context.print_error(PybtexError('pybtex server is already running'))
+            return 1
+        if '--watch' in argv:
+            context.print_error(PybtexError('--watch is not supported by pybtex server'))
+            return 1
+        if '--server-stats' in argv:
+            print >>stdout, format_cache_stats(self.get_cache_stats())
+            return 0
+        saved_state = os.getcwd(), sys.stdout, sys.stderr
+        try:
+            os.chdir(cwd)
+        except EnvironmentError, error:
+            context.print_error(PybtexError(u'cannot change directory to {0}: {1}'.format(cwd, error.strerror)))
+            return 1
+        sys.stdout, sys.stderr = stdout, stderr
+        try:
+            main(argv, context=context)
+        except SystemExit, exit:
+            return get_exit_code(exit.code)
+        except Exception:
+            traceback.print_exc()
+            return 1
+        finally:
+            os.chdir(saved_state[0])
+            sys.stdout, sys.stderr = saved_state[1:]
+        return context.error_code
+
+
+def serve(socket_path=None):
+    server = Server(socket_path)
+    print >>errors.stderr, 'pybtex server listening on {0}'.format(server.socket_path)
+    # remove the socket on kill as well
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
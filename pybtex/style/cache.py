@@ -0,0 +1,170 @@
+# Copyright (c) 2009, 2010, 2011, 2012  Andrey Golovizin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Cache of rendered bibliography entries for the Pythonic style engine.
+
+Formatting an entry depends only on the entry data (including the data of
+cross-referenced entries), the label, the styles and the output backend.
+FormattedEntryCache stores the rendered text of each entry on disk (see
+pybtex.diskcache), so that only new and changed entries are formatted
+again. Labels and sorting are always computed for the whole bibliography.
+
+>>> import tempfile, shutil
+>>> from pybtex.database import Entry, Person
+>>> from pybtex.diskcache import DiskCache
+>>> from pybtex.style.formatting.unsrt import Style
+>>> from pybtex.backends.latex import Backend
+>>> disk_cache = DiskCache('entries', tempfile.mkdtemp())
+>>> entry = Entry('book', fields={'title': 'The Book', 'publisher': 'P', 'year': '2000'})
+>>> entry.add_person(Person('Smith, John'), 'author')
+>>> entry.key = 'smith'
+>>> def format_bibliography(entries):
+...     cache = FormattedEntryCache(Style(), Backend(), 'test.bbl', disk_cache)
+...     formatted_entries = list(Style().format_entries(entries, cache))
+...     cache.save()
+...     return [formatted_entry.text.render(Backend()) for formatted_entry in formatted_entries]
+>>> print format_bibliography([entry])[0]
+John Smith.
+\\newblock \\emph{The Book}.
+\\newblock P, 2000.
+>>> cache = FormattedEntryCache(Style(), Backend(), 'test.bbl', disk_cache)
+>>> print cache.get(entry, '1')
+John Smith.
+\\newblock \\emph{The Book}.
+\\newblock P, 2000.
+>>> print cache.get(entry, '2')
+None
+>>> entry.fields['year'] = '2001'
+>>> print cache.get(entry, '1')
+None
+>>> print format_bibliography([entry])[0]
+John Smith.
+\\newblock \\emph{The Book}.
+\\newblock P, 2001.
+>>> shutil.rmtree(disk_cache.base_dir)
+
+"""
+
+import sys
+import hashlib
+from os import path
+
+from pybtex.__version__ import version
+from pybtex.diskcache import DiskCache
+
+
+class RenderedText(object):
+    """Entry text that has already been rendered with some backend."""
+
+    def __init__(self, rendered, backend):
+        self.rendered = rendered
+        self.backend_class = type(backend)
+
+    def render(self, backend):
+        assert type(backend) is self.backend_class
+        return self.rendered
+
+
+def get_plugin_id(plugin):
+    """Identify the plugin class and the version of its source file."""
+
+    cls = type(plugin)
+    module = sys.modules.get(cls.__module__)
+    filename = getattr(module, '__file__', None)
+    try:
+        mtime = path.getmtime(filename) if filename else None
+    except EnvironmentError:
+        mtime = None
+    return cls.__module__, cls.__name__, filename, mtime
+
+
+def iter_entry_data(entry):
+    """Yield everything the formatted entry may depend on."""
+
+    seen = set()
+    while True:
+        yield entry.type
+        yield sorted(entry.fields.iteritems())
+        for role, persons in sorted(entry.persons.iteritems()):
+            yield role
+            for person in persons:
+                yield (
+                    person.first(), person.middle(), person.prelast(),
+                    person.last(), person.lineage(),
+                )
+        crossref = entry.fields.get('crossref')
+        if crossref is None or crossref.lower() in seen or entry.collection is None:
+            break
+        seen.add(crossref.lower())
+        try:
+            entry = entry.get_crossref()
+        except KeyError:
+            break
+        yield 'crossref'
+
+
+class FormattedEntryCache(object):
+    def __init__(self, style, backend, output_filename, disk_cache=None):
+        self.backend = backend
+        if disk_cache is None:
+            disk_cache = DiskCache('entries')
+        self.disk_cache = disk_cache
+        self.cache_key = repr((
+            version,
+            path.abspath(output_filename),
+            get_plugin_id(style),
+            get_plugin_id(style.name_style),
+            get_plugin_id(style.label_style),
+            get_plugin_id(style.sorting_style),
+            style.abbreviate_names,
+            get_plugin_id(backend),
+        ))
+        self.old_entries = disk_cache.load(self.cache_key) or {}
+        self.new_entries = {}
+
+    def get_entry_key(self, entry, label):
+        sha = hashlib.sha1(repr(unicode(label)))
+        for data in iter_entry_data(entry):
+            sha.update(repr(data))
+        return sha.digest()
+
+    def get(self, entry, label):
+        """Return the rendered entry text, or None if the entry is not cached."""
+
+        entry_key = self.get_entry_key(entry, label)
+        rendered = self.old_entries.get(entry_key)
+        if rendered is not None:
+            self.new_entries[entry_key] = rendered
+        return rendered
+
+    def render(self, entry, label, text):
+        """Render the formatted entry text and store it in the cache."""
+
+        rendered = text.render(self.backend)
+        self.new_entries[self.get_entry_key(entry, label)] = rendered
+        return RenderedText(rendered, self.backend)
+
+    def save(self):
+        """Save the entries used in this run to disk."""
+
+        if self.new_entries != self.old_entries:
+            self.disk_cache.save(self.cache_key, self.new_entries)
@@ -20,6 +20,7 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 from pybtex.style import FormattedEntry
+from pybtex.style.cache import RenderedText
 from pybtex.style.template import node, join
 from pybtex.richtext import Symbol, Text
 from pybtex.plugin import Plugin, find_plugin
@@ -45,14 +46,29 @@ class BaseStyle(Plugin):
         self.sort = self.sorting_style.sort
         self.abbreviate_names = abbreviate_names
 
-    def format_entries(self, entries):
+    def format_entries(self, entries, cache=None):
+        """Format the entries.
+
+        If cache (a pybtex.style.cache.FormattedEntryCache) is given, the text
+        of unchanged entries is taken from the cache, and the text of other
+        entries is rendered with the cache backend and stored in the cache.
+        """
+
         sorted_entries = self.sort(entries)
         labels = self.format_labels(sorted_entries)
         for label, entry in zip(labels, sorted_entries):
+            if cache is not None:
+                rendered = cache.get(entry, label)
+                if rendered is not None:
+                    yield FormattedEntry(entry.key, RenderedText(rendered, cache.backend), label)
+                    continue
+
             for persons in entry.persons.itervalues():
                 for person in persons:
                     person.text = self.format_name(person, self.abbreviate_names)
 
             f = getattr(self, "format_" + entry.type)
             text = f(entry)
+            if cache is not None:
+                text = cache.render(entry, label, text)
             yield FormattedEntry(entry.key, text, label)
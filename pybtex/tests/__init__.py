@@ -20,8 +20,30 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 
+import os
+import shutil
+import tempfile
 from difflib import unified_diff
 
 
+_old_cache_dir = None
+
+
+def setup_package():
+    """Keep the disk caches of the tests out of the user's cache directory."""
+
+    global _old_cache_dir
+    _old_cache_dir = os.environ.get('PYBTEX_CACHE_DIR')
+    os.environ['PYBTEX_CACHE_DIR'] = tempfile.mkdtemp(prefix='pybtex-cache-')
+
+
+def teardown_package():
+    shutil.rmtree(os.environ['PYBTEX_CACHE_DIR'], ignore_errors=True)
+    if _old_cache_dir is None:
+        del os.environ['PYBTEX_CACHE_DIR']
+    else:
+        os.environ['PYBTEX_CACHE_DIR'] = _old_cache_dir
+
+
 def diff(src, dst):
     return '\n'.join(unified_diff(src.splitlines(), dst.splitlines()))
@@ -1,6 +1,8 @@
 import os
 import pkgutil
 import posixpath
+from StringIO import StringIO
+from threading import Thread
 from contextlib import contextmanager
 from shutil import rmtree
 from tempfile import mkdtemp
@@ -9,6 +11,7 @@ from tempfile import mkdtemp
 from pybtex import io
 from pybtex import errors
 from pybtex import bibtex
+from pybtex.context import Context
 from pybtex.tests import diff
 
 
@@ -43,17 +46,27 @@ def write_aux(aux_name, bib_name, bst_name):
         aux_file.write(u'\\bibdata{{{0}}}\n'.format(bib_name))
 
 
-def check_make_bibliography(bib_name, bst_name):
+def make_bibliography(bib_name, bst_name, **kwargs):
     with cd_tempdir() as tempdir:
         copy_files(bib_name, bst_name)
         write_aux('test.aux', bib_name, bst_name)
         with errors.capture() as stderr:  # FIXME check error messages
-            bibtex.make_bibliography('test.aux')
+            bibtex.make_bibliography('test.aux', **kwargs)
         with io.open_unicode('test.bbl', 'r') as result_file:
-            result = result_file.read()
-        correct_result_name = '{0}_{1}.bbl'.format(bib_name, bst_name)
-        correct_result = pkgutil.get_data('pybtex.tests.data', correct_result_name).decode(io.get_default_encoding())
-        assert result == correct_result, diff(correct_result, result)
+            return result_file.read()
+
+
+def check_make_bibliography(bib_name, bst_name, options=None):
+    result = make_bibliography(bib_name, bst_name, **(options or {}))
+    correct_result_name = '{0}_{1}.bbl'.format(bib_name, bst_name)
+    correct_result = pkgutil.get_data('pybtex.tests.data', correct_result_name).decode(io.get_default_encoding())
+    assert result == correct_result, diff(correct_result, result)
+
+
+def check_same_bibliography(bib_name, bst_name, options):
+    correct_result = make_bibliography(bib_name, bst_name)
+    result = make_bibliography(bib_name, bst_name, **options)
+    assert result == correct_result, diff(correct_result, result)
 
 
 def test_bibtex_engine():
@@ -63,3 +76,102 @@ def test_bibtex_engine():
         ('cyrillic', 'unsrt'),
     ]:
         yield check_make_bibliography, bib_name, bst_name
+
+
+def test_compiled_bst():
+    for bib_name, bst_name in [
+        ('xampl', 'unsrt'),
+        ('xampl', 'plain'),
+        ('cyrillic', 'unsrt'),
+    ]:
+        yield check_make_bibliography, bib_name, bst_name, {'compile_bst': True}
+    for bst_name in 'apacite', 'jurabib':
+        yield check_same_bibliography, 'xampl', bst_name, {'compile_bst': True}
+
+
+def test_optimized_bst():
+    for options in {'optimize_bst': True}, {'optimize_bst': True, 'compile_bst': True}:
+        for bib_name, bst_name in [
+            ('xampl', 'unsrt'),
+            ('xampl', 'plain'),
+            ('cyrillic', 'unsrt'),
+        ]:
+            yield check_make_bibliography, bib_name, bst_name, options
+        for bst_name in 'apacite', 'jurabib':
+            yield check_same_bibliography, 'xampl', bst_name, options
+
+
+def test_profiled_bst():
+    for options in {'profile_bst': True}, {'profile_bst': True, 'compile_bst': True}:
+        yield check_make_bibliography, 'xampl', 'plain', options
+
+
+def test_concurrent_contexts():
+    styles = 'unsrt', 'plain', 'apacite', 'jurabib'
+    with cd_tempdir() as tempdir:
+        for bst_name in styles:
+            copy_files('xampl', bst_name)
+            write_aux(bst_name + '.aux', 'xampl', bst_name)
+
+        def run(bst_name):
+            context = Context(stderr=StringIO())
+            bibtex.make_bibliography(bst_name + '.aux', context=context)
+            with io.open_unicode(bst_name + '.bbl', 'r') as result_file:
+                return result_file.read(), context.stderr.getvalue(), context.error_code
+
+        expected = dict((bst_name, run(bst_name)) for bst_name in styles)
+        results = {}
+        def run_in_thread(bst_name):
+            results[bst_name] = run(bst_name)
+        error_code = errors.error_code
+        threads = [Thread(target=run_in_thread, args=(bst_name,)) for bst_name in styles]
+        with errors.capture() as stderr:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        assert not stderr.getvalue()
+        assert errors.error_code == error_code
+        for bst_name in styles:
+            assert expected[bst_name][1]
+            assert results[bst_name] == expected[bst_name], bst_name
+
+
+def test_fingerprint():
+    with cd_tempdir() as tempdir:
+        copy_files('xampl', 'unsrt')
+        write_aux('test.aux', 'xampl', 'unsrt')
+
+        def run(**kwargs):
+            context = Context(stderr=StringIO())
+            bibtex.make_bibliography('test.aux', context=context, **kwargs)
+            with io.open_unicode('test.bbl', 'r') as result_file:
+                return result_file.read(), context.stderr.getvalue(), context.error_code
+
+        def set_mtime(filename, mtime):
+            os.utime(filename, (mtime, mtime))
+            return os.stat(filename).st_mtime
+
+        result = run()
+        assert result[1] and result[2] == 2
+        mtime = set_mtime('test.bbl', 0)
+        assert run() == result
+        assert os.stat('test.bbl').st_mtime == mtime
+        assert run(force=True) == result
+        assert os.stat('test.bbl').st_mtime == mtime
+
+        with open('xampl.bib', 'a') as bib_file:
+            bib_file.write('\n@misc{added-entry, title = "Added in the meantime"}\n')
+        new_result = run()
+        assert 'Added in the meantime' in new_result[0]
+        assert os.stat('test.bbl').st_mtime != mtime
+        assert run() == new_result
+
+        # same output, different options
+        mtime = set_mtime('test.bbl', 0)
+        with open('test.bbl.fingerprint') as fingerprint_file:
+            fingerprint = fingerprint_file.read()
+        assert run(min_crossrefs=1) == new_result
+        with open('test.bbl.fingerprint') as fingerprint_file:
+            assert fingerprint_file.read() != fingerprint
+        assert os.stat('test.bbl').st_mtime == mtime
@@ -30,11 +30,14 @@ https://github.com/matthew-brett/babybib
 """
 
 
+from pybtex.context import Context, activate
 from pybtex.database import BibliographyData
-from pybtex.database import Entry, Person
+from pybtex.database import Entry, Person, LazyEntry
 from pybtex.database.input.bibtex import Parser
 from io import StringIO
+from StringIO import StringIO as ByteStringIO
 from itertools import izip_longest
+from random import Random
 
 from unittest import TestCase
 
@@ -55,7 +58,14 @@ class ParserTest(object):
     errors = []
 
     def test_parser(self):
-        parser = TestParser(encoding='UTF-8', **self.parser_options)
+        self.check_parser()
+
+    def test_lazy_parser(self):
+        # lazy entries report errors when accessed by the comparison
+        self.check_parser(lazy=True)
+
+    def check_parser(self, **options):
+        parser = TestParser(encoding='UTF-8', **dict(self.parser_options, **options))
         parser.parse_stream(StringIO(self.input))
         result = parser.data
         correct_result = self.correct_result
@@ -394,3 +404,178 @@ class UnusedEntryTest(ParserTest, TestCase):
         )
     """
     correct_result = BibliographyData()
+
+
+class IncrementalParserTest(TestCase):
+    input = u"""
+        @string{j = "Journal"}
+        @string{p = "Publisher"}
+        @preamble{"Preamble"}
+        @article{one, title = "One", journal = j}
+        @article{two, title = "Two", journal = j # " Letters", crossref = "proc"}
+        @book{three, publisher = p}
+        @string{j = "Other Journal"}
+        @article{four, journal = j}
+        @proceedings{proc, title = "Proceedings"}
+    """
+    edits = [
+        (u'"One"', u'"One!"'),
+        (u'"Journal"', u'"Magazine"'),
+        (u'{two,', u'{two2,'),
+        (u'"Publisher"', u'"Publisher" # " Inc."'),
+        (u'@string{j = "Other Journal"}', u''),
+        (u'"Preamble"', u'"New Preamble"'),
+        (u'@book{three', u'@misc{three'),
+        (u'crossref = "proc"', u'note = "no crossref"'),
+        (u'@article{four', u'@comment{four'),
+        (u'title = "One!"', u'title = "One", author = "Nobody"'),
+        (u'@article{one', u'article{one'),
+        (u'article{one', u'@article{one'),
+        (u'}\n', u'}\n@misc{new, note = j}\n'),
+        (u'@string{p', u'@string{j'),
+    ]
+
+    def assert_same_result(self, parser, parsed):
+        full_parser = TestParser()
+        full_parser.parse_stream(StringIO(parsed.text))
+        assert parsed.data == full_parser.data
+        assert parsed.data.preamble() == full_parser.data.preamble()
+        assert parsed.data.entries.keys() == full_parser.data.entries.keys()
+        assert parsed.data.crossref_count == full_parser.data.crossref_count
+        for key, entry in parsed.data.entries.iteritems():
+            assert entry.collection is parsed.data
+            assert entry.key == key
+
+    def test_edits(self):
+        parser = TestParser()
+        parsed = parser.parse_incremental(self.input)
+        self.assert_same_result(parser, parsed)
+        for old, new in self.edits:
+            assert old in parsed.text
+            parsed = parser.parse_incremental(parsed.text.replace(old, new, 1), parsed)
+            self.assert_same_result(parser, parsed)
+
+    def test_broken_string(self):
+        # the broken @string does not define j, it keeps the value of the first one
+        text = (
+            u'@string{j = "Journal"}\n'
+            u'@string{k = j # " X"}\n'
+            u'@ar@misc{x, a = j}ne, t@string{j {g"}tle = "One", journal = k}\n'
+            u'@article{two, title = {Two}, journal = j}\n'
+        )
+        parser = TestParser()
+        with activate(Context(stderr=ByteStringIO())):
+            parsed = parser.parse_incremental(text)
+            assert parsed.data.entries['two'].fields['journal'] == 'Journal'
+            parsed = parser.parse_incremental(text.replace(u'@string{j', u'@kng{j', 1), parsed)
+        assert parsed.data.entries['two'].fields['journal'] == ''
+        self.assert_same_result(parser, parsed)
+
+    def test_macro_change_is_linear(self):
+        class CountingParser(TestParser):
+            scanned = 0
+
+            def count_lines(self, text, start, end):
+                self.scanned += end - start
+                return super(CountingParser, self).count_lines(text, start, end)
+
+        text = u'@string{j = "Journal"}\n' + u''.join(
+            u'@article{a%i,\n  journal = j,\n}\n' % i for i in range(2000)
+        )
+        parser = CountingParser()
+        parsed = parser.parse_incremental(text)
+        parser.scanned = 0
+        parsed = parser.parse_incremental(text.replace(u'"Journal"', u'"Magazine"', 1), parsed)
+        # line numbers of the re-parsed entries are not counted from the start every time
+        assert parser.scanned <= 2 * len(text)
+        assert all(entry.fields['journal'] == 'Magazine' for entry in parsed.data.entries.itervalues())
+        self.assert_same_result(parser, parsed)
+
+    def test_random_edits(self):
+        random = Random(42)
+        snippets = [u'', u'@', u'{', u'}', u'"', u',', u' # j', u'j', u'\n', u'x = "y"', u'@misc{x}']
+        parser = TestParser()
+        parsed = parser.parse_incremental(self.input)
+        # suppress warnings about repeated entries
+        with activate(Context(stderr=ByteStringIO())):
+            for i in range(500):
+                text = parsed.text
+                start = random.randrange(len(text) + 1)
+                end = min(len(text), start + random.randrange(5))
+                new_text = text[:start] + random.choice(snippets) + text[end:]
+                parsed = parser.parse_incremental(new_text, parsed)
+                self.assert_same_result(parser, parsed)
+
+
+class LazyParserTest(TestCase):
+    input = u"""
+        @string{j = "Journal"}
+        @article{one, journal = j, author = "Doe, John"}
+        @string{j = "Magazine"}
+        @article{two, journal = j, crossref = "three"}
+        @book{three, title = "Three"}
+    """
+
+    def test_lazy_entries(self):
+        parser = TestParser(lazy=True)
+        data = parser.parse_stream(StringIO(self.input))
+        assert data.entries.keys() == ['one', 'two', 'three']
+        assert data.crossref_count['three'] == 1
+        assert isinstance(data.entries._dict['one'], LazyEntry)
+        assert isinstance(data.entries._dict['two'], Entry)
+        assert isinstance(data.entries._dict['three'], LazyEntry)
+
+        two = data.entries['two']
+        assert two.fields['journal'] == 'Magazine'
+        assert two.fields['title'] == 'Three'
+        assert isinstance(data.entries._dict['one'], LazyEntry)
+        assert isinstance(data.entries._dict['three'], Entry)
+
+        one = data.entries['ONE']
+        assert one.key == 'one'
+        assert one.collection is data
+        assert one.fields['journal'] == 'Journal'
+        assert one.persons['author'] == [Person('Doe, John')]
+        assert data.entries['one'] is one
+        assert not parser.errors
+
+    def test_malformed_entries(self):
+        text = u"""
+            @string{j = "Journal"}
+            @article{one, title = {One}}
+            @article{two, title @misc(y, b = j)= {Two {TeX}}}
+            @article{three, title = "Three", email = {a@b}}
+        """
+        eager_parser = TestParser()
+        eager_data = eager_parser.parse_stream(StringIO(text))
+        lazy_parser = TestParser(lazy=True)
+        lazy_data = lazy_parser.parse_stream(StringIO(text))
+        assert 'y' in eager_data.entries
+        assert lazy_data.entries.keys() == eager_data.entries.keys()
+        assert lazy_data == eager_data
+        assert len(lazy_parser.errors) == len(eager_parser.errors)
+
+
+class StreamingParserTest(TestCase):
+    input = u"""
+        @article{one, title = {One}, note = {Unclosed
+        @article{two, title = "Two"}
+        @article{three, title = "Three"}
+        @article{four, title = "Four"}
+    """
+
+    def test_unclosed_brace(self):
+        parser = TestParser()
+        entries = list(parser.iter_entries(StringIO(self.input)))
+        eager_parser = TestParser()
+        eager_data = eager_parser.parse_stream(StringIO(self.input))
+        assert [key for key, entry in entries] == eager_data.entries.keys() == ['one']
+        assert len(parser.errors) == len(eager_parser.errors) == 1
+
+    def test_max_command_size(self):
+        parser = TestParser()
+        parser.max_command_size = 100
+        entries = dict(parser.iter_entries(StringIO(self.input)))
+        assert sorted(entries) == ['four', 'one']
+        assert entries['four'].fields['title'] == 'Four'
+        assert len(parser.errors) == 1
@@ -0,0 +1,190 @@
+"""Compare the BibTeX string functions with their original (slower)
+implementations on random strings."""
+
+import re
+import random
+
+from pybtex.bibtex import utils
+from pybtex.bibtex.utils import BibTeXString, scan_bibtex_string
+
+
+def old_change_case(string, mode):
+    def title(char, state):
+        if state == 'start':
+            return char
+        else:
+            return char.lower()
+
+    lower = lambda char, state: char.lower()
+    upper = lambda char, state: char.upper()
+
+    convert = {'l': lower, 'u': upper, 't': title}[mode]
+
+    def convert_special_char(special_char, state):
+        def convert_words(words):
+            for word in words:
+                if word.startswith('\\'):
+                    yield word
+                else:
+                    yield convert(word, state)
+
+        return ' '.join(convert_words(special_char.split(' ')))
+
+    def change_case_iter(string, mode):
+        state = 'start'
+        for char, brace_level in scan_bibtex_string(string):
+            if brace_level == 0:
+                yield convert(char, state)
+                if char == ':':
+                    state = 'after colon'
+                elif char.isspace() and state == 'after colon':
+                    state = 'start'
+                else:
+                    state = 'normal'
+            else:
+                if brace_level == 1 and char.startswith('\\'):
+                    yield convert_special_char(char, state)
+                else:
+                    yield char
+
+    return ''.join(change_case_iter(string, mode))
+
+
+def old_bibtex_len(string):
+    length = 0
+    for char, brace_level in scan_bibtex_string(string):
+        if char not in '{}':
+            length += 1
+    return length
+
+
+def old_bibtex_prefix(string, num_chars):
+    def prefix():
+        length = 0
+        for char, brace_level in scan_bibtex_string(string):
+            yield char
+            if char not in '{}':
+                length += 1
+            if length >= num_chars:
+                break
+        for i in range(brace_level):
+            yield '}'
+    return ''.join(prefix())
+
+
+def old_bibtex_purify(string):
+    def purify_iter(string):
+        for token, brace_level in scan_bibtex_string(string):
+            if brace_level == 1 and token.startswith('\\'):
+                for char in utils.purify_special_char_re.sub('', token):
+                    if char.isalnum():
+                        yield char
+            else:
+                if token.isalnum():
+                    yield token
+                elif token.isspace() or token in '-~':
+                    yield ' '
+
+    return ''.join(purify_iter(string))
+
+
+def old_bibtex_first_letter(string):
+    for char in BibTeXString(string):
+        if char.startswith('\\') and char != '\\':
+            return u'{{{0}}}'.format(char)
+        elif char.isalpha():
+            return char
+    return ''
+
+
+def old_split_tex_string(string, sep=None, strip=True, filter_empty=False):
+    if sep is None:
+        sep = '[\s~]+'
+        filter_empty = True
+    sep_re = re.compile(sep)
+    brace_level = 0
+    name_start = 0
+    result = []
+    string_len = len(string)
+    pos = 0
+    for pos, char in enumerate(string):
+        if char == '{':
+            brace_level += 1
+        elif char == '}':
+            brace_level -= 1
+        elif brace_level == 0 and pos > 0:
+            match = sep_re.match(string[pos:])
+            if match:
+                sep_len = len(match.group())
+                if pos + sep_len < string_len:
+                    result.append(string[name_start:pos])
+                    name_start = pos + sep_len
+    if name_start < string_len:
+        result.append(string[name_start:])
+    if strip:
+        result = [part.strip() for part in result]
+    if filter_empty:
+        result = [part for part in result if part]
+    return result
+
+
+alphabet = u'{{{}}}\\\\aAbBzZ::  ~-.,1\xe9\xc9'
+
+
+def random_strings(count, max_length=12, seed=42):
+    rand = random.Random(seed)
+    for i in range(count):
+        length = rand.randint(0, max_length)
+        yield u''.join(rand.choice(alphabet) for i in range(length))
+
+
+def check_same(function, old_function, *args):
+    result = function(*args)
+    expected = old_function(*args)
+    assert result == expected, (args, result, expected)
+
+
+def test_random_strings():
+    for string in random_strings(3000):
+        check_same(utils.change_case, old_change_case, string, 'l')
+        check_same(utils.change_case, old_change_case, string, 'u')
+        check_same(utils.change_case, old_change_case, string, 't')
+        check_same(utils.bibtex_len, old_bibtex_len, string)
+        check_same(utils.bibtex_purify, old_bibtex_purify, string)
+        check_same(utils.bibtex_first_letter, old_bibtex_first_letter, string)
+        check_same(utils.split_tex_string, old_split_tex_string, string)
+        check_same(utils.split_tex_string, old_split_tex_string, string, ',')
+        check_same(utils.split_tex_string, old_split_tex_string, string, ' ', False, False)
+        # the old implementation fails on empty strings
+        if string:
+            for num_chars in range(-1, len(string) + 2):
+                check_same(utils.bibtex_prefix, old_bibtex_prefix, string, num_chars)
+
+
+def test_random_name_lists():
+    rand = random.Random(42)
+    words = [u'and', u'And', u' ', u'  ', u'{', u'}', u'~', u'A.', u'de', u'{\\o}', u',']
+    for i in range(3000):
+        string = u''.join(rand.choice(words) for i in range(rand.randint(0, 15)))
+        check_same(utils.split_name_list, lambda string: old_split_tex_string(string, ' and '), string)
+
+
+def test_wrapping_writer():
+    from io import StringIO
+    rand = random.Random(42)
+    words = [u'a', u'word', u'{\\TeX}', u' ', u' ', u'  ', u'\n', u'~', u'x' * 40, u'y' * 90]
+    for i in range(1000):
+        blocks = [
+            [u''.join(rand.choice(words) for i in range(rand.randint(0, 30)))
+            for i in range(rand.randint(0, 5))]
+            for i in range(rand.randint(1, 5))
+        ]
+        stream = StringIO()
+        writer = utils.WrappingWriter(stream, buffer_size=rand.randint(1, 200))
+        for block in blocks:
+            for string in block:
+                writer.write(string)
+            writer.newline()
+        writer.flush()
+        expected = u''.join(utils.wrap(u''.join(block)) + u'\n' for block in blocks)
+        assert stream.getvalue() == expected, (blocks, stream.getvalue(), expected)
@@ -0,0 +1,123 @@
+# Copyright (c) 2009, 2010, 2011, 2012  Andrey Golovizin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Benchmark the BibTeX interpreter on xampl.bib with plain.bst.
+
+Run with python -m pybtex.tests.bst_benchmark [repeat].
+
+Besides the run time, count how many objects of the interpreter's own
+classes (functions, variables, missing field markers) are allocated while
+the bibliography is formatted. The style and the .bib file are parsed only
+once, so parsing is not measured.
+"""
+
+import gc
+import sys
+import time
+import pkgutil
+from io import StringIO
+from contextlib import contextmanager
+
+from pybtex import errors
+from pybtex.bibtex import bst, interpreter
+from pybtex.database.input.bibtex import Parser
+
+
+counted_classes = (
+    interpreter.Function,
+    interpreter.Variable,
+    interpreter.MissingField,
+)
+
+
+@contextmanager
+def count_allocations(classes):
+    """Count instances of the given classes (and subclasses) created
+    inside the with block."""
+
+    counts = {}
+    originals = [(cls, cls.__dict__.get('__new__')) for cls in classes]
+
+    def make_new(cls, original_new):
+        def __new__(subclass, *args, **kwargs):
+            counts[subclass.__name__] = counts.get(subclass.__name__, 0) + 1
+            if original_new is not None:
+                return original_new(subclass, *args, **kwargs)
+            return super(cls, subclass).__new__(subclass)
+        return staticmethod(__new__)
+
+    for cls, original_new in originals:
+        cls.__new__ = make_new(cls, original_new and original_new.__func__)
+    try:
+        yield counts
+    finally:
+        for cls, original_new in originals:
+            if original_new is None:
+                del cls.__new__
+            else:
+                cls.__new__ = original_new
+
+
+def get_data(filename):
+    return pkgutil.get_data('pybtex.tests.data', filename).decode('latin1')
+
+
+class BenchmarkInterpreter(interpreter.Interpreter):
+    """Interpreter that uses already parsed bibliography data,
+    so that only the style code is measured."""
+
+    def __init__(self, bib_data):
+        super(BenchmarkInterpreter, self).__init__(Parser, None)
+        self.parsed_bib_data = bib_data
+
+    def command_read(self):
+        self.bib_data = self.parsed_bib_data
+        self.citations = list(self.bib_data.entries.keys())
+
+
+def run(repeat=10):
+    script = bst.parse_stream(StringIO(get_data('plain.bst')))
+    bib_data = Parser().parse_stream(StringIO(get_data('xampl.bib')))
+    times = []
+    for i in range(repeat):
+        gc.collect()
+        interp = BenchmarkInterpreter(bib_data)
+        with errors.capture():
+            with count_allocations(counted_classes) as counts:
+                start = time.time()
+                interp.run(script, ['*'], [], StringIO(), min_crossrefs=2)
+                times.append(time.time() - start)
+    return min(times), counts
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    best_time, counts = run(repeat)
+    print 'best of %i: %.3fs' % (repeat, best_time)
+    print 'allocations per run:'
+    for name, count in sorted(counts.items()):
+        print '    %-16s %i' % (name, count)
+    print '    %-16s %i' % ('total', sum(counts.values()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+from pybtex import errors, io
+from pybtex import bibtex
+from pybtex.bibtex.bst import parse_stream
+from pybtex.bibtex.compiler import FunctionCompiler
+from pybtex.bibtex.optimizer import optimize, format_program
+from pybtex.tests.bibtex_engine_test import cd_tempdir, write_aux
+
+
+recursive_bst = u"""
+ENTRY {} {} {}
+INTEGERS { n }
+FUNCTION {countdown} { n #0 > { n int.to.str$ write$ n #1 - 'n := countdown } 'skip$ if$ }
+FUNCTION {ping} { n #2 > { n #1 - 'n := pong } 'skip$ if$ }
+FUNCTION {pong} { "pong" write$ ping }
+FUNCTION {main} { #3 'n := countdown newline$ #6 'n := ping newline$ }
+READ
+EXECUTE {main}
+"""
+
+
+def make_nested_bst(depth):
+    body = u'"x" write$'
+    for level in range(depth):
+        body = u"#1 'n := { n #0 > } { #0 'n := %s } while$" % body
+    return u"""
+ENTRY {} {} {}
+INTEGERS { n }
+FUNCTION {main} { %s newline$ }
+READ
+EXECUTE {main}
+""" % body
+
+
+def test_self_recursive_function():
+    program = parse_stream([
+        'INTEGERS { n }',
+        'FUNCTION {f} { n #0 > {f} {} if$ }',
+        'FUNCTION {g} { #3 \'n := f }',
+    ])
+    assert format_program(optimize(program)).splitlines()[-1] == u"{ #3 'n := f }"
+
+
+def make_bibliography(**kwargs):
+    bibtex.make_bibliography('test.aux', force=True, **kwargs)
+    with io.open_unicode('test.bbl') as bbl_file:
+        return bbl_file.read()
+
+
+def test_recursive_functions():
+    with cd_tempdir():
+        with io.open_unicode('recursive.bst', 'w') as bst_file:
+            bst_file.write(recursive_bst)
+        with io.open_unicode('test.bib', 'w') as bib_file:
+            bib_file.write(u'@misc{test}\n')
+        write_aux('test.aux', 'test', 'recursive')
+        with errors.capture():
+            result = make_bibliography()
+            assert result == u'321\npongpongpongpong\n'
+            assert make_bibliography(optimize_bst=True) == result
+            assert make_bibliography(optimize_bst=True, compile_bst=True) == result
+
+
+def test_nested_loops():
+    with cd_tempdir():
+        with io.open_unicode('nested.bst', 'w') as bst_file:
+            bst_file.write(make_nested_bst(30))
+        with io.open_unicode('test.bib', 'w') as bib_file:
+            bib_file.write(u'@misc{test}\n')
+        write_aux('test.aux', 'test', 'nested')
+        with errors.capture():
+            assert make_bibliography(compile_bst=True) == u'x\n'
+            # Python refuses the code, the function is interpreted
+            max_depth = FunctionCompiler.max_depth
+            FunctionCompiler.max_depth = 100
+            try:
+                assert make_bibliography(compile_bst=True) == u'x\n'
+            finally:
+                FunctionCompiler.max_depth = max_depth
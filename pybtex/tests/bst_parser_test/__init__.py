@@ -1,4 +1,7 @@
+import os
 import pkgutil
+import shutil
+import tempfile
 
 from pybtex.bibtex import bst
 from io import StringIO
@@ -25,3 +28,30 @@ def check_bst_parser(dataset_name):
 def test_bst_parser():
     for dataset_name in test_data:
         yield check_bst_parser, dataset_name
+
+
+def test_bst_cache():
+    cache_dir = tempfile.mkdtemp()
+    old_cache_dir = os.environ.get('PYBTEX_CACHE_DIR')
+    os.environ['PYBTEX_CACHE_DIR'] = cache_dir
+    try:
+        bst_filename = os.path.join(cache_dir, 'test.bst')
+        with open(bst_filename, 'wb') as bst_file:
+            bst_file.write(pkgutil.get_data('pybtex.tests.data', 'plain.bst'))
+        from pybtex.tests.bst_parser_test.plain import bst as correct_result
+        assert bst.parse_file(bst_filename, 'latin1') == correct_result
+        assert os.listdir(os.path.join(cache_dir, 'bst'))
+        assert bst.parse_file(bst_filename, 'latin1') == correct_result
+
+        with open(bst_filename, 'ab') as bst_file:
+            bst_file.write('EXECUTE {end.bib}\n')
+        os.utime(bst_filename, (0, 0))
+        result = bst.parse_file(bst_filename, 'latin1')
+        assert result[:-1] == correct_result
+        assert result[-1] == [u'EXECUTE', [bst.Identifier(u'end.bib')]]
+    finally:
+        if old_cache_dir is None:
+            del os.environ['PYBTEX_CACHE_DIR']
+        else:
+            os.environ['PYBTEX_CACHE_DIR'] = old_cache_dir
+        shutil.rmtree(cache_dir)
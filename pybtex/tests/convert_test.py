@@ -0,0 +1,71 @@
+import os
+from os import path
+
+from nose.tools import assert_raises
+
+from pybtex import errors
+from pybtex.database.convert.__main__ import main
+from pybtex.tests.bibtex_engine_test import cd_tempdir
+
+
+def write_file(filename, data):
+    directory = path.dirname(filename)
+    if directory and not path.isdir(directory):
+        os.makedirs(directory)
+    with open(filename, 'wb') as f:
+        f.write(data)
+
+
+def write_bib_files(broken=False):
+    write_file('in/a.bib', '@article{a, title = "A", year = 2000}\n')
+    write_file('in/sub/b.bib', '@book{b, title = "B", year = 2001}\n')
+    if broken:
+        # not valid UTF-8
+        write_file('in/broken.bib', '@misc{c, title = "\xff"}\n')
+
+
+def run_convert(*args):
+    error_code = errors.error_code
+    try:
+        with errors.capture() as stderr:
+            with assert_raises(SystemExit) as exit:
+                main(list(args))
+    finally:
+        errors.error_code = error_code
+    return exit.exception.code, stderr.getvalue()
+
+
+def test_batch():
+    with cd_tempdir():
+        write_bib_files(broken=True)
+        exit_code, stderr = run_convert('--batch', '-j', '1', '-t', 'bibtexml', '-o', 'out', 'in')
+        assert exit_code == 1
+        lines = stderr.splitlines()
+        assert len(lines) == 2, lines
+        assert lines[0].startswith(path.join('in', 'broken.bib') + ': ERROR: ')
+        assert lines[1].startswith('converted 2 of 3 files (0.0 MB) in ')
+        assert lines[1].endswith('MB/s')
+        assert 'files/s' in lines[1]
+        assert path.isfile('out/a.xml')
+        assert path.isfile('out/sub/b.xml')
+        assert not path.exists('out/broken.xml')
+
+
+def test_batch_pool():
+    with cd_tempdir():
+        write_bib_files()
+        exit_code, stderr = run_convert('--batch', '-j', '2', '-t', 'bibtexml', 'in')
+        assert exit_code == 0
+        assert stderr.startswith('converted 2 of 2 files')
+        assert path.isfile('in/a.xml')
+        assert path.isfile('in/sub/b.xml')
+
+
+def test_batch_output_collision():
+    with cd_tempdir():
+        write_file('a/x.bib', '@misc{a}\n')
+        write_file('b/x.bib', '@misc{b}\n')
+        exit_code, stderr = run_convert('--batch', '-t', 'bibtexml', '-o', 'out', 'a/x.bib', 'b/x.bib')
+        assert exit_code == 1
+        assert 'would be written for both a/x.bib and b/x.bib' in stderr
+        assert not path.exists('out')
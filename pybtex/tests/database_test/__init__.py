@@ -50,6 +50,21 @@ class DatabaseIOTest(TestCase):
         self.assertEqual(pickle.loads(pickle.dumps(loaded_data, 1)), self.reference_data)
         self.assertEqual(pickle.loads(pickle.dumps(loaded_data, 2)), self.reference_data)
 
+    def _test_streaming(self, plugin):
+        parser = find_plugin('pybtex.database.input', plugin)(encoding='UTF-8')
+        writer = find_plugin('pybtex.database.output', plugin)(encoding='UTF-8')
+        stream = BytesIO()
+        writer_stream = TextIOWrapper(stream, 'UTF-8') if writer.unicode_io else stream
+        parser_stream = TextIOWrapper(stream, 'UTF-8') if parser.unicode_io else stream
+        entries = self.reference_data.entries.iteritems()
+        writer.write_entries(self.reference_data, entries, writer_stream)
+        writer_stream.flush()
+        stream.seek(0)
+        loaded_entries = dict(parser.iter_entries(parser_stream))
+        self.assertEqual(loaded_entries, dict(self.reference_data.entries.iteritems()))
+        self.assertEqual(parser.data.preamble(), self.reference_data.preamble())
+        self.assertFalse(parser.data.entries)
+
     def test_bibtex_input(self):
         self._test_input('bibtex')
 
@@ -61,6 +76,16 @@ class DatabaseIOTest(TestCase):
         self.reference_data._preamble = []
         self._test_input('bibtexml')
 
+    def test_bibtex_streaming(self):
+        self._test_streaming('bibtex')
+
+    def test_bibyaml_streaming(self):
+        self._test_streaming('bibyaml')
+
+    def test_bibtexml_streaming(self):
+        self.reference_data._preamble = []
+        self._test_streaming('bibtexml')
+
     def test_repr(self):
         from pybtex.utils import OrderedCaseInsensitiveDict
         from pybtex.database import BibliographyData
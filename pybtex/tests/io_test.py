@@ -125,3 +125,54 @@ class IOTest(TestCase):
         )
         self.assertEqual(file.name, '/home/test/foo.bbl')
         self.assertEqual(file.mode, 'wb')
+
+
+class WriteIfChangedTest(TestCase):
+    def setUp(self):
+        import tempfile
+        self.directory = tempfile.mkdtemp()
+        self.filename = posixpath.join(self.directory, 'foo.bbl')
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.directory)
+
+    def test_write_if_changed(self):
+        import os
+        self.assertTrue(io.write_if_changed(self.filename, 'data'))
+        os.utime(self.filename, (0, 0))
+        self.assertFalse(io.write_if_changed(self.filename, 'data'))
+        self.assertEqual(os.stat(self.filename).st_mtime, 0)
+        self.assertTrue(io.write_if_changed(self.filename, 'new data'))
+        with open(self.filename, 'rb') as new_file:
+            self.assertEqual(new_file.read(), 'new data')
+        self.assertEqual(os.listdir(self.directory), ['foo.bbl'])
+
+    def test_write_to_missing_dir(self):
+        from pybtex.exceptions import PybtexError
+        self.assertRaises(
+            PybtexError,
+            io.write_if_changed, posixpath.join(self.directory, 'nodir', 'foo.bbl'), 'data',
+        )
+
+    def test_replace_on_windows(self):
+        import os
+
+        def windows_rename(src, dst):
+            if os.path.exists(dst):
+                raise OSError(errno.EEXIST, 'file exists')
+            rename(src, dst)
+
+        rename = os.rename
+        name = os.name
+        os.rename = windows_rename
+        os.name = 'nt'
+        try:
+            self.assertTrue(io.write_if_changed(self.filename, 'data'))
+            self.assertTrue(io.write_if_changed(self.filename, 'new data'))
+        finally:
+            os.rename = rename
+            os.name = name
+        with open(self.filename, 'rb') as new_file:
+            self.assertEqual(new_file.read(), 'new data')
+        self.assertEqual(os.listdir(self.directory), ['foo.bbl'])
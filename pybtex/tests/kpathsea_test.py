@@ -0,0 +1,131 @@
+import os
+import stat
+from os import path
+
+from pybtex.context import activate, get_current_context
+from pybtex.diskcache import DiskCache
+from pybtex.kpathsea import Resolver
+from pybtex.utils import reset_caches
+from pybtex.tests.bibtex_engine_test import cd_tempdir
+
+
+fake_kpsewhich = """#!/bin/sh
+echo "$@" >> kpsewhich.log
+for arg in "$@"; do
+    case "$arg" in
+        -show-path=*) echo '.:$TEXMF/bibtex//' ;;
+        *) if [ -f "texmf/$arg" ]; then echo "texmf/$arg"; fi ;;
+    esac
+done
+"""
+
+
+def write_file(filename, text=''):
+    directory = path.dirname(filename)
+    if directory and not path.isdir(directory):
+        os.makedirs(directory)
+    with open(filename, 'w') as f:
+        f.write(text)
+
+
+def make_ls_r(root, files):
+    directories = {}
+    for filename in files:
+        directory, basename = path.split(filename)
+        directories.setdefault(directory, []).append(basename)
+    lines = ['% ls-R -- filename database for kpathsea; do not change this line.']
+    for directory, basenames in sorted(directories.items()):
+        lines.append(path.join('.', directory).rstrip('/') + ':')
+        lines.extend(basenames)
+        lines.append('')
+    write_file(path.join(root, 'ls-R'), '\n'.join(lines))
+
+
+def make_fake_kpsewhich():
+    """Return the search path with the fake kpsewhich."""
+
+    write_file('bin/kpsewhich', fake_kpsewhich)
+    os.chmod('bin/kpsewhich', stat.S_IRWXU)
+    return path.abspath('bin')
+
+
+def read_log():
+    with open('kpsewhich.log') as log:
+        return log.read().splitlines()
+
+
+def make_resolver(**environ):
+    return Resolver(environ, disk_cache=DiskCache('kpathsea', path.abspath('cache')))
+
+
+def test_search_path():
+    with cd_tempdir():
+        write_file('first/test.bib')
+        write_file('second/sub/test.bib')
+        write_file('second/sub/other.bib')
+        resolver = make_resolver(BIBINPUTS='first:second//')
+        assert resolver.find('test.bib') == path.abspath('first/test.bib')
+        assert resolver.find('other.bib') == path.abspath('second/sub/other.bib')
+        assert resolver.find('sub/other.bib') == path.abspath('second/sub/other.bib')
+        assert resolver.find('missing.bib') is None
+        # BIBINPUTS is not used for .bst files
+        assert make_resolver(BIBINPUTS='first', BSTINPUTS='second').find('test.bst') is None
+
+
+def test_ls_r():
+    with cd_tempdir():
+        write_file('texmf/bibtex/bst/base/plain.bst')
+        write_file('texmf/bibtex/bst/base/unlisted.bst')
+        make_ls_r('texmf', ['bibtex/bst/base/plain.bst', 'bibtex/bst/base/removed.bst'])
+        resolver = make_resolver(BSTINPUTS='!!' + path.abspath('texmf') + '//')
+        assert resolver.find('plain.bst') == path.abspath('texmf/bibtex/bst/base/plain.bst')
+        # only the files in ls-R are found
+        assert resolver.find('unlisted.bst') is None
+        # ls-R may be outdated
+        assert resolver.find('removed.bst') is None
+
+        # without !!, files missing from ls-R are looked for on disk
+        resolver = make_resolver(BSTINPUTS=path.abspath('texmf') + '//')
+        assert resolver.find('unlisted.bst') == path.abspath('texmf/bibtex/bst/base/unlisted.bst')
+
+
+def test_batched_kpsewhich():
+    with cd_tempdir():
+        write_file('texmf/one.bib')
+        write_file('texmf/two.bib')
+        search_path = make_fake_kpsewhich()
+        resolver = make_resolver(PATH=search_path)
+        found = resolver.find_all(['one.bib', 'two.bib', 'three.bib'])
+        assert found == {
+            'one.bib': 'texmf/one.bib',
+            'two.bib': 'texmf/two.bib',
+            'three.bib': None,
+        }
+        assert resolver.find('one.bib') == 'texmf/one.bib'
+        assert read_log() == ['-show-path=bib', 'one.bib three.bib two.bib']
+
+        # the search path is remembered in this process
+        make_resolver(PATH=search_path).find('two.bib')
+        assert read_log()[2:] == ['two.bib']
+        reset_caches()
+        make_resolver(PATH=search_path).find('two.bib')
+        assert read_log()[3:] == ['-show-path=bib', 'two.bib']
+
+
+def test_no_kpsewhich():
+    with cd_tempdir():
+        write_file('test.bib')
+        resolver = make_resolver(PATH=path.abspath('bin'))
+        assert resolver.find('missing.bib') is None
+        assert resolver.find('test.bib') == path.abspath('test.bib')
+
+
+def test_default_context_resolver():
+    with cd_tempdir():
+        with activate():
+            assert get_current_context().resolver.find('late.bib') is None
+            write_file('late.bib')
+            # the results are remembered during a run
+            assert get_current_context().resolver.find('late.bib') is None
+        with activate():
+            assert get_current_context().resolver.find('late.bib') == path.abspath('late.bib')
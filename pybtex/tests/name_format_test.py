@@ -0,0 +1,68 @@
+import re
+import pkgutil
+
+from pybtex.database import Person
+from pybtex.bibtex.names import NameFormat, format as format_name
+from pybtex.tests.parse_name_test import sample_names
+
+
+def get_bst_name_formats():
+    formats = set()
+    for bst_name in 'plain', 'unsrt', 'apacite', 'jurabib':
+        bst = pkgutil.get_data('pybtex.tests.data', bst_name + '.bst')
+        formats.update(re.findall(r'"([^"]*)"\s+format\.name\$', bst))
+    return sorted(formats)
+
+
+tricky_formats = [
+    '{f.~}',
+    '{vv~}{ll}{, jj}{, ff}',
+    '{vv~}{ll}{, jj}{, f.}',
+    '{f~.}',
+    '{f{.}~}',
+    '{ll~~}{ff}',
+    '{jj}',
+    '{vv}',
+    '{ll{}}',
+    '{{abc}{def}ff~{xyz}{#@$}}',
+    'abc def {f~} xyz {f}?',
+    'no name parts',
+    '',
+]
+
+tricky_names = [
+    '',
+    'Anonymous',
+    'von Last',
+    'Last, Jr, First',
+    'Charles Louis Xavier Joseph de la Vallee Poussin',
+    '{\\relax Ch}ristopher {J}ohnson',
+]
+
+
+def format_interpreted(name, format):
+    person = Person(name)
+    return ''.join(part.format(person) for part in NameFormat(format).parts)
+
+
+def check_name_format(format, names):
+    for name in names:
+        expected = format_interpreted(name, format)
+        assert NameFormat(format).format(name) == expected, (name, format)
+        # cached compiled format and parsed name
+        assert format_name(name, format) == expected, (name, format)
+
+
+def test_compiled_name_formats():
+    names = [name for name, parts in sample_names] + tricky_names
+    for format in get_bst_name_formats() + tricky_formats:
+        yield check_name_format, format, names
+
+
+def test_tricky_name_formats():
+    assert format_name('Charles Louis Xavier Joseph de la Vallee Poussin', '{f.~}') == 'C.~L. X.~J. '
+    assert format_name('Anonymous', '{vv~}{ll}{, jj}{, ff}') == 'Anonymous'
+    assert format_name('de la Fontaine, Jr., Jean', '{vv~}{ll}{, jj}{, ff}') == 'de~la Fontaine, Jr., Jean'
+    assert format_name('Anonymous', '{ff~}') == ''
+    assert format_name('', '{ll}') == ''
+    assert format_name('Anonymous', 'abc') == 'abc'
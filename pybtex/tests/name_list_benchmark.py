@@ -0,0 +1,75 @@
+# Copyright (c) 2009, 2010, 2011, 2012  Andrey Golovizin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Benchmark splitting and formatting of long author lists.
+
+Run with python -m pybtex.tests.name_list_benchmark [number of authors...].
+
+Large collaborations in physics publish papers with thousands of authors.
+The BST code of most styles calls num.names$ once and format.name$ for each
+author, so the whole list is split many times.
+"""
+
+import sys
+import time
+
+from pybtex.bibtex import utils
+from pybtex.bibtex.names import format as format_name
+
+
+def make_author_list(num_authors):
+    return u' and '.join(
+        u'A.~B. {{van der}} Auth{{\\"o}}r{0}, Jr'.format(n) for n in range(num_authors)
+    )
+
+
+def timed(f, *args):
+    start = time.time()
+    f(*args)
+    return time.time() - start
+
+
+def split_uncached(names):
+    # bypass the LRU cache to measure the splitting itself
+    utils.split_tex_string.cache.clear()
+    return utils.split_name_list(names)
+
+
+def format_all(names):
+    for name in split_uncached(names):
+        format_name(name, u'{ff~}{vv~}{ll}{, jj}')
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 5000]
+    print '{0:>8} {1:>10} {2:>10} {3:>10}'.format('authors', 'chars', 'split', 'format')
+    for num_authors in sizes:
+        names = make_author_list(num_authors)
+        print '{0:>8} {1:>10} {2:>10.4f} {3:>10.4f}'.format(
+            num_authors, len(names),
+            timed(split_uncached, names),
+            timed(format_all, names),
+        )
+
+
+if __name__ == '__main__':
+    main()
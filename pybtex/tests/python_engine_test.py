@@ -0,0 +1,188 @@
+import os
+import re
+import sys
+from StringIO import StringIO
+from contextlib import contextmanager
+
+import pybtex
+from pybtex import io
+from pybtex.context import Context
+from pybtex.fingerprint import Fingerprint
+from pybtex.style.cache import FormattedEntryCache
+from pybtex.tests.bibtex_engine_test import cd_tempdir, write_aux
+
+
+bib_entries = [
+    ('article', u'smith', u'author = "John Smith", title = "An Article", journal = "Journal", year = "2000"'),
+    ('book', u'jones', u'author = "Jane Jones", title = "A Book", publisher = "Publisher", year = "2001"'),
+    ('inproceedings', u'brown', u'author = "Bob Brown", title = "A Paper", booktitle = "Proceedings", year = "2002", crossref = "proc"'),
+    ('proceedings', u'proc', u'title = "Proceedings", editor = "Ed Editor", year = "2002"'),
+]
+
+
+def write_bib(filename, entries=bib_entries):
+    with io.open_unicode(filename, 'w') as bib_file:
+        for entry_type, key, fields in entries:
+            bib_file.write(u'@{0}{{{1}, {2}}}\n\n'.format(entry_type, key, fields))
+
+
+def set_year(entries, key, year):
+    return [
+        (entry_type, entry_key, re.sub(r'year = "\d+"', 'year = "{0}"'.format(year), fields) if entry_key == key else fields)
+        for entry_type, entry_key, fields in entries
+    ]
+
+
+def run(**kwargs):
+    return run_with_context(**kwargs)[0]
+
+
+def run_with_context(**kwargs):
+    context = Context(stderr=StringIO())
+    pybtex.make_bibliography('test.aux', context=context, **kwargs)
+    output_filename = 'test.html' if kwargs.get('output_backend') == 'html' else 'test.bbl'
+    with open(output_filename, 'rb') as output_file:
+        return output_file.read(), context.stderr.getvalue(), context.error_code
+
+
+@contextmanager
+def count_rendered_entries():
+    rendered_keys = []
+    render = FormattedEntryCache.render
+
+    def counting_render(self, entry, label, text):
+        rendered_keys.append(entry.key)
+        return render(self, entry, label, text)
+
+    FormattedEntryCache.render = counting_render
+    try:
+        yield rendered_keys
+    finally:
+        FormattedEntryCache.render = render
+
+
+def test_entry_cache():
+    with cd_tempdir():
+        write_bib('test.bib')
+        write_aux('test.aux', 'test', 'unsrt')
+
+        with count_rendered_entries() as rendered_keys:
+            result = run(force=True)
+        assert sorted(rendered_keys) == ['brown', 'jones', 'proc', 'smith']
+        with count_rendered_entries() as rendered_keys:
+            assert run(force=True) == result
+        assert rendered_keys == []
+
+        entries = set_year(bib_entries, 'jones', 2003)
+        write_bib('test.bib', entries)
+        with count_rendered_entries() as rendered_keys:
+            new_result = run(force=True)
+        assert rendered_keys == ['jones']
+        assert '2003' in new_result
+
+        # the child entry may take fields from its crossref parent
+        write_bib('test.bib', set_year(entries, 'proc', 2004))
+        with count_rendered_entries() as rendered_keys:
+            new_result = run(force=True)
+        assert sorted(rendered_keys) == ['brown', 'proc']
+        assert '2004' in new_result
+
+        write_bib('test.bib')
+        with count_rendered_entries() as rendered_keys:
+            assert run(force=True) == result
+
+
+def test_entry_cache_options():
+    with cd_tempdir():
+        write_bib('test.bib')
+        write_aux('test.aux', 'test', 'unsrt')
+        run(force=True)
+
+        for options in [
+            {'label_style': 'alpha'},
+            {'name_style': 'lastfirst'},
+            {'output_backend': 'html'},
+        ]:
+            with count_rendered_entries() as rendered_keys:
+                run(force=True, **options)
+            assert len(rendered_keys) == 4, options
+
+        write_aux('test.aux', 'test', 'plain')
+        with count_rendered_entries() as rendered_keys:
+            run(force=True)
+        assert len(rendered_keys) == 4
+
+
+@contextmanager
+def count_formatting_runs():
+    runs = []
+    init = FormattedEntryCache.__init__
+
+    def counting_init(self, *args, **kwargs):
+        runs.append(args)
+        init(self, *args, **kwargs)
+
+    FormattedEntryCache.__init__ = counting_init
+    try:
+        yield runs
+    finally:
+        FormattedEntryCache.__init__ = init
+
+
+def set_mtime(filename, mtime):
+    os.utime(filename, (mtime, mtime))
+    return os.stat(filename).st_mtime
+
+
+def test_fingerprint():
+    with cd_tempdir():
+        # the repeated entry makes a warning
+        write_bib('test.bib', bib_entries + bib_entries[:1])
+        write_aux('test.aux', 'test', 'unsrt')
+
+        with count_formatting_runs() as runs:
+            result = run_with_context()
+        assert len(runs) == 1
+        assert 'Repeated' in result[1] and result[2] == 2
+
+        mtime = set_mtime('test.bbl', 0)
+        with count_formatting_runs() as runs:
+            assert run_with_context() == result
+        assert not runs
+        assert os.stat('test.bbl').st_mtime == mtime
+
+        # identical output is not written again
+        with count_formatting_runs() as runs:
+            assert run_with_context(force=True) == result
+        assert len(runs) == 1
+        assert os.stat('test.bbl').st_mtime == mtime
+
+        write_bib('test.bib', set_year(bib_entries, 'smith', 1999))
+        with count_formatting_runs() as runs:
+            new_result = run_with_context()
+        assert len(runs) == 1
+        assert '1999' in new_result[0]
+        assert not new_result[1] and new_result[2] == 0
+        assert os.stat('test.bbl').st_mtime != mtime
+
+
+def test_fingerprint_style_module():
+    with cd_tempdir() as tempdir:
+        with open('fingerprint_test_style.py', 'w') as style_file:
+            style_file.write('class Style(object):\n    pass\n')
+        sys.path.insert(0, tempdir)
+        try:
+            from fingerprint_test_style import Style
+
+            def get_fingerprint():
+                fingerprint = Fingerprint('test.bbl')
+                fingerprint.add(Style)
+                return fingerprint.hexdigest()
+
+            fingerprint = get_fingerprint()
+            assert get_fingerprint() == fingerprint
+            set_mtime('fingerprint_test_style.py', 0)
+            assert get_fingerprint() != fingerprint
+        finally:
+            sys.path.remove(tempdir)
+            del sys.modules['fingerprint_test_style']
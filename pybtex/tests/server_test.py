@@ -0,0 +1,72 @@
+import os
+from os import path
+from StringIO import StringIO
+from contextlib import contextmanager
+from threading import Thread
+
+from pybtex import io
+from pybtex import bibtex
+from pybtex.client import request
+from pybtex.context import Context
+from pybtex.server import Server
+from pybtex.tests.bibtex_engine_test import cd_tempdir, copy_files, write_aux
+
+
+@contextmanager
+def running_server(socket_path):
+    server = Server(socket_path)
+    thread = Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01})
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        thread.join()
+        server.server_close()
+
+
+def run_locally(aux_filename):
+    context = Context(stderr=StringIO())
+    bibtex.make_bibliography(aux_filename, context=context)
+    with io.open_unicode('test.bbl') as bbl_file:
+        return bbl_file.read(), context.stderr.getvalue(), context.error_code
+
+
+def run_on_server(socket_path, argv):
+    stdout = StringIO()
+    stderr = StringIO()
+    exit_code = request(argv, os.getcwd(), socket_path, stdout, stderr)
+    with io.open_unicode('test.bbl') as bbl_file:
+        result = bbl_file.read(), stderr.getvalue().decode('UTF-8'), exit_code
+    return result, stdout.getvalue()
+
+
+def test_server():
+    with cd_tempdir() as tempdir:
+        copy_files('xampl', 'unsrt')
+        write_aux('test.aux', 'xampl', 'unsrt')
+        socket_path = path.join(tempdir, 'pybtex.sock')
+        expected_result = run_locally('test.aux')
+        with running_server(socket_path) as server:
+            for run in range(3):
+                result, stdout = run_on_server(socket_path, ['--force', 'test.aux'])
+                assert result == expected_result
+            assert server.cache.data.stats()['hits'] >= 4
+
+            with open('xampl.bib', 'a') as bib_file:
+                bib_file.write('\n@misc{added-entry, title = "Added in the meantime"}\n')
+            mtime = path.getmtime('xampl.bib') + 10
+            os.utime('xampl.bib', (mtime, mtime))
+            expected_result = run_locally('test.aux')
+            assert 'Added in the meantime' in expected_result[0]
+            result, stdout = run_on_server(socket_path, ['test.aux'])
+            assert result == expected_result
+
+            stats = StringIO()
+            assert request(['--server-stats'], os.getcwd(), socket_path, stats, StringIO()) == 0
+            assert 'memory: size ' in stats.getvalue()
+
+            assert request(['--help'], os.getcwd(), socket_path, StringIO(), StringIO()) == 0
+            assert request(['nonexistent.aux'], os.getcwd(), socket_path, StringIO(), StringIO()) == 1
+        assert not path.exists(socket_path)
+        assert request(['test.aux'], os.getcwd(), socket_path) is None
@@ -0,0 +1,79 @@
+from threading import Thread
+
+from pybtex.utils import LRUCache, lru_cache, get_cache_stats, reset_caches
+
+
+def check_links(cache):
+    """Check that the linked list contains exactly the cached items."""
+
+    keys = []
+    link = cache.root[1]
+    while link is not cache.root:
+        assert link[1][0] is link
+        keys.append(link[2])
+        link = link[1]
+    assert sorted(keys) == sorted(cache.links)
+    return keys
+
+
+def test_eviction():
+    cache = LRUCache(3)
+    for key in 'abc':
+        cache.set(key, key.upper())
+    assert cache.get('a') == 'A'
+    # updating an item does not count as using it
+    cache.set('b', 'B2')
+    cache.set('d', 'D')
+    assert check_links(cache) == ['c', 'a', 'd']
+    cache.set('e', 'E')
+    assert check_links(cache) == ['a', 'd', 'e']
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A'
+    assert cache.stats() == {'size': 3, 'hits': 2, 'misses': 1, 'evictions': 2}
+
+    cache.clear()
+    assert check_links(cache) == []
+    assert cache.stats() == {'size': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def test_lru_cache_stats():
+    calls = []
+
+    @lru_cache(maxsize=2)
+    def double(x):
+        calls.append(x)
+        return x * 2
+
+    name = '{0}.double'.format(__name__)
+    assert [double(x) for x in [1, 1, 2, 3, 1]] == [2, 2, 4, 6, 2]
+    assert calls == [1, 2, 3, 1]
+    assert get_cache_stats()[name] == {'size': 2, 'hits': 1, 'misses': 4, 'evictions': 2}
+    reset_caches()
+    assert get_cache_stats()[name] == {'size': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
+    assert double(1) == 2
+    assert calls == [1, 2, 3, 1, 1]
+
+
+def test_threads():
+    cache = LRUCache(50)
+    num_threads = 8
+    num_gets = 2000
+    failures = []
+
+    def run(thread_number):
+        for i in range(num_gets):
+            key = (i * 7 + thread_number) % 100
+            value = cache.get(key)
+            if value is None:
+                cache.set(key, key * 2)
+            elif value != key * 2:
+                failures.append((key, value))
+
+    threads = [Thread(target=run, args=(n,)) for n in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not failures
+    assert len(check_links(cache)) == len(cache) == 50
+    assert cache.hits + cache.misses == num_threads * num_gets
@@ -0,0 +1,57 @@
+import os
+from os import path
+
+from pybtex import io
+from pybtex import errors
+from pybtex import bibtex
+from pybtex.watch import Watcher
+from pybtex.tests.bibtex_engine_test import cd_tempdir, copy_files
+
+
+def write_file(filename, text):
+    with io.open_unicode(filename, 'w') as output_file:
+        output_file.write(text)
+    # make sure the change is noticed even if the size stays the same
+    mtime = path.getmtime(filename) + 10
+    os.utime(filename, (mtime, mtime))
+
+
+def read_bbl():
+    with io.open_unicode('test.bbl') as bbl_file:
+        return bbl_file.read()
+
+
+def test_watch():
+    with cd_tempdir() as tempdir:
+        copy_files('xampl', 'unsrt')
+        write_file('extra.bib', u'@misc{extra, title = "Extra entry"}\n')
+        write_file('test.aux', u'\\citation{*}\n\\@input{child.aux}\n\\bibstyle{unsrt}\n\\bibdata{xampl,extra}\n')
+        write_file('child.aux', u'')
+
+        watcher = Watcher('test.aux', bibtex.make_bibliography)
+        with errors.capture():
+            assert watcher.check()
+            assert not watcher.check()
+            assert 'Extra entry' in read_bbl()
+            assert watcher.error_code == 2
+
+            stats = watcher.cache.data.stats()
+            write_file('extra.bib', u'@misc{extra, title = "Changed entry"}\n')
+            assert watcher.check()
+            assert 'Changed entry' in read_bbl()
+            new_stats = watcher.cache.data.stats()
+            # the .bst and xampl.bib are not parsed again
+            assert new_stats['hits'] - stats['hits'] == 2
+            assert new_stats['misses'] - stats['misses'] == 1
+
+            write_file('child.aux', u'\\bibcite{extra}{1}\n')
+            assert watcher.check()
+            assert not watcher.check()
+
+            write_file('test.aux', u'\\citation{*}\n')
+            assert watcher.check()
+            assert watcher.error_code == 1
+            write_file('test.aux', u'\\citation{*}\n\\bibstyle{unsrt}\n\\bibdata{extra}\n')
+            assert watcher.check()
+            assert watcher.error_code == 0
+            assert 'Changed entry' in read_bbl()
@@ -21,6 +21,8 @@
 
 import re
 
+from pybtex.utils import lru_cache
+
 terminators = '.?!'
 dash_re = re.compile(r'-')
 whitespace_re = re.compile(r'\s+')
@@ -40,6 +42,7 @@ def add_period(s):
         return s + '.'
     return s
 
+@lru_cache(maxsize=4096)
 def abbreviate(s):
     """Abbreviate some text.
     Examples:
@@ -23,19 +23,160 @@
 """Miscellaneous small utils."""
 
 
-from functools import wraps
+from functools import update_wrapper
 from collections import Sequence, MutableMapping
-from types import GeneratorType
+from threading import Lock
+from types import FunctionType, GeneratorType
 
 
-def memoize(f):
-    memory = {}
-    @wraps(f)
-    def new_f(*args):
-        if args not in memory:
-            memory[args] = f(*args)
-        return memory[args]
-    return new_f
+# all caches created with lru_cache()
+caches = []
+
+
+class LRUCache(object):
+    """A thread-safe cache holding at most maxsize items.
+
+    When the cache is full, the least recently used item is evicted.
+
+    >>> cache = LRUCache(2)
+    >>> cache.set('a', 1)
+    >>> cache.set('b', 2)
+    >>> cache.get('a')
+    1
+    >>> cache.set('c', 3)
+    >>> print cache.get('b')
+    None
+    >>> cache.get('a'), cache.get('c')
+    (1, 3)
+    >>> cache.hits, cache.misses, cache.evictions
+    (3, 1, 1)
+    >>> cache.clear()
+    >>> len(cache), cache.hits
+    (0, 0)
+    """
+
+    def __init__(self, maxsize=1024, name=None):
+        self.maxsize = maxsize
+        self.name = name
+        self.lock = Lock()
+        self.clear()
+
+    def __len__(self):
+        return len(self.links)
+
+    def clear(self):
+        """Remove all items and reset the counters."""
+        with self.lock:
+            self.links = {}
+            # circular doubly linked list of [prev, next, key, value],
+            # from the least recently used to the most recently used item
+            self.root = []
+            self.root[:] = [self.root, self.root, None, None]
+            self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            link = self.links.get(key)
+            if link is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            prev, next, key, value = link
+            prev[1] = next
+            next[0] = prev
+            root = self.root
+            last = root[0]
+            last[1] = root[0] = link
+            link[0] = last
+            link[1] = root
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            link = self.links.get(key)
+            if link is not None:
+                link[3] = value
+                return
+            if len(self.links) >= self.maxsize:
+                oldest = self.root[1]
+                self.root[1] = oldest[1]
+                oldest[1][0] = self.root
+                del self.links[oldest[2]]
+                self.evictions += 1
+            root = self.root
+            last = root[0]
+            link = [last, root, key, value]
+            last[1] = root[0] = self.links[key] = link
+
+    def stats(self):
+        return {
+            'size': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+def lru_cache(maxsize=1024):
+    """Cache the results of a function in an LRUCache.
+
+    The function must be pure and take only hashable arguments.
+    Arguments of different types are cached separately,
+    so f('a') and f(u'a') do not share the result.
+    Mutable results (like lists) are shared between calls
+    and must not be modified by the callers.
+    The cache is available as the cache attribute of the decorated function.
+
+    >>> @lru_cache(maxsize=10)
+    ... def square(x):
+    ...     return x * x
+    >>> square(2), square(2), square(3)
+    (4, 4, 9)
+    >>> square.cache.hits, square.cache.misses
+    (1, 2)
+    """
+
+    def decorator(f):
+        cache = LRUCache(maxsize, '{0}.{1}'.format(f.__module__, f.__name__))
+        caches.append(cache)
+        get = cache.get
+        set = cache.set
+        missing = object()
+
+        def cached_f(*args, **kwargs):
+            key = args + tuple(map(type, args))
+            if kwargs:
+                key += (missing,) + tuple(sorted(kwargs.items()))
+            result = get(key, missing)
+            if result is missing:
+                result = f(*args, **kwargs)
+                set(key, result)
+            return result
+
+        # use the globals of the original function,
+        # so that doctest still finds its docstring
+        cached_f = FunctionType(
+            cached_f.func_code, f.func_globals, f.__name__,
+            None, cached_f.func_closure,
+        )
+        update_wrapper(cached_f, f)
+        cached_f.cache = cache
+        return cached_f
+    return decorator
+
+
+memoize = lru_cache()
+
+
+def reset_caches():
+    """Clear all caches created with lru_cache(), e.g. between runs."""
+    for cache in caches:
+        cache.clear()
+
+
+def get_cache_stats():
+    """Return a dict with the statistics of all caches created with lru_cache()."""
+    return dict((cache.name, cache.stats()) for cache in caches)
 
 
 class CaseInsensitiveDict(MutableMapping):
@@ -0,0 +1,126 @@
+# Copyright (c) 2009, 2010, 2011, 2012  Andrey Golovizin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Rebuild the bibliography whenever the input files change.
+
+"pybtex --watch file.aux" keeps running and checks the .aux file, the .aux
+files included with \\@input, the .bib files and the .bst file for changes.
+The files are polled: the standard library has no interface to inotify,
+and checking a few files twice a second costs next to nothing.
+
+Parsed .bst and .bib files are kept in memory between the runs (see
+pybtex.diskcache.MemoryCache), so only the changed files are parsed again.
+"""
+
+import os
+import time
+from os import path
+
+import pybtex.io
+from pybtex import auxfile, errors
+from pybtex.context import Context, activate
+from pybtex.diskcache import MemoryCache
+from pybtex.exceptions import PybtexError
+from pybtex.plugin import find_plugin
+
+
+def get_stamp(filename):
+    try:
+        stat = os.stat(filename)
+    except EnvironmentError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+
+class Watcher(object):
+    def __init__(self, aux_filename, make_bibliography, style_language='bibtex', **kwargs):
+        self.aux_filename = aux_filename
+        self.make_bibliography = make_bibliography
+        self.style_language = style_language
+        self.kwargs = kwargs
+        self.cache = MemoryCache()
+        self.stamps = None
+        self.error_code = 0
+
+    def get_input_files(self):
+        try:
+            aux_data = auxfile.parse_file(self.aux_filename, self.kwargs.get('output_encoding'))
+        except PybtexError:
+            # maybe LaTeX is writing it right now, wait for the next change
+            return [self.aux_filename]
+        bib_parser = find_plugin('pybtex.database.input', self.kwargs.get('bib_format'))
+        filenames = list(aux_data.filenames)
+        filenames.extend(name + bib_parser.get_default_suffix() for name in aux_data.data)
+        if self.style_language == 'bibtex':
+            filenames.append(aux_data.style + path.extsep + 'bst')
+        return pybtex.io.resolve_filenames(filenames)
+
+    def changed(self):
+        return self.stamps is None or any(
+            get_stamp(filename) != stamp
+            for filename, stamp in self.stamps.iteritems()
+        )
+
+    def build(self):
+        context = Context(strict=errors.strict, stderr=errors.stderr, cache=self.cache)
+        # take the stamps before reading the files to not miss any changes
+        with activate(context):
+            self.stamps = dict(
+                (filename, get_stamp(filename))
+                for filename in self.get_input_files()
+            )
+        try:
+            self.make_bibliography(self.aux_filename, context=context, **self.kwargs)
+        except PybtexError, error:
+            context.print_error(error)
+            self.error_code = 1
+        else:
+            self.error_code = context.error_code
+
+    def check(self):
+        """Rebuild the bibliography if some of the files have changed.
+
+        Return True if the bibliography has been rebuilt.
+        """
+
+        if self.changed():
+            self.build()
+            return True
+        return False
+
+    def run(self, interval=0.5):
+        """Check the files every interval seconds until interrupted.
+
+        Return the exit code of the last run.
+        """
+
+        try:
+            while True:
+                self.check()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        return self.error_code
+
+
+def watch(aux_filename, make_bibliography, interval=0.5, **kwargs):
+    return Watcher(aux_filename, make_bibliography, **kwargs).run(interval)
@@ -83,7 +83,11 @@ setup(name=progname,
         'PyYAML>=3.01'
     ],
     packages=find_packages(exclude=['docs']),
-    scripts=[os.path.join('scripts', progname), os.path.join('scripts', progname + "-convert")],
+    scripts=[
+        os.path.join('scripts', progname),
+        os.path.join('scripts', progname + "-convert"),
+        os.path.join('scripts', progname + "-client"),
+    ],
     include_package_data=True,
     cmdclass={'sdist' : Sdist},
     zip_safe=True,